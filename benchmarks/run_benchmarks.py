@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""Offline benchmarks for the html_downloader and article_to_md pipelines.
+
+Stored pages (html/*/index.html and the raw pages in benchmarks/fixtures/) are run through the real
+``download_page`` and ``convert_source``, with the page and its images served by a local stand-in HTTP
+server. Stage times come from the pipelines' own metrics events, so they always cover the stages the
+scripts actually run, in their order. Stage times are medians over several runs; peak memory comes from
+a separate run under tracemalloc. Results can be saved per commit and compared against a baseline with
+regression thresholds.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit, urlunsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts"))
+
+import requests  # noqa: E402
+from requests.adapters import HTTPAdapter  # noqa: E402
+
+import article_to_md  # noqa: E402
+import html_downloader  # noqa: E402
+from catalog import Catalog  # noqa: E402
+from image_store import ImageStore  # noqa: E402
+from metrics import Metrics  # noqa: E402
+from near_duplicates import NearDuplicateIndex  # noqa: E402
+from robots_cache import RobotsCache  # noqa: E402
+
+RESULTS_FORMAT = 2
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+FIXTURE_PATTERNS = ["html/*/index.html", "benchmarks/fixtures/**/*.html"]
+IMAGE_PATTERNS = ["html/*/images/*", "benchmarks/fixtures/**/images/*"]
+
+# Per-item events that overlap inside an enclosing stage, so they are not stages of their own
+NESTED_EVENTS = ("image",)
+
+# A stage only counts as regressed when it is slower by both the relative threshold and this much
+MIN_DELTA_MS = 2.0
+MIN_DELTA_BYTES = 256 * 1024
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    """Serve the project tree; requests for files that are not there fall back to an image of the same name.
+
+    Raw fixtures reference their images by absolute URL on other hosts. Those requests are routed here
+    (see LocalAdapter) and answered by file name from the images/ folders of the archives and fixtures.
+    """
+
+    images: Dict[str, Path] = {}
+
+    def translate_path(self, path: str) -> str:
+        translated = super().translate_path(path)
+        if not os.path.exists(translated):
+            fallback = self.images.get(os.path.basename(unquote(urlsplit(path).path)))
+            if fallback:
+                return str(fallback)
+        return translated
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class LocalAdapter(HTTPAdapter):
+    """Send every request to the stand-in server, whatever host it names, so a run never leaves the machine."""
+
+    def __init__(self, netloc: str):
+        super().__init__(pool_connections=16, pool_maxsize=16)
+        self.netloc = netloc
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        if parts.netloc != self.netloc:
+            request.url = urlunsplit(('http', self.netloc, parts.path, parts.query, ''))
+        return super().send(request, **kwargs)
+
+
+@contextmanager
+def fixture_server() -> Iterator[Tuple[str, requests.Session]]:
+    """Run the stand-in server. Yields its base URL and a session that only talks to it."""
+    images = {path.name: path for pattern in IMAGE_PATTERNS for path in sorted(ROOT.glob(pattern)) if path.is_file()}
+    handler = type("BoundFixtureHandler", (FixtureHandler,), {'images': images})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(handler, directory=str(ROOT)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    netloc = f"127.0.0.1:{server.server_address[1]}"
+    session = requests.Session()
+    adapter = LocalAdapter(netloc)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    try:
+        yield f"http://{netloc}", session
+    finally:
+        session.close()
+        server.shutdown()
+        server.server_close()
+
+
+class StageRecorder(Metrics):
+    """Metrics recorder that keeps the stage timings of one pipeline run in memory instead of writing them.
+
+    The pipeline's closing ``page`` event is its total time; every other timed event adds to its stage.
+    """
+
+    def __init__(self, tool: str):
+        super().__init__(tool)
+        self.enabled = True
+        self.seconds: Dict[str, float] = {}
+        self.total = 0.0
+
+    def emit(self, stage: str, seconds: Optional[float] = None, **fields: Any) -> None:
+        if seconds is None or stage in NESTED_EVENTS:
+            return
+        with self._lock:
+            if stage == "page":
+                self.total += seconds
+            else:
+                self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+
+def run_html_downloader(url: str, scratch: Path, session: requests.Session, robots: RobotsCache,
+                        metrics: Metrics) -> None:
+    """Archive the page the way the html_downloader CLI does, with every store kept in ``scratch``."""
+    html_downloader.download_page(url, str(scratch / "html"), session=session, robots=robots,
+                                  store=ImageStore(scratch / "store"),
+                                  duplicates=NearDuplicateIndex(scratch / "duplicates.sqlite"),
+                                  catalog=Catalog(scratch / "catalog.sqlite"), verbose=False, metrics=metrics)
+
+
+def run_article_to_md(url: str, scratch: Path, session: requests.Session, robots: RobotsCache,
+                      metrics: Metrics) -> None:
+    """Convert the page the way the article_to_md CLI does, with every store kept in ``scratch``."""
+    article_to_md.convert_source(url, str(scratch / "markdown"), session=session, robots=robots,
+                                 store=ImageStore(scratch / "store"),
+                                 duplicates=NearDuplicateIndex(scratch / "duplicates.sqlite"),
+                                 catalog=Catalog(scratch / "catalog.sqlite"), verbose=False, metrics=metrics)
+
+
+PIPELINES: Dict[str, Callable[[str, Path, requests.Session, RobotsCache, Metrics], None]] = {
+    'html_downloader': run_html_downloader,
+    'article_to_md': run_article_to_md,
+}
+
+
+def run_once(pipeline: str, url: str, session: requests.Session, robots: RobotsCache, trace_memory: bool = False
+             ) -> Tuple[StageRecorder, Optional[int]]:
+    """One pipeline run into a scratch folder. Returns its recorded stages and, when traced, peak bytes allocated."""
+    recorder = StageRecorder(pipeline)
+    with tempfile.TemporaryDirectory() as scratch, contextlib.redirect_stdout(io.StringIO()):
+        if trace_memory:
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+        try:
+            PIPELINES[pipeline](url, Path(scratch), session, robots, recorder)
+            peak = tracemalloc.get_traced_memory()[1] - baseline if trace_memory else None
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+    return recorder, peak
+
+
+def benchmark(fixtures: List[Path], pipelines: List[str], repeat: int) -> Dict[str, Any]:
+    """Median stage times and peak memory for every fixture and pipeline."""
+    results: Dict[str, Any] = {}
+    # robots.txt is fetched once per run of the benchmark, as a long-lived CLI process would
+    robots = RobotsCache(cache_dir=None)
+    with fixture_server() as (base_url, session):
+        for fixture in fixtures:
+            name = str(fixture.relative_to(ROOT).parent if fixture.name == "index.html" else fixture.relative_to(ROOT))
+            url = f"{base_url}/{fixture.relative_to(ROOT).as_posix()}"
+            results[name] = {}
+            for pipeline in pipelines:
+                run_once(pipeline, url, session, robots)  # warm-up: imports, connection pool, readability regexes
+                runs = [run_once(pipeline, url, session, robots)[0] for _ in range(repeat)]
+                _, peak = run_once(pipeline, url, session, robots, trace_memory=True)
+                stages = {stage: round(statistics.median(run.seconds.get(stage, 0.0) for run in runs) * 1000, 3)
+                          for stage in runs[0].seconds}
+                # Work between the timed stages: duplicate lookup, manifest, catalog and index updates
+                stages['other'] = round(statistics.median(max(run.total - sum(run.seconds.values()), 0.0)
+                                                          for run in runs) * 1000, 3)
+                results[name][pipeline] = {
+                    'stages_ms': stages,
+                    'total_ms': round(statistics.median(run.total for run in runs) * 1000, 3),
+                    'peak_bytes': peak,
+                }
+    return results
+
+
+def git_commit() -> Tuple[str, bool]:
+    """Current commit and whether the working tree has uncommitted changes."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], time_threshold: float,
+            memory_threshold: float) -> List[str]:
+    """Descriptions of every stage time and peak memory that regressed beyond the thresholds."""
+    regressions = []
+    for fixture, pipelines in current['results'].items():
+        for pipeline, result in pipelines.items():
+            before = baseline['results'].get(fixture, {}).get(pipeline)
+            if not before:
+                continue
+            timings = [(stage, ms, before['stages_ms'].get(stage)) for stage, ms in result['stages_ms'].items()]
+            timings.append(("total", result['total_ms'], before['total_ms']))
+            for stage, ms, old_ms in timings:
+                if old_ms is not None and ms > old_ms * (1 + time_threshold) and ms - old_ms > MIN_DELTA_MS:
+                    regressions.append(f"{fixture} · {pipeline} · {stage}: {old_ms:.1f} → {ms:.1f} ms "
+                                       f"(+{(ms / old_ms - 1) * 100 if old_ms else 100:.0f}%)")
+            peak, old_peak = result['peak_bytes'], before.get('peak_bytes')
+            if old_peak and peak > old_peak * (1 + memory_threshold) and peak - old_peak > MIN_DELTA_BYTES:
+                regressions.append(f"{fixture} · {pipeline} · peak memory: {old_peak / 2**20:.1f} → "
+                                   f"{peak / 2**20:.1f} MB (+{(peak / old_peak - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_results(results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    for fixture, pipelines in results.items():
+        print(fixture)
+        for pipeline, result in pipelines.items():
+            before = (baseline or {}).get('results', {}).get(fixture, {}).get(pipeline, {})
+            print(f"  {pipeline}: {result['total_ms']:.1f} ms total, peak {result['peak_bytes'] / 2**20:.1f} MB"
+                  + (f" (baseline {before['total_ms']:.1f} ms, {before['peak_bytes'] / 2**20:.1f} MB)"
+                     if before else ""))
+            for stage, ms in result['stages_ms'].items():
+                share = ms / result['total_ms'] * 100 if result['total_ms'] else 0
+                old = before.get('stages_ms', {}).get(stage)
+                print(f"    {stage:<16} {ms:>9.1f} ms {share:>4.0f}%" + (f"   was {old:.1f} ms" if old is not None else ""))
+        print()
+
+
+def main():
+    """Benchmark the pipelines against stored pages, optionally saving and comparing results."""
+    parser = argparse.ArgumentParser(
+        description="Offline stage-by-stage benchmarks of html_downloader and article_to_md"
+    )
+    parser.add_argument("fixtures", nargs="*",
+                        help="HTML pages to replay (default: html/*/index.html and benchmarks/fixtures/**/*.html)")
+    parser.add_argument("--pipeline", choices=list(PIPELINES), action="append",
+                        help="Only benchmark this pipeline (repeatable; default: both)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per fixture and pipeline (default: 5)")
+    parser.add_argument("--save", nargs="?", const="", metavar="PATH",
+                        help="Save results as JSON (default path: benchmarks/results/<commit>.json)")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare against saved results and fail on regressions")
+    parser.add_argument("--time-threshold", type=float, default=0.25,
+                        help="Allowed slowdown of any stage before it counts as a regression (default: 0.25)")
+    parser.add_argument("--memory-threshold", type=float, default=0.20,
+                        help="Allowed growth of peak memory before it counts as a regression (default: 0.20)")
+    args = parser.parse_args()
+
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    if args.fixtures:
+        fixtures = [Path(fixture).resolve() for fixture in args.fixtures]
+        missing = [str(fixture) for fixture in fixtures if not fixture.is_file()]
+        if missing:
+            print(f"Error: Fixture not found: {', '.join(missing)}", file=sys.stderr)
+            sys.exit(1)
+        if any(not fixture.is_relative_to(ROOT) for fixture in fixtures):
+            print(f"Error: Fixtures must be inside {ROOT}", file=sys.stderr)
+            sys.exit(1)
+    else:
+        fixtures = sorted({path.resolve() for pattern in FIXTURE_PATTERNS for path in ROOT.glob(pattern)})
+    if not fixtures:
+        print("Error: No fixtures found", file=sys.stderr)
+        sys.exit(1)
+
+    baseline = None
+    if args.baseline:
+        try:
+            baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            print(f"Error: Cannot read baseline: {e}", file=sys.stderr)
+            sys.exit(1)
+        if baseline.get('format') != RESULTS_FORMAT:
+            print(f"Error: Baseline uses results format {baseline.get('format')}, not {RESULTS_FORMAT}; "
+                  f"save a new one with --save", file=sys.stderr)
+            sys.exit(1)
+
+    pipelines = args.pipeline or list(PIPELINES)
+    print(f"Benchmarking {len(fixtures)} fixture(s) × {len(pipelines)} pipeline(s), {args.repeat} runs each...\n")
+    commit, dirty = git_commit()
+    current = {
+        'format': RESULTS_FORMAT,
+        'commit': commit,
+        'dirty': dirty,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'results': benchmark(fixtures, pipelines, args.repeat),
+    }
+    print_results(current['results'], baseline)
+
+    if args.save is not None:
+        save_path = Path(args.save) if args.save else RESULTS_DIR / f"{commit}{'-dirty' if dirty else ''}.json"
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+        save_path.write_text(json.dumps(current, indent=2), encoding='utf-8')
+        print(f"✓ Results saved to {save_path}")
+
+    if baseline:
+        regressions = compare(current, baseline, args.time_threshold, args.memory_threshold)
+        if regressions:
+            print(f"✗ {len(regressions)} regression(s) against {baseline.get('commit', args.baseline)}:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print(f"✓ No regressions against {baseline.get('commit', args.baseline)}")
+
+
+if __name__ == "__main__":
+    main()
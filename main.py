@@ -1,5 +1,52 @@
-def main():
-    print("Hello from claude-code-analyst!")
+"""``analyst``: one command line for the tools in scripts/, importing only the tool that runs."""
+
+import importlib
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+SCRIPTS_DIR = Path(__file__).resolve().parent / "scripts"
+
+# Subcommand -> (module in scripts/, summary). A module and its dependencies are only imported when its
+# subcommand runs, so e.g. rendering diagrams never loads readability, lxml or numpy
+COMMANDS = {
+    'fetch': ("html_downloader", "Archive a web page as clean HTML with its images"),
+    'convert': ("article_to_md", "Convert a web article or local HTML file to markdown"),
+    'render': ("mermaid_to_image", "Render mermaid diagrams in markdown files to images"),
+    'index': ("corpus_index", "Update or search the full-text corpus index"),
+    'related': ("related_docs", "Find corpus documents related to a file"),
+    'catalog': ("catalog", "List archived documents by date, domain and size"),
+    'bundle': ("bundle", "Pack, unpack or read single-file HTML archive bundles"),
+    'chunks': ("chunker", "Split corpus documents into token-budgeted chunks"),
+    'ingest': ("ingest_server", "Run or submit jobs to the local ingest service"),
+}
+
+
+def usage() -> str:
+    lines = ["usage: analyst <command> [options]", "", "commands:"]
+    lines += [f"  {name:<10} {summary}" for name, (_, summary) in COMMANDS.items()]
+    lines += ["", "Run 'analyst <command> --help' for the options of a command."]
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Dispatch to a tool's own command line, as if it had been run directly."""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        sys.exit(0 if argv else 2)
+
+    command, *args = argv
+    if command not in COMMANDS:
+        print(f"analyst: unknown command '{command}'\n", file=sys.stderr)
+        print(usage(), file=sys.stderr)
+        sys.exit(2)
+
+    # The tools import their sibling modules by name, as they do when run from scripts/
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+    sys.argv = [f"analyst {command}", *args]
+    importlib.import_module(COMMANDS[command][0]).main()
 
 
 if __name__ == "__main__":
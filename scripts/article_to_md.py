@@ -3,48 +3,64 @@
 
 import argparse
 import os
+import posixpath
 import re
-import shutil
 import sys
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional, Tuple
-from urllib.parse import urljoin, urlparse
-from urllib.robotparser import RobotFileParser
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import unquote, urljoin, urlparse
 
 import requests
 from bs4 import BeautifulSoup
-from markdownify import markdownify as md
+from markdownify import MarkdownConverter
 from readability import Document
+from requests.adapters import HTTPAdapter
 
+from bundle import BUNDLE_HTML, Bundle, is_bundle
+from catalog import Catalog, make_record
+from http_cache import DEFAULT_CACHE_DIR, HEAD_BYTES, HTTPCache, stream_to_file
+from image_store import DEFAULT_STORE_DIR, ImageStore, sniff_image_type, stable_image_name
+from manifest import find_manifest, html_digest, is_current, pipeline_version, write_manifest
+from metrics import NO_METRICS, Metrics
+from parsed_document import DEFAULT_PRUNE_RULES, PRUNE_RULES, ParsedDocument, prune_version, resolve_prune_rules
+from robots_cache import HostScheduler, RobotsCache, ScheduledAdapter
 
-def check_robots_txt(url: str) -> bool:
-    """Check if the URL is allowed according to robots.txt."""
-    parsed_url = urlparse(url)
-    robots_url = f"{parsed_url.scheme}://{parsed_url.netloc}/robots.txt"
-    
-    rp = RobotFileParser()
-    rp.set_url(robots_url)
-    
-    try:
-        rp.read()
-        return rp.can_fetch("*", url)
-    except Exception:
-        return True
+# near_duplicates (numpy) and image_optimizer are imported where they are used, so that runs which never
+# reach those stages do not pay for loading them
+if TYPE_CHECKING:
+    from near_duplicates import NearDuplicateIndex
+
+USER_AGENT = 'Mozilla/5.0 (compatible; article-to-md/1.0)'
+
+DEFAULT_MAX_IMAGE_BYTES = 50 * 1024 * 1024
+
+# Walks the article's BeautifulSoup tree directly, so the HTML is never serialised and parsed a second time
+MARKDOWN_CONVERTER = MarkdownConverter(heading_style="ATX", bullets="-", code_language="python")
+
+# Bump when a change to this script alters the generated markdown, so archived articles are rebuilt
+EXTRACTOR_VERSION = pipeline_version("article_to_md 1", ["readability-lxml", "markdownify", "beautifulsoup4"])
+
+
+def check_robots_txt(url: str, robots: Optional[RobotsCache] = None) -> bool:
+    """Check if the URL is allowed according to robots.txt, reusing the shared per-host cache."""
+    return (robots or RobotsCache()).can_fetch(url)
 
 
-def validate_html(content: str) -> bool:
+def validate_html(content: Union[str, ParsedDocument]) -> bool:
     """Validate if the content is valid HTML."""
     try:
-        soup = BeautifulSoup(content, 'html.parser')
-        return bool(soup.find())
+        return ParsedDocument.of(content).has_markup()
     except Exception:
         return False
 
 
-def extract_article_date(html_content: str) -> Optional[str]:
+def extract_article_date(html_content: Union[str, ParsedDocument]) -> Optional[str]:
     """Try to extract publication date from the HTML."""
-    soup = BeautifulSoup(html_content, 'html.parser')
+    page = ParsedDocument.of(html_content)
     
     # Common meta tags for article dates
     date_meta_names = [
@@ -54,12 +70,12 @@ def extract_article_date(html_content: str) -> Optional[str]:
     
     for meta_name in date_meta_names:
         # Check property attribute
-        meta = soup.find('meta', property=meta_name)
-        if not meta:
+        meta = page.find('meta', {'property': meta_name})
+        if meta is None:
             # Check name attribute
-            meta = soup.find('meta', {'name': meta_name})
+            meta = page.find('meta', {'name': meta_name})
         
-        if meta and meta.get('content'):
+        if meta is not None and meta.get('content'):
             try:
                 # Try to parse the date
                 date_str = meta.get('content')
@@ -71,8 +87,8 @@ def extract_article_date(html_content: str) -> Optional[str]:
                 continue
     
     # Look for time tags with datetime attribute
-    time_tag = soup.find('time', datetime=True)
-    if time_tag:
+    time_tag = page.find('time', {'datetime': True})
+    if time_tag is not None:
         date_str = time_tag.get('datetime')
         if 'T' in date_str:
             date_str = date_str.split('T')[0]
@@ -88,9 +104,9 @@ def count_words(text: str) -> int:
     return len(words)
 
 
-def extract_article(html_content: str, url: str) -> Tuple[str, str]:
-    """Extract the main article content and title from HTML."""
-    doc = Document(html_content, url=url)
+def extract_article(html_content: Union[str, ParsedDocument], url: str) -> Tuple[str, str]:
+    """Extract the main article content and title from HTML, scoring the already-parsed lxml tree."""
+    doc = Document(ParsedDocument.of(html_content).tree, url=url)
     article = doc.summary()
     title = doc.title()
     
@@ -104,29 +120,65 @@ def create_kebab_case(text: str) -> str:
     return text.strip('-')
 
 
-def download_image(img_url: str, dest_folder: Path) -> Optional[str]:
-    """Download an image and return the local filename."""
+def is_image(head: bytes) -> bool:
+    """True if a body starting with ``head`` is a recognised image format."""
+    return sniff_image_type(head) is not None
+
+
+def download_image(img_url: str, dest_folder: Path, session: Optional[requests.Session] = None,
+                   cache: Optional[HTTPCache] = None, store: Optional[ImageStore] = None,
+                   max_bytes: Optional[int] = DEFAULT_MAX_IMAGE_BYTES,
+                   metrics: Optional[Metrics] = None) -> Optional[str]:
+    """Download an image into the image store, link it into dest_folder and return the local filename.
+
+    The body is streamed to disk, capped at ``max_bytes`` and resumed with a Range request if an earlier
+    attempt was interrupted. A response whose first bytes are not a recognised image format is rejected as
+    soon as they arrive, before the rest is downloaded or cached.
+    Each attempt is recorded as an ``image`` event in ``metrics``.
+    """
+    metrics = metrics or NO_METRICS
+    started = time.perf_counter()
+    download_path = None
+    from_cache = False
     try:
-        response = requests.get(img_url, timeout=10)
-        response.raise_for_status()
+        if cache:
+            response = cache.get(img_url, session, timeout=10, max_bytes=max_bytes, accept=is_image)
+            body_path, from_cache = response.body_path, response.from_cache
+        else:
+            download_path = dest_folder / f".{stable_image_name(img_url, '')}.download"
+            stream_to_file(img_url, download_path, session, timeout=10, max_bytes=max_bytes, accept=is_image)
+            body_path = download_path
+        
+        # Bodies revalidated from the cache were not checked as they streamed in
+        with open(body_path, 'rb') as f:
+            ext = sniff_image_type(f.read(HEAD_BYTES))
+        if not ext:
+            raise ValueError("response is not a recognised image format")
         
         parsed_url = urlparse(img_url)
         filename = os.path.basename(parsed_url.path)
         
         if not filename or '.' not in filename:
-            filename = f"image_{hash(img_url)}.jpg"
+            filename = stable_image_name(img_url, ext)
         
         filepath = dest_folder / filename
-        filepath.write_bytes(response.content)
+        size = body_path.stat().st_size
+        (store or ImageStore()).add(body_path, filepath, move=download_path is not None)
         
+        metrics.emit("image", time.perf_counter() - started, host=urlparse(img_url).netloc, url=img_url, ok=True,
+                     bytes_in=size, from_cache=from_cache)
         return filename
     except Exception as e:
+        if download_path:
+            download_path.unlink(missing_ok=True)
+        metrics.emit("image", time.perf_counter() - started, host=urlparse(img_url).netloc, url=img_url, ok=False,
+                     error=str(e))
         print(f"Failed to download image {img_url}: {e}", file=sys.stderr)
         return None
 
 
-def copy_local_image(img_src: str, source_folder: Path, dest_folder: Path) -> Optional[str]:
-    """Copy a local image file and return the local filename."""
+def copy_local_image(img_src: str, source_folder: Path, dest_folder: Path, store: Optional[ImageStore] = None) -> Optional[str]:
+    """Add a local image file to the image store, link it into dest_folder and return the local filename."""
     try:
         # Handle file:// URLs
         if img_src.startswith('file://'):
@@ -142,8 +194,8 @@ def copy_local_image(img_src: str, source_folder: Path, dest_folder: Path) -> Op
         filename = img_path.name
         dest_path = dest_folder / filename
         
-        # Copy the file
-        shutil.copy2(img_path, dest_path)
+        # Store the file once and link it into the article folder
+        (store or ImageStore()).add(img_path, dest_path)
         
         return filename
     except Exception as e:
@@ -151,25 +203,54 @@ def copy_local_image(img_src: str, source_folder: Path, dest_folder: Path) -> Op
         return None
 
 
-def process_images(soup: BeautifulSoup, base_url: str, images_folder: Path, is_local_source: bool = False, source_folder: Path = None) -> int:
-    """Download or copy images and update their references in the HTML. Returns image count."""
+def copy_bundle_image(img_src: str, bundle: Bundle, dest_folder: Path, store: Optional[ImageStore] = None) -> Optional[str]:
+    """Add an image read from a bundle to the image store, link it into dest_folder and return the local filename."""
+    name = posixpath.normpath(unquote(img_src.split('#', 1)[0].split('?', 1)[0]))
+    if name not in bundle:
+        print(f"Local image not found in {bundle.path}: {img_src}", file=sys.stderr)
+        return None
+    try:
+        filename = posixpath.basename(name)
+        
+        # Store the member once and link it into the article folder, without unpacking the bundle
+        store = store or ImageStore()
+        store.link(store.put_bytes(bundle.read(name)), dest_folder / filename)
+        
+        return filename
+    except Exception as e:
+        print(f"Failed to copy image {img_src} from {bundle.path}: {e}", file=sys.stderr)
+        return None
+
+
+def process_images(soup: BeautifulSoup, base_url: str, images_folder: Path, is_local_source: bool = False, source_folder: Union[Path, Bundle] = None, session: Optional[requests.Session] = None, cache: Optional[HTTPCache] = None, store: Optional[ImageStore] = None, max_image_bytes: Optional[int] = DEFAULT_MAX_IMAGE_BYTES, metrics: Optional[Metrics] = None) -> int:
+    """Download or copy images and update their references in the HTML. Returns image count.
+
+    Local images are copied from ``source_folder``, or read from it when it is a bundle.
+    """
+    metrics = metrics or NO_METRICS
+    started = time.perf_counter()
     images_folder.mkdir(parents=True, exist_ok=True)
     
     image_count = 0
+    found = 0
     for img in soup.find_all('img'):
         img_src = img.get('src')
         if not img_src:
             continue
         
+        found += 1
         local_filename = None
         
-        if is_local_source:
+        if is_local_source and isinstance(source_folder, Bundle):
+            # Handle images inside a bundle
+            local_filename = copy_bundle_image(img_src, source_folder, images_folder, store)
+        elif is_local_source:
             # Handle local images
-            local_filename = copy_local_image(img_src, source_folder, images_folder)
+            local_filename = copy_local_image(img_src, source_folder, images_folder, store)
         else:
             # Handle remote images
             img_url = urljoin(base_url, img_src)
-            local_filename = download_image(img_url, images_folder)
+            local_filename = download_image(img_url, images_folder, session, cache, store, max_image_bytes, metrics)
         
         if local_filename:
             img['src'] = f"images/{local_filename}"
@@ -178,26 +259,25 @@ def process_images(soup: BeautifulSoup, base_url: str, images_folder: Path, is_l
             if img.get('srcset'):
                 del img['srcset']
     
+    metrics.emit("images", time.perf_counter() - started, images_found=found, images_downloaded=image_count,
+                 images_failed=found - image_count)
     return image_count
 
 
-def convert_to_markdown(html_content: str, base_url: str, dest_folder: Path, is_local_source: bool = False, source_folder: Path = None) -> Tuple[str, int]:
-    """Convert HTML to markdown with image processing. Returns markdown and image count."""
-    soup = BeautifulSoup(html_content, 'html.parser')
+def convert_to_markdown(html_content: Union[str, ParsedDocument], base_url: str, dest_folder: Path, is_local_source: bool = False, source_folder: Union[Path, Bundle] = None, session: Optional[requests.Session] = None, cache: Optional[HTTPCache] = None, store: Optional[ImageStore] = None, max_image_bytes: Optional[int] = DEFAULT_MAX_IMAGE_BYTES, metrics: Optional[Metrics] = None) -> Tuple[str, int]:
+    """Convert HTML to markdown with image processing. Returns markdown and image count.
+
+    Image references are rewritten in place on the document's soup, which is then converted as it stands.
+    """
+    soup = ParsedDocument.of(html_content, parser='html.parser').soup
     
     images_folder = dest_folder / "images"
-    image_count = process_images(soup, base_url, images_folder, is_local_source, source_folder)
-    
-    processed_html = str(soup)
-    
-    markdown_content = md(
-        processed_html,
-        heading_style="ATX",
-        bullets="-",
-        code_language="python"
-    )
+    image_count = process_images(soup, base_url, images_folder, is_local_source, source_folder, session, cache, store, max_image_bytes, metrics)
     
-    markdown_content = re.sub(r'\n{3,}', '\n\n', markdown_content)
+    with (metrics or NO_METRICS).timed("markdownify"):
+        markdown_content = MARKDOWN_CONVERTER.convert_soup(soup)
+        
+        markdown_content = re.sub(r'\n{3,}', '\n\n', markdown_content)
     
     return markdown_content.strip(), image_count
 
@@ -213,6 +293,9 @@ def format_metadata(metadata: Dict[str, any]) -> str:
     lines.append(f"date_scraped: {metadata['date_scraped']}")
     lines.append(f"word_count: {metadata['word_count']}")
     lines.append(f"image_count: {metadata['image_count']}")
+    if metadata.get('image_bytes_original') is not None:
+        lines.append(f"image_bytes_original: {metadata['image_bytes_original']}")
+        lines.append(f"image_bytes_optimized: {metadata['image_bytes_optimized']}")
     lines.append("---")
     return "\n".join(lines)
 
@@ -223,20 +306,39 @@ def is_url(source: str) -> bool:
     return bool(parsed.scheme and parsed.netloc)
 
 
-def fetch_article(url: str) -> Tuple[str, str]:
-    """Fetch the article from the URL."""
+def create_session(pool_size: int = 10, scheduler: Optional[HostScheduler] = None) -> requests.Session:
+    """Create an HTTP session whose keep-alive connections are shared across fetches.
+
+    With a scheduler, every request waits for its host's robots.txt Crawl-delay / Request-rate slot.
+    """
+    session = requests.Session()
+    session.headers['User-Agent'] = USER_AGENT
+    if scheduler:
+        adapter = ScheduledAdapter(scheduler, pool_connections=pool_size, pool_maxsize=pool_size)
+    else:
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def fetch_article(url: str, session: Optional[requests.Session] = None, cache: Optional[HTTPCache] = None) -> Tuple[str, str]:
+    """Fetch the article from the URL, revalidating against the cache when one is given."""
     headers = {
-        'User-Agent': 'Mozilla/5.0 (compatible; article-to-md/1.0)'
+        'User-Agent': USER_AGENT
     }
     
-    response = requests.get(url, headers=headers, timeout=30)
+    if cache:
+        response = cache.get(url, session, headers=headers, timeout=30)
+    else:
+        response = (session or requests).get(url, headers=headers, timeout=30)
     response.raise_for_status()
     
     return response.text, response.url
 
 
-def read_local_html(file_path: str) -> Tuple[str, Path]:
-    """Read HTML content from a local file."""
+def read_local_html(file_path: str) -> Tuple[str, Union[Path, Bundle]]:
+    """Read HTML content from a local file, or the page inside an html_downloader bundle."""
     path = Path(file_path).resolve()  # Convert to absolute path
     if not path.exists():
         raise FileNotFoundError(f"File not found: {file_path}")
@@ -244,97 +346,541 @@ def read_local_html(file_path: str) -> Tuple[str, Path]:
     if not path.is_file():
         raise ValueError(f"Path is not a file: {file_path}")
     
+    if is_bundle(path):
+        # Return the page and the bundle itself, which its images are read from
+        try:
+            bundle = Bundle(path)
+            return bundle.read_text(BUNDLE_HTML), bundle
+        except (KeyError, zipfile.BadZipFile) as e:
+            raise ValueError(f"Not a valid bundle: {file_path}") from e
+    
     html_content = path.read_text(encoding='utf-8')
     # Return content and the parent folder for image handling
     return html_content, path.parent
 
 
+def convert_source(source: str, output_dir: str, session: Optional[requests.Session] = None,
+                   cache: Optional[HTTPCache] = None, robots: Optional[RobotsCache] = None,
+                   store: Optional[ImageStore] = None, max_image_bytes: Optional[int] = DEFAULT_MAX_IMAGE_BYTES,
+                   optimize: Optional[Dict[str, Any]] = None, force: bool = False,
+                   duplicates: Optional['NearDuplicateIndex'] = None, allow_duplicates: bool = False,
+                   catalog: Optional[Catalog] = None, verbose: bool = True,
+                   metrics: Optional[Metrics] = None,
+                   prune_rules: Iterable[str] = DEFAULT_PRUNE_RULES) -> Dict[str, Any]:
+    """Run the fetch, extract and convert pipeline for one source. Returns a result summary.
+
+    ``optimize`` enables the image optimization stage with the given ``optimize_images`` options
+    (max_width, image_format, workers).
+
+    If the source was converted before from the same HTML with the same extractor version, and its output is
+    intact, the conversion is skipped unless ``force`` is set.
+
+    With a ``duplicates`` index, an article whose text nearly matches one already converted from another
+    source is skipped before any image is downloaded, and the result points at the existing copy
+    (``duplicate_of``). ``allow_duplicates`` converts it anyway.
+
+    With a ``catalog``, the written article is upserted into it. Each stage is timed as an event in ``metrics``.
+
+    Nodes matched by ``prune_rules`` are removed from the parsed page before readability scores it (see
+    ``ParsedDocument.prune``).
+
+    Raises requests.RequestException, FileNotFoundError or ValueError when the source cannot be converted.
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    metrics = metrics or NO_METRICS
+    started = time.perf_counter()
+    prune_rules = tuple(prune_rules)
+    is_source_url = is_url(source)
+    
+    # Only check robots.txt for URLs
+    if is_source_url and not check_robots_txt(source, robots):
+        raise ValueError(f"robots.txt disallows fetching {source}")
+    
+    if is_source_url:
+        log(f"Fetching article from {source}...")
+        with metrics.timed("fetch", host=urlparse(source).netloc, url=source) as event:
+            html_content, final_url = fetch_article(source, session, cache)
+            event['bytes_in'] = len(html_content.encode('utf-8'))
+        source_folder = None
+    else:
+        log(f"Reading HTML file from {source}...")
+        with metrics.timed("read", url=source) as event:
+            html_content, source_folder = read_local_html(source)
+            event['bytes_in'] = len(html_content.encode('utf-8'))
+        final_url = source  # Use the file path as the source URL for metadata
+    
+    # Image optimization settings change the output, so they are part of the pipeline version
+    pipeline = EXTRACTOR_VERSION
+    if optimize is not None:
+        from image_optimizer import DEFAULT_MAX_WIDTH
+        pipeline += f"; optimized {optimize.get('max_width', DEFAULT_MAX_WIDTH)}px {optimize.get('image_format', 'keep')}"
+    # Pruning can change what readability extracts, so the rules in force are part of it too
+    pipeline += f"; {prune_version(prune_rules)}"
+    
+    raw_html_sha256 = html_digest(html_content)
+    previous = None if force else find_manifest(Path(output_dir), source)
+    if previous and is_current(previous[0], previous[1], raw_html_sha256, pipeline):
+        folder, manifest = previous
+        log("Source unchanged since last conversion, skipping...")
+        metrics.emit("page", time.perf_counter() - started, url=source, skipped=True)
+        return {
+            'source': source,
+            'markdown_file': folder / manifest['output'],
+            'folder': folder,
+            'skipped': True,
+            **manifest['summary'],
+        }
+    
+    with metrics.timed("parse"):
+        page = ParsedDocument(html_content)
+        if not validate_html(page):
+            raise ValueError("Invalid HTML content")
+    
+    # Extract article date while the page is whole: pruning and readability change the shared tree
+    with metrics.timed("metadata"):
+        article_date = extract_article_date(page)
+    
+    if prune_rules:
+        with metrics.timed("prune") as event:
+            pruning = page.prune(prune_rules)
+            event.update(bytes_in=pruning['bytes'], bytes_removed=pruning['bytes_removed'])
+        log(f"Pruned {pruning['bytes_removed']:,} of {pruning['bytes']:,} bytes before extraction")
+    
+    log("Extracting article content...")
+    with metrics.timed("readability") as event:
+        article_html, title = extract_article(page, final_url if is_source_url else "")
+        if not article_html:
+            raise ValueError("Could not extract article content")
+        event['chars'] = len(article_html)
+    
+    article = ParsedDocument(article_html, parser='html.parser')
+    
+    signature = None
+    collection = str(Path(output_dir).resolve())
+    if duplicates is not None:
+        from near_duplicates import minhash
+        signature = minhash(article.get_text())
+        matches = [] if allow_duplicates else duplicates.find(collection, signature, exclude_key=source)
+        matches = [match for match in matches if Path(match[1]).exists()]
+        if matches:
+            original, location, score = matches[0]
+            log(f"Near-duplicate of {original} ({score:.0%} similar), skipping...")
+            metrics.emit("page", time.perf_counter() - started, url=source, skipped=True, duplicate_of=original)
+            return {
+                'source': source,
+                'markdown_file': Path(location),
+                'folder': Path(location).parent,
+                'skipped': True,
+                'duplicate_of': original,
+                'similarity': score,
+                'title': title,
+                'word_count': count_words(article.get_text()),
+                'image_count': 0,
+            }
+    
+    kebab_title = create_kebab_case(title)
+    dest_folder = Path(output_dir) / kebab_title
+    dest_folder.mkdir(parents=True, exist_ok=True)
+    
+    if is_source_url:
+        log("Converting to markdown and downloading images...")
+        markdown_content, image_count = convert_to_markdown(article, final_url, dest_folder, session=session, cache=cache, store=store,
+                                                            max_image_bytes=max_image_bytes, metrics=metrics)
+    else:
+        log("Converting to markdown and copying images...")
+        markdown_content, image_count = convert_to_markdown(article, "", dest_folder, True, source_folder, store=store,
+                                                            metrics=metrics)
+    
+    optimization = None
+    if optimize is not None and image_count:
+        from image_optimizer import markdown_image_names, optimize_images, rename_markdown_images
+        log("Optimizing images...")
+        with metrics.timed("optimize") as event:
+            optimization = optimize_images(dest_folder / "images", store=store,
+                                           names=markdown_image_names(markdown_content), **optimize)
+            event.update(original_bytes=optimization['original_bytes'],
+                         optimized_bytes=optimization['optimized_bytes'])
+        markdown_content = rename_markdown_images(markdown_content, optimization['renamed'])
+    
+    # Extract text for word count (strip HTML tags)
+    word_count = count_words(article.get_text())
+    
+    # Prepare metadata
+    metadata = {
+        'title': title,
+        'source_url': source,
+        'article_date': article_date,
+        'date_scraped': datetime.now().strftime('%Y-%m-%d'),
+        'word_count': word_count,
+        'image_count': image_count
+    }
+    if optimization:
+        metadata['image_bytes_original'] = optimization['original_bytes']
+        metadata['image_bytes_optimized'] = optimization['optimized_bytes']
+    
+    # Format the final markdown with metadata and title
+    metadata_text = format_metadata(metadata)
+    final_markdown = f"{metadata_text}\n\n# {title}\n\n{markdown_content}"
+    
+    markdown_file = dest_folder / "article.md"
+    with metrics.timed("write") as event:
+        markdown_file.write_text(final_markdown, encoding='utf-8')
+        event['bytes_out'] = markdown_file.stat().st_size
+    
+    summary = {'title': title, 'word_count': word_count, 'image_count': image_count}
+    if optimization:
+        summary['image_bytes_original'] = optimization['original_bytes']
+        summary['image_bytes_optimized'] = optimization['optimized_bytes']
+    validators = cache.validators(source) if cache and is_source_url else {}
+    write_manifest(dest_folder, source, final_url, validators, raw_html_sha256, pipeline,
+                   markdown_file.name, summary)
+    if duplicates is not None:
+        duplicates.add(collection, source, str(markdown_file), signature)
+    if catalog is not None:
+        catalog.upsert(make_record(markdown_file, 'markdown', metadata))
+    metrics.emit("page", time.perf_counter() - started, url=source, skipped=False, **summary)
+    
+    return {
+        'source': source,
+        'markdown_file': markdown_file,
+        'folder': dest_folder,
+        'skipped': False,
+        **summary,
+    }
+
+
+def read_batch_sources(batch_file: str) -> List[str]:
+    """Read one URL or HTML path per line from a file, or from stdin when given '-'.
+
+    Blank lines and lines starting with '#' are ignored; duplicates keep their first position.
+    """
+    if batch_file == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        lines = Path(batch_file).read_text(encoding='utf-8').splitlines()
+    
+    sources = [line.strip() for line in lines]
+    sources = [source for source in sources if source and not source.startswith('#')]
+    return list(dict.fromkeys(sources))
+
+
+def run_batch(sources: List[str], output_dir: str, workers: int = 4, cache: Optional[HTTPCache] = None,
+              store: Optional[ImageStore] = None, max_image_bytes: Optional[int] = DEFAULT_MAX_IMAGE_BYTES,
+              optimize: Optional[Dict[str, Any]] = None, force: bool = False,
+              duplicates: Optional['NearDuplicateIndex'] = None, allow_duplicates: bool = False,
+              catalog: Optional[Catalog] = None, metrics: Optional[Metrics] = None,
+              prune_rules: Iterable[str] = DEFAULT_PRUNE_RULES) -> List[Dict[str, Any]]:
+    """Convert many sources concurrently over one shared session. Results follow input order."""
+    robots = RobotsCache()
+    session = create_session(pool_size=workers, scheduler=HostScheduler(robots))
+    results: List[Optional[Dict[str, Any]]] = [None] * len(sources)
+    
+    def convert_one(source: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            result = convert_source(source, output_dir, session=session, cache=cache, robots=robots, store=store,
+                                    max_image_bytes=max_image_bytes, optimize=optimize, force=force,
+                                    duplicates=duplicates, allow_duplicates=allow_duplicates, catalog=catalog,
+                                    verbose=False, metrics=metrics, prune_rules=prune_rules)
+            result['ok'] = True
+        except Exception as e:
+            result = {'source': source, 'ok': False, 'error': str(e)}
+        result['seconds'] = time.perf_counter() - started
+        return result
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(convert_one, source): i for i, source in enumerate(sources)}
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results[futures[future]] = result
+            status = batch_status(result)
+            print(f"[{done}/{len(sources)}] {status} {result['source']} ({result['seconds']:.1f}s)")
+    
+    session.close()
+    return results
+
+
+def batch_status(result: Dict[str, Any]) -> str:
+    if not result['ok']:
+        return "✗"
+    if 'duplicate_of' in result:
+        return "≈"
+    return "↺" if result['skipped'] else "✓"
+
+
+def print_batch_summary(results: List[Dict[str, Any]]) -> None:
+    """Print one line per batch item followed by overall totals."""
+    succeeded = [result for result in results if result['ok']]
+    
+    print("\nBatch summary:")
+    for result in results:
+        if result['ok'] and 'duplicate_of' in result:
+            print(f"≈ {result['source']}")
+            print(f"    → Near-duplicate of {result['duplicate_of']} ({result['similarity']:.0%} similar), "
+                  f"see {result['markdown_file']}")
+        elif result['ok'] and result['skipped']:
+            print(f"↺ {result['source']}")
+            print(f"    → {result['markdown_file']} (unchanged, skipped)")
+        elif result['ok']:
+            print(f"✓ {result['source']}")
+            print(f"    → {result['markdown_file']} ({result['word_count']} words, {result['image_count']} images)")
+        else:
+            print(f"✗ {result['source']}")
+            print(f"    → Error: {result['error']}")
+    
+    duplicated = [result for result in succeeded if 'duplicate_of' in result]
+    skipped = [result for result in succeeded if result['skipped'] and 'duplicate_of' not in result]
+    print(f"\n{len(succeeded)}/{len(results)} converted ({len(skipped)} unchanged, {len(duplicated)} duplicates), "
+          f"{sum(result['word_count'] for result in succeeded)} words, "
+          f"{sum(result['image_count'] for result in succeeded)} images")
+
+
+def watch_html(folder: str, output_dir: str, store: Optional[ImageStore] = None,
+               max_image_bytes: Optional[int] = DEFAULT_MAX_IMAGE_BYTES,
+               optimize: Optional[Dict[str, Any]] = None, duplicates: Optional['NearDuplicateIndex'] = None,
+               allow_duplicates: bool = False, catalog: Optional[Catalog] = None,
+               metrics: Optional[Metrics] = None, prune_rules: Iterable[str] = DEFAULT_PRUNE_RULES) -> None:
+    """Re-convert local HTML files under ``folder`` whenever they or their images change, until interrupted.
+
+    The Prometheus textfile of ``metrics`` is rewritten after every change.
+    """
+    metrics = metrics or NO_METRICS
+    from watching import watch
+    
+    def accept(path: Path) -> bool:
+        return path.suffix.lower() in ('.html', '.htm') or is_bundle(path) or path.parent.name == "images"
+    
+    def on_change(paths: List[Path]) -> None:
+        # An edited page is re-converted if its HTML changed; a changed image forces its page to be re-converted
+        sources: Dict[Path, bool] = {}
+        for path in paths:
+            if path.parent.name == "images":
+                for page in sorted(path.parent.parent.glob('*.htm*')):
+                    sources[page] = True
+            else:
+                sources.setdefault(path, False)
+        
+        for page, force in sources.items():
+            started = time.monotonic()
+            source = os.path.relpath(page)
+            try:
+                result = convert_source(source, output_dir, store=store, max_image_bytes=max_image_bytes,
+                                        optimize=optimize, force=force, duplicates=duplicates,
+                                        allow_duplicates=allow_duplicates, catalog=catalog, verbose=False,
+                                        metrics=metrics, prune_rules=prune_rules)
+            except Exception as e:
+                print(f"✗ {source}: {e}")
+                continue
+            if 'duplicate_of' in result:
+                print(f"≈ {source}: near-duplicate of {result['duplicate_of']}, skipped")
+                continue
+            if result['skipped']:
+                continue
+            print(f"✓ {source} → {result['markdown_file']} ({time.monotonic() - started:.2f}s)")
+        metrics.write_prometheus()
+    
+    print(f"Watching {folder} for changes (Ctrl+C to stop)...")
+    watch([Path(folder)], on_change, accept)
+
+
 def main():
     """Main function to convert web article or local HTML file to markdown."""
+    from image_optimizer import DEFAULT_MAX_WIDTH, check_pillow
+    from near_duplicates import NearDuplicateIndex
+    
     parser = argparse.ArgumentParser(
         description="Convert web articles or local HTML files to markdown format"
     )
     parser.add_argument(
         "source",
-        help="URL of the article to convert or path to local HTML file"
+        nargs="?",
+        help="URL of the article to convert, or path to a local HTML file or html_downloader bundle"
     )
     parser.add_argument(
         "--output-dir",
         default="markdown",
         help="Base output directory (default: markdown)"
     )
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="Convert every URL or HTML path listed in FILE, one per line ('-' reads stdin)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of sources converted concurrently in batch mode (default: 4)"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=str(DEFAULT_CACHE_DIR),
+        help=f"Directory for the HTTP cache shared with html_downloader (default: {DEFAULT_CACHE_DIR})"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always download pages and images instead of revalidating cached copies"
+    )
+    parser.add_argument(
+        "--image-store",
+        default=str(DEFAULT_STORE_DIR),
+        help=f"Content-addressed store that article images are linked from (default: {DEFAULT_STORE_DIR})"
+    )
+    parser.add_argument(
+        "--max-image-bytes",
+        type=int,
+        default=DEFAULT_MAX_IMAGE_BYTES,
+        help=f"Skip images larger than this many bytes, 0 for no limit (default: {DEFAULT_MAX_IMAGE_BYTES})"
+    )
+    parser.add_argument(
+        "--optimize-images",
+        action="store_true",
+        help="Recompress and downsize downloaded images (requires Pillow)"
+    )
+    parser.add_argument(
+        "--max-image-width",
+        type=int,
+        default=DEFAULT_MAX_WIDTH,
+        help=f"Downsize optimized images wider than this many pixels (default: {DEFAULT_MAX_WIDTH})"
+    )
+    parser.add_argument(
+        "--image-format",
+        choices=["keep", "webp", "avif"],
+        default="keep",
+        help="Convert optimized images to this format (default: keep)"
+    )
+    parser.add_argument(
+        "--optimize-workers",
+        type=int,
+        help="Processes used for image optimization (default: one per CPU)"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Convert again even if the source is unchanged since the last run"
+    )
+    parser.add_argument(
+        "--allow-duplicates",
+        action="store_true",
+        help="Convert articles even if a near-duplicate from another source was already converted"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and re-convert local HTML files in the source folder (default: html) when they change"
+    )
+    parser.add_argument(
+        "--prune",
+        action="append",
+        metavar="RULE",
+        help=f"Prune nodes matching RULE before extraction, replacing the default rules; a rule name "
+             f"({', '.join(PRUNE_RULES)}) or an XPath expression, repeatable (default: {', '.join(DEFAULT_PRUNE_RULES)})"
+    )
+    parser.add_argument(
+        "--no-prune",
+        action="store_true",
+        help="Hand the whole page to readability without pruning it first"
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="FILE",
+        help="Append a JSON line per stage (timings, bytes, image counts) to FILE"
+    )
+    parser.add_argument(
+        "--prometheus",
+        metavar="FILE",
+        help="Write the run's stage totals to FILE for the Prometheus textfile collector"
+    )
     
     args = parser.parse_args()
     
-    is_source_url = is_url(args.source)
+    cache = None if args.no_cache else HTTPCache(Path(args.cache_dir))
+    store = ImageStore(Path(args.image_store))
+    duplicates = NearDuplicateIndex()
+    catalog = Catalog()
+    metrics = Metrics("article_to_md", args.metrics, args.prometheus)
     
-    # Only check robots.txt for URLs
-    if is_source_url and not check_robots_txt(args.source):
-        print(f"Error: robots.txt disallows fetching {args.source}", file=sys.stderr)
+    prune_rules = () if args.no_prune else tuple(args.prune or DEFAULT_PRUNE_RULES)
+    try:
+        resolve_prune_rules(prune_rules)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
     
-    try:
-        if is_source_url:
-            print(f"Fetching article from {args.source}...")
-            html_content, final_url = fetch_article(args.source)
-            source_folder = None
-        else:
-            print(f"Reading HTML file from {args.source}...")
-            html_content, source_folder = read_local_html(args.source)
-            final_url = args.source  # Use the file path as the source URL for metadata
-        
-        if not validate_html(html_content):
-            print("Error: Invalid HTML content", file=sys.stderr)
+    optimize = None
+    if args.optimize_images:
+        try:
+            check_pillow(args.image_format)
+        except RuntimeError as e:
+            print(f"Error: {e}", file=sys.stderr)
             sys.exit(1)
-        
-        print("Extracting article content...")
-        article_html, title = extract_article(html_content, final_url if is_source_url else "")
-        
-        if not article_html:
-            print("Error: Could not extract article content", file=sys.stderr)
+        optimize = {'max_width': args.max_image_width, 'image_format': args.image_format,
+                    'workers': args.optimize_workers}
+    
+    if args.watch:
+        folder = args.source or "html"
+        if not Path(folder).is_dir():
+            print(f"Error: Folder not found: {folder}", file=sys.stderr)
+            sys.exit(1)
+        try:
+            watch_html(folder, args.output_dir, store, args.max_image_bytes or None, optimize, duplicates,
+                       args.allow_duplicates, catalog, metrics, prune_rules)
+        finally:
+            metrics.close()
+        return
+    
+    if args.batch:
+        if args.workers < 1:
+            parser.error("--workers must be at least 1")
+        try:
+            sources = read_batch_sources(args.batch)
+        except OSError as e:
+            print(f"Error: {e}", file=sys.stderr)
             sys.exit(1)
         
-        # Extract article date
-        article_date = extract_article_date(html_content)
-        
-        kebab_title = create_kebab_case(title)
-        dest_folder = Path(args.output_dir) / kebab_title
-        dest_folder.mkdir(parents=True, exist_ok=True)
-        
-        if is_source_url:
-            print(f"Converting to markdown and downloading images...")
-            markdown_content, image_count = convert_to_markdown(article_html, final_url, dest_folder)
-        else:
-            print(f"Converting to markdown and copying images...")
-            markdown_content, image_count = convert_to_markdown(article_html, "", dest_folder, True, source_folder)
+        if not sources:
+            print("Error: No sources found in batch input", file=sys.stderr)
+            sys.exit(1)
         
-        # Extract text for word count (strip HTML tags)
-        text_soup = BeautifulSoup(article_html, 'html.parser')
-        text_content = text_soup.get_text()
-        word_count = count_words(text_content)
+        print(f"Converting {len(sources)} sources with {args.workers} workers...")
+        results = run_batch(sources, args.output_dir, args.workers, cache, store, args.max_image_bytes or None,
+                            optimize, args.force, duplicates, args.allow_duplicates, catalog, metrics, prune_rules)
+        metrics.close()
+        print_batch_summary(results)
         
-        # Prepare metadata
-        metadata = {
-            'title': title,
-            'source_url': args.source,
-            'article_date': article_date,
-            'date_scraped': datetime.now().strftime('%Y-%m-%d'),
-            'word_count': word_count,
-            'image_count': image_count
-        }
+        if not all(result['ok'] for result in results):
+            sys.exit(1)
+        return
+    
+    if not args.source:
+        parser.error("a source is required unless --batch is given")
+    
+    try:
+        robots = RobotsCache()
+        session = create_session(scheduler=HostScheduler(robots))
+        result = convert_source(args.source, args.output_dir, session=session, cache=cache, robots=robots,
+                                store=store, max_image_bytes=args.max_image_bytes or None, optimize=optimize,
+                                force=args.force, duplicates=duplicates, allow_duplicates=args.allow_duplicates,
+                                catalog=catalog, metrics=metrics, prune_rules=prune_rules)
         
-        # Format the final markdown with metadata and title
-        metadata_text = format_metadata(metadata)
-        final_markdown = f"{metadata_text}\n\n# {title}\n\n{markdown_content}"
+        if 'duplicate_of' in result:
+            print(f"✓ Near-duplicate of {result['duplicate_of']} ({result['similarity']:.0%} similar), "
+                  f"already converted to {result['markdown_file']}")
+            print("  Use --allow-duplicates to convert it anyway")
+            return
         
-        markdown_file = dest_folder / "article.md"
-        markdown_file.write_text(final_markdown, encoding='utf-8')
+        if result['skipped']:
+            print(f"✓ Unchanged since last run: {result['markdown_file']} (use --force to convert again)")
+            return
         
-        print(f"✓ Article saved to {markdown_file}")
-        print(f"✓ Title: {title}")
-        print(f"✓ Word count: {word_count}")
-        print(f"✓ Images: {image_count}")
-        print(f"✓ Folder: {dest_folder}")
+        print(f"✓ Article saved to {result['markdown_file']}")
+        print(f"✓ Title: {result['title']}")
+        print(f"✓ Word count: {result['word_count']}")
+        print(f"✓ Images: {result['image_count']}")
+        if 'image_bytes_original' in result:
+            print(f"✓ Image bytes: {result['image_bytes_original']:,} → {result['image_bytes_optimized']:,}")
+        print(f"✓ Folder: {result['folder']}")
         
     except (requests.RequestException, FileNotFoundError, ValueError) as e:
         print(f"Error: {e}", file=sys.stderr)
@@ -342,6 +888,8 @@ def main():
     except Exception as e:
         print(f"Unexpected error: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        metrics.close()
 
 
 if __name__ == "__main__":
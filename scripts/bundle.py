@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Single-file bundles of html_downloader archives: the page, its images and its manifest in one file.
+
+A bundle is an ordinary zip file. Its central directory indexes every member by name, offset and size, so
+the page or one image is read by seeking straight to it, without unpacking the rest. Images are stored as
+they are (they are compressed already) and text members are deflated.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+BUNDLE_SUFFIX = ".html.zip"
+BUNDLE_HTML = "index.html"
+
+# Members deflated when packed; everything else is stored uncompressed
+TEXT_SUFFIXES = ('.html', '.htm', '.json', '.svg', '.txt')
+
+
+def is_bundle(path: Union[str, Path]) -> bool:
+    """True if ``path`` names a bundle rather than an archive folder or HTML file."""
+    return str(path).lower().endswith(BUNDLE_SUFFIX)
+
+
+def bundle_path_for(folder: Path) -> Path:
+    """The bundle that packs ``folder``, next to it: ``html/<title>`` becomes ``html/<title>.html.zip``."""
+    folder = Path(folder)
+    return folder.with_name(folder.name + BUNDLE_SUFFIX)
+
+
+def pack_folder(folder: Path, bundle_path: Optional[Path] = None) -> Path:
+    """Write an archive folder and its images folder to a bundle, next to the folder by default.
+
+    The bundle is written to a temporary file and moved into place, so a reader never sees a partial one.
+    Returns the bundle path.
+    """
+    folder = Path(folder)
+    bundle_path = Path(bundle_path) if bundle_path else bundle_path_for(folder)
+    members = [path for path in sorted(folder.rglob("*"))
+               if path.is_file() and not path.name.startswith('.')]
+
+    temp_path = bundle_path.with_name(f".{bundle_path.name}.{os.getpid()}.part")
+    try:
+        with zipfile.ZipFile(temp_path, 'w') as archive:
+            for path in members:
+                compression = zipfile.ZIP_DEFLATED if path.suffix.lower() in TEXT_SUFFIXES else zipfile.ZIP_STORED
+                archive.write(path, path.relative_to(folder).as_posix(), compress_type=compression)
+        os.replace(temp_path, bundle_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+    return bundle_path
+
+
+class Bundle:
+    """Random access to the members of a bundle.
+
+    The central directory is read once, when the bundle is opened. Each ``read`` then seeks to that one
+    member and decompresses only it, and holds no file handle afterwards, so a Bundle can be passed around
+    and shared by threads without being closed.
+
+    Raises OSError if the file cannot be read and zipfile.BadZipFile if it is not a bundle.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with zipfile.ZipFile(self.path) as archive:
+            self._members: Dict[str, zipfile.ZipInfo] = {
+                info.filename: info for info in archive.infolist() if not info.is_dir()}
+
+    def names(self) -> List[str]:
+        return list(self._members)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._members
+
+    def size(self, name: str) -> int:
+        """Uncompressed size of a member. Raises KeyError if the bundle has no such member."""
+        return self._members[name].file_size
+
+    def read(self, name: str) -> bytes:
+        """The contents of one member. Raises KeyError if the bundle has no such member."""
+        info = self._members[name]
+        with zipfile.ZipFile(self.path) as archive:
+            return archive.read(info)
+
+    def read_text(self, name: str = BUNDLE_HTML) -> str:
+        return self.read(name).decode('utf-8', errors='replace')
+
+    def extract(self, dest_folder: Path) -> Path:
+        """Unpack every member into ``dest_folder``, recreating the archive folder. Returns the folder."""
+        dest_folder = Path(dest_folder)
+        with zipfile.ZipFile(self.path) as archive:
+            archive.extractall(dest_folder)
+        return dest_folder
+
+
+def main():
+    """Pack archive folders into bundles, unpack bundles, or read single members."""
+    parser = argparse.ArgumentParser(
+        description="Single-file bundles of html_downloader archives"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    pack_parser = subparsers.add_parser("pack", help="Pack archive folders into bundles next to them")
+    pack_parser.add_argument("folders", nargs="+", help="Archive folders, e.g. html/<title>")
+    pack_parser.add_argument("--remove", action="store_true", help="Delete each folder once it is bundled")
+
+    unpack_parser = subparsers.add_parser("unpack", help="Unpack a bundle into an archive folder")
+    unpack_parser.add_argument("bundle", help="Bundle file")
+    unpack_parser.add_argument("-o", "--output", help="Folder to unpack into (default: the bundle name without "
+                                                      f"{BUNDLE_SUFFIX})")
+
+    list_parser = subparsers.add_parser("list", help="List the members of a bundle")
+    list_parser.add_argument("bundle", help="Bundle file")
+
+    cat_parser = subparsers.add_parser("cat", help="Write one member of a bundle to stdout")
+    cat_parser.add_argument("bundle", help="Bundle file")
+    cat_parser.add_argument("member", nargs="?", default=BUNDLE_HTML,
+                            help=f"Member name (default: {BUNDLE_HTML})")
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "pack":
+            for folder in map(Path, args.folders):
+                if not (folder / BUNDLE_HTML).is_file():
+                    print(f"Error: Not an archive folder: {folder}", file=sys.stderr)
+                    sys.exit(1)
+                bundle_path = pack_folder(folder)
+                if args.remove:
+                    shutil.rmtree(folder)
+                print(f"✓ Packed {folder} into {bundle_path} ({bundle_path.stat().st_size:,} bytes)")
+            return
+
+        bundle = Bundle(Path(args.bundle))
+        if args.command == "unpack":
+            name = bundle.path.name
+            output = Path(args.output) if args.output else bundle.path.with_name(
+                name[:-len(BUNDLE_SUFFIX)] if is_bundle(name) else f"{name}.d")
+            bundle.extract(output)
+            print(f"✓ Unpacked {len(bundle.names())} files into {output}")
+        elif args.command == "list":
+            for name in bundle.names():
+                print(f"{bundle.size(name):>12,}  {name}")
+        else:
+            sys.stdout.buffer.write(bundle.read(args.member))
+    except KeyError:
+        print(f"Error: {args.bundle} has no member {args.member}", file=sys.stderr)
+        sys.exit(1)
+    except (OSError, zipfile.BadZipFile) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
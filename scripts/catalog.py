@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""SQLite catalog of archived documents, kept current by the scripts and queryable by date, domain and size."""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import zipfile
+from contextlib import contextmanager
+from datetime import date, datetime
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlparse
+
+from bundle import BUNDLE_HTML, BUNDLE_SUFFIX, Bundle, is_bundle
+from corpus import split_frontmatter
+from manifest import load_manifest
+from parsed_document import ParsedDocument
+
+DEFAULT_CATALOG_DB = Path(".cache") / "catalog.sqlite"
+
+# Output folders (and html_downloader bundles) written by article_to_md and html_downloader, relative to the
+# project root
+CATALOG_PATTERNS = {
+    'markdown': ("markdown/*/article.md",),
+    'html': ("html/*/index.html", f"html/*{BUNDLE_SUFFIX}"),
+}
+
+COLUMNS = ('path', 'kind', 'title', 'source_url', 'domain', 'article_date', 'date_scraped', 'author',
+           'word_count', 'image_count', 'bytes', 'mtime_ns', 'size')
+UPSERT_SQL = f"INSERT OR REPLACE INTO documents ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+ISO_DATE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+DATE_FORMATS = ("%B %d, %Y", "%b %d, %Y", "%d %B %Y", "%d %b %Y", "%Y/%m/%d", "%m/%d/%Y")
+
+
+def normalize_date(value: Any) -> Optional[str]:
+    """``YYYY-MM-DD`` for the date formats pages commonly publish, or None if it cannot be read."""
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m-%d')
+    if not value:
+        return None
+    text = str(value).strip()
+    match = ISO_DATE.match(text)
+    if match:
+        return "-".join(match.groups())
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+    try:
+        return parsedate_to_datetime(text).strftime('%Y-%m-%d')
+    except (TypeError, ValueError):
+        return None
+
+
+def source_domain(url: str) -> str:
+    """Host name of ``url`` without a leading ``www.``, or an empty string for local paths."""
+    host = urlparse(url).netloc.lower() if url and urlparse(url).scheme in ('http', 'https') else ''
+    return host[4:] if host.startswith('www.') else host
+
+
+def archived_url(path: str) -> str:
+    """The original URL recorded in an html_downloader archive, so conversions of it keep their domain."""
+    try:
+        if is_bundle(path):
+            text = Bundle(path).read_text(BUNDLE_HTML)
+        else:
+            text = Path(path).read_text(encoding='utf-8', errors='replace')
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return ''
+    head = text.split("</head>", 1)[0]
+    meta = ParsedDocument(head).soup.find('meta', attrs={'name': 'source-url'})
+    return meta.get('content', '') if meta else ''
+
+
+def folder_bytes(folder: Path) -> int:
+    """Total size of the files in an output folder and its images folder."""
+    total = 0
+    for directory in (folder, folder / "images"):
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        total += sum(entry.stat().st_size for entry in entries if entry.is_file())
+    return total
+
+
+def make_record(path: Path, kind: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Catalog row for an output file from the metadata it was written with."""
+    path = Path(path).resolve()
+    stat = path.stat()
+    source_url = str(metadata.get('source_url') or '')
+    domain = source_domain(source_url)
+    if not domain and source_url.lower().endswith(('.html', '.htm', BUNDLE_SUFFIX)):
+        domain = source_domain(archived_url(source_url))
+    return {
+        'path': str(path),
+        'kind': kind,
+        'title': str(metadata.get('title') or ''),
+        'source_url': source_url,
+        'domain': domain,
+        'article_date': normalize_date(metadata.get('article_date')),
+        'date_scraped': normalize_date(metadata.get('date_scraped')),
+        'author': str(metadata.get('author') or ''),
+        'word_count': int(metadata.get('word_count') or 0),
+        'image_count': int(metadata.get('image_count') or 0),
+        'bytes': stat.st_size if is_bundle(path) else folder_bytes(path.parent),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+    }
+
+
+def read_record(path: Path, kind: str) -> Dict[str, Any]:
+    """Catalog row for an existing output file or bundle, read back from its frontmatter or meta tags."""
+    path = Path(path)
+    if kind == 'markdown':
+        metadata, _ = split_frontmatter(path.read_text(encoding='utf-8', errors='replace'))
+        return make_record(path, kind, metadata)
+
+    if is_bundle(path):
+        bundle = Bundle(path)
+        text = bundle.read_text(BUNDLE_HTML)
+        summary = (load_manifest(path) or {}).get('summary', {})
+        image_total = sum(1 for name in bundle.names() if name.startswith("images/"))
+    else:
+        text = path.read_text(encoding='utf-8', errors='replace')
+        summary = (load_manifest(path.parent) or {}).get('summary', {})
+        images_folder = path.parent / "images"
+        image_total = sum(1 for _ in images_folder.iterdir()) if images_folder.is_dir() else 0
+
+    page = ParsedDocument(text)
+    soup = page.soup
+    metadata = {meta['name']: meta.get('content', '') for meta in soup.find_all('meta', attrs={'name': True})}
+    title_tag = soup.find('title')
+    return make_record(path, kind, {
+        'title': summary.get('title') or (title_tag.get_text().strip() if title_tag else ''),
+        'source_url': metadata.get('source-url', ''),
+        'article_date': metadata.get('article-date'),
+        'date_scraped': metadata.get('date-scraped'),
+        'author': metadata.get('author', ''),
+        'word_count': summary.get('word_count', len(page.get_text().split())),
+        'image_count': summary.get('image_count', image_total),
+    })
+
+
+class Catalog:
+    """One row per archived document in SQLite, indexed on the columns listings filter and sort by.
+
+    article_to_md and html_downloader upsert a row as they write each output, and ``backfill`` covers
+    anything archived before the catalog existed, so listing the archive never has to read it.
+    """
+
+    def __init__(self, path: Path = DEFAULT_CATALOG_DB):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """One connection per operation, so the catalog can be shared by batch worker threads."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        try:
+            with self._lock, connection:
+                self._initialize(connection)
+                yield connection
+        finally:
+            connection.close()
+
+    def _initialize(self, connection: sqlite3.Connection) -> None:
+        if not self._initialized:
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    path TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    source_url TEXT NOT NULL,
+                    domain TEXT NOT NULL,
+                    article_date TEXT,
+                    date_scraped TEXT,
+                    author TEXT NOT NULL,
+                    word_count INTEGER NOT NULL,
+                    image_count INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS documents_date ON documents (COALESCE(article_date, date_scraped));
+                CREATE INDEX IF NOT EXISTS documents_domain ON documents (domain);
+                CREATE INDEX IF NOT EXISTS documents_words ON documents (word_count);
+                CREATE INDEX IF NOT EXISTS documents_images ON documents (image_count);
+            """)
+            self._initialized = True
+
+    def upsert(self, record: Dict[str, Any]) -> None:
+        """Insert or replace the row for ``record['path']``."""
+        with self._transaction() as connection:
+            connection.execute(UPSERT_SQL, [record[column] for column in COLUMNS])
+
+    def backfill(self, root: Path = Path("."), kinds: Iterable[str] = tuple(CATALOG_PATTERNS)) -> Dict[str, int]:
+        """Catalog the existing output folders under ``root``, re-reading only files that changed.
+
+        Rows for files under ``root`` that no longer exist are removed. Returns counts of documents
+        added, updated, removed and unchanged.
+        """
+        root = Path(root).resolve()
+        kinds = list(kinds)
+        stats = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+        with self._transaction() as connection:
+            known = {row['path']: (row['mtime_ns'], row['size']) for row in connection.execute(
+                "SELECT path, mtime_ns, size FROM documents WHERE kind IN (%s)" % ', '.join('?' * len(kinds)),
+                kinds)}
+
+        records = []
+        for kind in kinds:
+            paths = sorted({path for pattern in CATALOG_PATTERNS[kind] for path in root.glob(pattern)})
+            for path in paths:
+                key = str(path)
+                stat = path.stat()
+                previous = known.pop(key, None)
+                if previous == (stat.st_mtime_ns, stat.st_size):
+                    stats['unchanged'] += 1
+                    continue
+                records.append(read_record(path, kind))
+                stats['updated' if previous else 'added'] += 1
+
+        removed = [path for path in known if Path(path).is_relative_to(root)]
+        stats['removed'] = len(removed)
+        with self._transaction() as connection:
+            connection.executemany(
+                UPSERT_SQL,
+                [[record[column] for column in COLUMNS] for record in records])
+            connection.executemany("DELETE FROM documents WHERE path = ?", [(path,) for path in removed])
+        return stats
+
+    def query(self, since: Optional[str] = None, until: Optional[str] = None, domain: Optional[str] = None,
+              kind: Optional[str] = None, min_words: Optional[int] = None, max_words: Optional[int] = None,
+              min_images: Optional[int] = None, max_images: Optional[int] = None,
+              min_bytes: Optional[int] = None, max_bytes: Optional[int] = None,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Documents matching every given filter, newest first.
+
+        Dates are ``YYYY-MM-DD`` and match the publication date, or the scrape date when a page gave none.
+        ``domain`` also matches its subdomains.
+        """
+        clauses = []
+        params: List[Any] = []
+        if since:
+            clauses.append("COALESCE(article_date, date_scraped) >= ?")
+            params.append(since)
+        if until:
+            clauses.append("COALESCE(article_date, date_scraped) <= ?")
+            params.append(until)
+        if domain:
+            domain = source_domain(f"https://{domain}") or domain.lower()
+            clauses.append("(domain = ? OR domain LIKE ?)")
+            params.extend([domain, f"%.{domain}"])
+        if kind:
+            clauses.append("kind = ?")
+            params.append(kind)
+        for column, low, high in (('word_count', min_words, max_words), ('image_count', min_images, max_images),
+                                  ('bytes', min_bytes, max_bytes)):
+            if low is not None:
+                clauses.append(f"{column} >= ?")
+                params.append(low)
+            if high is not None:
+                clauses.append(f"{column} <= ?")
+                params.append(high)
+
+        sql = "SELECT * FROM documents"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY COALESCE(article_date, date_scraped) DESC, title"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._transaction() as connection:
+            return [dict(row) for row in connection.execute(sql, params)]
+
+
+def date_argument(value: str) -> str:
+    normalized = normalize_date(value)
+    if not normalized:
+        raise argparse.ArgumentTypeError(f"not a date: {value}")
+    return normalized
+
+
+def format_bytes(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def main():
+    """Backfill the catalog or list the documents in it."""
+    parser = argparse.ArgumentParser(
+        description="Catalog of archived markdown and HTML documents, filterable by date, domain and size"
+    )
+    parser.add_argument(
+        "--db",
+        default=str(DEFAULT_CATALOG_DB),
+        help=f"Catalog database (default: {DEFAULT_CATALOG_DB})"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    backfill_parser = subparsers.add_parser("backfill",
+                                            help="Catalog documents and bundles already in markdown/ and html/")
+    backfill_parser.add_argument("--root", default=".",
+                                 help="Project root containing the output folders (default: current directory)")
+
+    list_parser = subparsers.add_parser("list", help="List catalogued documents, newest first")
+    list_parser.add_argument("--since", type=date_argument, help="Published (or scraped) on or after this date")
+    list_parser.add_argument("--until", type=date_argument, help="Published (or scraped) on or before this date")
+    list_parser.add_argument("--domain", help="Source domain, including its subdomains")
+    list_parser.add_argument("--kind", choices=list(CATALOG_PATTERNS), help="Only markdown or only HTML archives")
+    list_parser.add_argument("--min-words", type=int, help="At least this many words")
+    list_parser.add_argument("--max-words", type=int, help="At most this many words")
+    list_parser.add_argument("--min-images", type=int, help="At least this many images")
+    list_parser.add_argument("--max-images", type=int, help="At most this many images")
+    list_parser.add_argument("--min-bytes", type=int, help="Output folder of at least this many bytes")
+    list_parser.add_argument("--max-bytes", type=int, help="Output folder of at most this many bytes")
+    list_parser.add_argument("-n", "--limit", type=int, help="Show at most this many documents")
+    list_parser.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    args = parser.parse_args()
+    catalog = Catalog(Path(args.db))
+
+    if args.command == "backfill":
+        stats = catalog.backfill(Path(args.root))
+        print(f"✓ Catalogued {stats['added']} new, {stats['updated']} changed, {stats['removed']} removed, "
+              f"{stats['unchanged']} unchanged documents")
+        return
+
+    documents = catalog.query(since=args.since, until=args.until, domain=args.domain, kind=args.kind,
+                              min_words=args.min_words, max_words=args.max_words,
+                              min_images=args.min_images, max_images=args.max_images,
+                              min_bytes=args.min_bytes, max_bytes=args.max_bytes, limit=args.limit)
+    if args.json:
+        print(json.dumps(documents, indent=2, ensure_ascii=False))
+        return
+    if not documents:
+        print("No matching documents")
+        sys.exit(1)
+    for document in documents:
+        published = document['article_date'] or f"{document['date_scraped'] or '?'} (scraped)"
+        print(f"{published}  {document['title']}")
+        print(f"   {document['domain'] or 'local'} · {document['word_count']:,} words · "
+              f"{document['image_count']} images · {format_bytes(document['bytes'])}")
+        print(f"   {os.path.relpath(document['path'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""Split corpus documents into token-budgeted chunks with stable IDs, cached per document content hash."""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+from bundle import is_bundle
+from corpus import discover_documents, load_document
+from image_store import file_digest
+
+DEFAULT_CHUNK_DIR = Path(".cache") / "chunks"
+DEFAULT_BUDGET = 1000
+CHUNK_FORMAT = 2
+
+# Rough size of a token in English prose; estimates err on the high side for code and tables
+CHARS_PER_TOKEN = 4
+
+# A heading line that would leave less than this share of the budget for its section's text gets a chunk of its own
+MIN_TEXT_SHARE = 0.25
+
+# Finer and finer boundaries tried when a piece of text is over budget: paragraphs, lines, sentences, words
+SPLITS = [
+    (re.compile(r"\n\s*\n"), "\n\n"),
+    (re.compile(r"\n"), "\n"),
+    (re.compile(r"(?<=[.!?])\s+"), " "),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimated token count of ``text``."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def split_text(text: str, budget: int, level: int = 0) -> List[str]:
+    """Cut ``text`` into pieces within ``budget`` tokens, at the coarsest boundary that gets them there."""
+    if estimate_tokens(text) <= budget:
+        return [text]
+    if level == len(SPLITS):
+        # A single word longer than the budget, so cut it by characters
+        width = max(budget, 1) * CHARS_PER_TOKEN
+        return [text[start:start + width] for start in range(0, len(text), width)]
+
+    pattern, joiner = SPLITS[level]
+    pieces: List[str] = []
+    current = ""
+    for part in pattern.split(text):
+        if not part.strip():
+            continue
+        candidate = f"{current}{joiner}{part}" if current else part
+        if estimate_tokens(candidate) <= budget:
+            current = candidate
+            continue
+        if current:
+            pieces.append(current)
+        current = ""
+        if estimate_tokens(part) <= budget:
+            current = part
+        else:
+            pieces.extend(split_text(part, budget, level + 1))
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_document(document: Dict[str, Any], budget: int = DEFAULT_BUDGET) -> List[Dict[str, Any]]:
+    """Pack a loaded document's sections into chunks of at most ``budget`` estimated tokens.
+
+    Chunks break at section boundaries where they can; consecutive short sections share a chunk, and a
+    section over budget is split at paragraphs, then lines, sentences and words. Each chunk carries the
+    heading path it starts under, and a section starting inside a chunk keeps its heading line. A heading
+    too long to share a chunk with any useful amount of text is emitted as a chunk of its own.
+    """
+    chunks: List[Dict[str, Any]] = []
+    current: List[str] = []
+    current_heading = ""
+
+    def flush():
+        if current:
+            text = "\n\n".join(current)
+            chunks.append({'heading': current_heading, 'tokens': estimate_tokens(text), 'text': text})
+            current.clear()
+
+    for section in document['sections']:
+        heading = section['heading']
+        titles = heading.split(" > ") if heading else []
+        heading_line = f"{'#' * min(len(titles), 6)} {titles[-1]}" if titles else ""
+        text_budget = budget - estimate_tokens(heading_line) - 1 if heading_line else budget
+        if text_budget < budget * MIN_TEXT_SHARE:
+            pieces = split_text(heading_line, budget)
+            if section['text'].strip():
+                pieces += split_text(section['text'], budget)
+            heading_line = ""
+        else:
+            pieces = split_text(section['text'], text_budget)
+
+        for position, piece in enumerate(pieces):
+            if position == 0 and heading_line:
+                piece = f"{heading_line}\n\n{piece}"
+            if current and estimate_tokens("\n\n".join(current + [piece])) > budget:
+                flush()
+            if not current:
+                current_heading = heading
+            current.append(piece)
+    flush()
+
+    # Digests hash the chunk content, so editing one part of a document leaves the other chunks' digests alone
+    seen: Dict[str, int] = {}
+    for index, chunk in enumerate(chunks):
+        digest = hashlib.blake2b(f"{chunk['heading']}\n{chunk['text']}".encode('utf-8'), digest_size=8).hexdigest()
+        seen[digest] = seen.get(digest, 0) + 1
+        chunk['digest'] = digest if seen[digest] == 1 else f"{digest}-{seen[digest]}"
+        chunk['index'] = index
+    return [{key: chunk[key] for key in ('digest', 'index', 'heading', 'tokens', 'text')} for chunk in chunks]
+
+
+def chunk_id(path: Path, root: Path, digest: str) -> str:
+    """Stable ID of a chunk: the same content in the same document always gets the same ID.
+
+    The document is named by its path relative to the project ``root``, so the ID does not depend on the
+    directory the chunker runs from. Documents outside the root are named by their absolute path.
+    """
+    path = Path(path).resolve()
+    try:
+        name = path.relative_to(Path(root).resolve()).as_posix()
+    except ValueError:
+        name = path.as_posix()
+    key = f"{name}\n{digest}"
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=6).hexdigest()
+
+
+class ChunkCache:
+    """Chunks of each document stored as JSON under the SHA-256 of its content and the token budget.
+
+    Unchanged documents are served from the cache without being parsed, so only new and edited documents
+    are chunked again.
+    """
+
+    def __init__(self, cache_dir: Path = DEFAULT_CHUNK_DIR, budget: int = DEFAULT_BUDGET):
+        self.cache_dir = Path(cache_dir)
+        self.budget = budget
+        self.stats = {'cached': 0, 'chunked': 0}
+
+    def _entry_path(self, digest: str) -> Path:
+        return self.cache_dir / f"{digest}.{self.budget}.json"
+
+    def chunks(self, path: Path, root: Path = Path(".")) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """Document summary (path, title, sha256, tokens) and chunks of the file at ``path``.
+
+        Entries are shared by files with the same content, so chunk IDs, which include the path relative to
+        ``root``, are added here.
+        """
+        path = Path(path)
+        digest = file_digest(path)
+        entry_path = self._entry_path(digest)
+        try:
+            entry = json.loads(entry_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            entry = {}
+
+        if entry.get('format') == CHUNK_FORMAT:
+            self.stats['cached'] += 1
+        else:
+            document = load_document(path)
+            entry = {'format': CHUNK_FORMAT, 'title': document['title'],
+                     'chunks': chunk_document(document, self.budget)}
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            temp_path = entry_path.with_name(f".{entry_path.name}.part")
+            temp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding='utf-8')
+            os.replace(temp_path, entry_path)
+            self.stats['chunked'] += 1
+
+        summary = {'path': str(path), 'title': entry['title'], 'sha256': digest,
+                   'tokens': sum(chunk['tokens'] for chunk in entry['chunks'])}
+        return summary, [{'id': chunk_id(path, root, chunk['digest']), **chunk} for chunk in entry['chunks']]
+
+    def prune(self, keep: Iterable[str]) -> int:
+        """Delete cached entries for content hashes not in ``keep``. Returns the number removed."""
+        keep = set(keep)
+        removed = 0
+        for entry_path in self.cache_dir.glob("*.json"):
+            if entry_path.name.split(".", 1)[0] not in keep:
+                entry_path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+def collect_documents(paths: List[str], root: Path = Path(".")) -> List[Path]:
+    """Files named on the command line (folders expand to their markdown, HTML and bundles), or the whole corpus."""
+    if not paths:
+        return discover_documents(root)
+    documents = []
+    for name in paths:
+        path = Path(name)
+        if path.is_dir():
+            documents.extend(sorted(found for found in path.rglob("*")
+                                    if (found.suffix.lower() in ('.md', '.html', '.htm') or is_bundle(found))
+                                    and found.is_file()))
+        elif path.is_file():
+            documents.append(path)
+        else:
+            raise FileNotFoundError(f"File not found: {name}")
+    return list(dict.fromkeys(documents))
+
+
+def chunk_all(cache: ChunkCache, documents: List[Path], root: Path = Path("."), prune: bool = False
+              ) -> List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """Chunk every document under project ``root`` through the cache, optionally dropping unused cache entries."""
+    results = [cache.chunks(path, root) for path in documents]
+    if prune:
+        cache.prune(summary['sha256'] for summary, _ in results)
+    return results
+
+
+def main():
+    """Export, list or show chunks of corpus documents."""
+    parser = argparse.ArgumentParser(
+        description="Split corpus documents into chunks under a token budget for use as LLM context"
+    )
+    parser.add_argument(
+        "--budget",
+        type=int,
+        default=DEFAULT_BUDGET,
+        help=f"Maximum estimated tokens per chunk (default: {DEFAULT_BUDGET})"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=str(DEFAULT_CHUNK_DIR),
+        help=f"Directory for cached chunks (default: {DEFAULT_CHUNK_DIR})"
+    )
+    parser.add_argument(
+        "--root",
+        default=".",
+        help="Project root containing the corpus folders (default: current directory)"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write every chunk as a line of JSON")
+    export_parser.add_argument("paths", nargs="*", help="Documents or folders (default: the whole corpus)")
+    export_parser.add_argument("-o", "--output", help="Write to this file instead of stdout")
+
+    toc_parser = subparsers.add_parser("toc", help="List chunk IDs, headings and token counts without the text")
+    toc_parser.add_argument("paths", nargs="*", help="Documents or folders (default: the whole corpus)")
+    toc_parser.add_argument("--json", action="store_true", help="Print the listing as JSON")
+
+    show_parser = subparsers.add_parser("show", help="Print the text of chunks by ID")
+    show_parser.add_argument("ids", nargs="+", help="Chunk IDs from 'toc' or 'export'")
+    show_parser.add_argument("--paths", nargs="*", default=[], help="Only look in these documents or folders")
+
+    args = parser.parse_args()
+    if args.budget < 50:
+        parser.error("--budget must be at least 50 tokens")
+
+    cache = ChunkCache(Path(args.cache_dir), args.budget)
+    paths = args.paths
+    root = Path(args.root)
+    try:
+        documents = collect_documents(paths, root)
+    except FileNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    results = chunk_all(cache, documents, root, prune=not paths)
+
+    if args.command == "export":
+        out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        try:
+            for summary, chunks in results:
+                for chunk in chunks:
+                    record = {'id': chunk['id'], 'path': summary['path'], 'title': summary['title'], **chunk}
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        finally:
+            if args.output:
+                out.close()
+        total = sum(len(chunks) for _, chunks in results)
+        print(f"✓ {total} chunks from {len(results)} documents "
+              f"({cache.stats['chunked']} chunked, {cache.stats['cached']} from cache)", file=sys.stderr)
+
+    elif args.command == "toc":
+        if args.json:
+            listing = [{**summary, 'chunks': [{key: chunk[key] for key in ('id', 'heading', 'tokens')}
+                                              for chunk in chunks]} for summary, chunks in results]
+            print(json.dumps(listing, indent=2, ensure_ascii=False))
+            return
+        for summary, chunks in results:
+            print(f"{summary['path']} — {summary['title']} ({summary['tokens']:,} tokens, {len(chunks)} chunks)")
+            for chunk in chunks:
+                print(f"  {chunk['id']:<15} {chunk['tokens']:>6,}  {chunk['heading'] or '(top)'}")
+
+    else:
+        wanted = list(dict.fromkeys(args.ids))
+        found = {}
+        for summary, chunks in results:
+            for chunk in chunks:
+                if chunk['id'] in wanted and chunk['id'] not in found:
+                    found[chunk['id']] = (summary, chunk)
+        missing = [chunk_id for chunk_id in wanted if chunk_id not in found]
+        for chunk_id in wanted:
+            if chunk_id in found:
+                summary, chunk = found[chunk_id]
+                location = summary['path'] + (f" § {chunk['heading']}" if chunk['heading'] else "")
+                print(f"<!-- chunk {chunk_id} · {location} · {chunk['tokens']:,} tokens -->")
+                print(chunk['text'])
+                print()
+        if missing:
+            print(f"Error: Unknown chunk IDs: {', '.join(missing)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Discovery, loading and tokenization of the documents that make up the research corpus."""
+
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from markdownify import MarkdownConverter
+
+from bundle import BUNDLE_HTML, BUNDLE_SUFFIX, Bundle, is_bundle
+from parsed_document import ParsedDocument
+
+# Documents that make up the corpus, relative to the project root
+CORPUS_PATTERNS = [
+    "markdown/*/article.md",
+    "transcripts/**/*.md",
+    "companies/**/*.md",
+    "html/*/index.html",
+    f"html/*{BUNDLE_SUFFIX}",
+    "projects/**/*.md",
+]
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+
+STOPWORDS = frozenset("""
+a about after all also an and any are as at be been but by can could did do does for from had has have how
+i if in into is it its just more most no not of on or our so such than that the their them then there these
+they this those to up was we were what when which while who will with would you your
+""".split())
+
+
+def discover_documents(root: Path = Path(".")) -> List[Path]:
+    """Every corpus document under ``root``, in a stable order."""
+    root = Path(root)
+    found = set()
+    for pattern in CORPUS_PATTERNS:
+        found.update(path for path in root.glob(pattern) if path.is_file())
+    return sorted(found)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords removed."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def split_frontmatter(text: str) -> Tuple[Dict[str, Any], str]:
+    """Separate YAML frontmatter (as written by article_to_md) from the markdown body."""
+    if text.startswith("---\n"):
+        # Imported here because catalog, and through it the converters, import this module but rarely parse
+        # frontmatter
+        import yaml
+        end = text.find("\n---", 4)
+        if end != -1:
+            try:
+                frontmatter = yaml.safe_load(text[4:end]) or {}
+            except yaml.YAMLError:
+                frontmatter = {}
+            if isinstance(frontmatter, dict):
+                return frontmatter, text[end + 4:].lstrip("\n")
+    return {}, text
+
+
+def markdown_sections(body: str) -> List[Dict[str, str]]:
+    """Split markdown into sections, each with the path of headings it sits under."""
+    sections = []
+    headings: List[Tuple[int, str]] = []
+    lines: List[str] = []
+    in_code = False
+
+    def flush():
+        text = "\n".join(lines).strip()
+        if text:
+            sections.append({'heading': " > ".join(title for _, title in headings), 'text': text})
+        lines.clear()
+
+    for line in body.splitlines():
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+        match = None if in_code else HEADING_PATTERN.match(line)
+        if match:
+            flush()
+            level = len(match.group(1))
+            headings = [(lvl, title) for lvl, title in headings if lvl < level]
+            headings.append((level, match.group(2).strip('*_ ')))
+        else:
+            lines.append(line)
+    flush()
+    return sections
+
+
+def load_document(path: Path) -> Dict[str, Any]:
+    """Read a corpus document into its title and heading-scoped sections."""
+    path = Path(path)
+    if is_bundle(path):
+        text = Bundle(path).read_text(BUNDLE_HTML)
+    else:
+        text = path.read_text(encoding='utf-8', errors='replace')
+
+    if path.suffix.lower() in ('.html', '.htm') or is_bundle(path):
+        page = ParsedDocument(text)
+        title_tag = page.soup.find('title')
+        title = title_tag.get_text().strip() if title_tag else ''
+        body = page.soup.body or page.soup
+        for tag in body.find_all(['script', 'style', 'nav', 'footer']):
+            tag.decompose()
+        sections = markdown_sections(MarkdownConverter(heading_style="ATX").convert_soup(body))
+    else:
+        frontmatter, body = split_frontmatter(text)
+        title = str(frontmatter.get('title') or '')
+        sections = markdown_sections(body)
+
+    if not title:
+        first_heading = next((s['heading'] for s in sections if s['heading']), '')
+        title = first_heading.split(" > ")[0] or path.stem
+    return {'path': str(path), 'title': title, 'sections': sections}
+
+
+def document_text(document: Dict[str, Any]) -> str:
+    """Full searchable text of a loaded document, headings included."""
+    parts = [document['title']]
+    for section in document['sections']:
+        if section['heading']:
+            parts.append(section['heading'].split(" > ")[-1])
+        parts.append(section['text'])
+    return "\n".join(parts)
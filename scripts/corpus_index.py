@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""Persistent BM25 full-text index over the corpus, with array-backed posting lists."""
+
+import argparse
+import heapq
+import json
+import math
+import os
+import re
+import sys
+from array import array
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from corpus import discover_documents, document_text, load_document, tokenize
+from image_store import file_digest
+
+DEFAULT_INDEX_DIR = Path(".cache") / "corpus"
+INDEX_FORMAT = 1
+
+# Standard BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def _read_array(data: bytes, swap: bool) -> array:
+    values = array('I')
+    values.frombytes(data)
+    if swap:
+        values.byteswap()
+    return values
+
+
+def make_snippet(document: Dict[str, Any], terms: List[str], width: int = 240) -> Tuple[str, str]:
+    """Pick the section that matches the query terms best and cut a snippet around the first match.
+
+    Returns the section's heading path and the snippet.
+    """
+    sections = document['sections'] or [{'heading': '', 'text': document['title']}]
+    pattern = re.compile(r'\b(?:' + '|'.join(map(re.escape, terms)) + r')\b', re.IGNORECASE) if terms else None
+
+    def hits(section: Dict[str, str]) -> int:
+        return len(pattern.findall(section['heading'] + " " + section['text'])) if pattern else 0
+
+    best = max(sections, key=hits)
+    text = " ".join(best['text'].split())
+    match = pattern.search(text) if pattern else None
+    start = max(0, match.start() - width // 3) if match else 0
+    if start:
+        start = text.find(" ", start) + 1 or start
+    snippet = text[start:start + width]
+    if start + width < len(text):
+        snippet = snippet.rsplit(" ", 1)[0] + "…"
+    if start:
+        snippet = "…" + snippet
+    return best['heading'], snippet
+
+
+class CorpusIndex:
+    """BM25 index stored as a JSON lexicon plus two binary files of unsigned 32-bit arrays.
+
+    ``postings`` holds, for each term, the ids of the documents containing it followed by the term's
+    frequency in each. ``vectors`` holds each document's term ids and frequencies, so an update re-reads
+    only documents whose mtime and content hash changed and rebuilds the postings from the stored vectors.
+    """
+
+    def __init__(self, index_dir: Path = DEFAULT_INDEX_DIR):
+        self.index_dir = Path(index_dir)
+        self._meta: Optional[Dict[str, Any]] = None
+        self._term_ids: Optional[Dict[str, int]] = None
+
+    @property
+    def meta_path(self) -> Path:
+        return self.index_dir / "index.json"
+
+    def load(self) -> Dict[str, Any]:
+        """The index metadata, or an empty dict when there is no usable index."""
+        if self._meta is None:
+            try:
+                meta = json.loads(self.meta_path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                meta = {}
+            self._meta = meta if meta.get('format') == INDEX_FORMAT else {}
+            self._term_ids = None
+        return self._meta
+
+    def _data_path(self, kind: str, generation: int) -> Path:
+        return self.index_dir / f"{kind}.{generation}.bin"
+
+    def _old_vectors(self, meta: Dict[str, Any]) -> Dict[str, Counter]:
+        """Term frequencies of every indexed document, read back from the vectors file."""
+        if not meta:
+            return {}
+        try:
+            data = self._data_path("vectors", meta['generation']).read_bytes()
+        except OSError:
+            return {}
+        swap = meta['byteorder'] != sys.byteorder
+        vocab = meta['vocab']
+        vectors = {}
+        for doc in meta['docs']:
+            offset, count = doc['vector']
+            term_ids = _read_array(data[offset:offset + 4 * count], swap)
+            tfs = _read_array(data[offset + 4 * count:offset + 8 * count], swap)
+            vectors[doc['path']] = Counter({vocab[term_id]: tf for term_id, tf in zip(term_ids, tfs)})
+        return vectors
+
+    def update(self, root: Path = Path(".")) -> Dict[str, int]:
+        """Bring the index up to date with the corpus under ``root``.
+
+        Returns counts of documents added, updated, removed and unchanged.
+        """
+        meta = self.load()
+        old_docs = {doc['path']: doc for doc in meta.get('docs', [])}
+        old_vectors = None
+        stats = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+
+        docs = []
+        vectors = []
+        for path in discover_documents(root):
+            key = str(path)
+            stat = path.stat()
+            previous = old_docs.pop(key, None)
+            unchanged = previous and previous['mtime_ns'] == stat.st_mtime_ns and previous['size'] == stat.st_size
+            digest = previous['sha256'] if unchanged else file_digest(path)
+
+            if previous and digest == previous['sha256']:
+                if old_vectors is None:
+                    old_vectors = self._old_vectors(meta)
+                if key in old_vectors:
+                    stats['unchanged'] += 1
+                    docs.append({**previous, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size})
+                    vectors.append(old_vectors[key])
+                    continue
+
+            document = load_document(path)
+            counts = Counter(tokenize(document_text(document)))
+            stats['updated' if previous else 'added'] += 1
+            docs.append({'path': key, 'title': document['title'], 'mtime_ns': stat.st_mtime_ns,
+                         'size': stat.st_size, 'sha256': digest, 'length': sum(counts.values())})
+            vectors.append(counts)
+        stats['removed'] = len(old_docs)
+
+        if meta and not (stats['added'] or stats['updated'] or stats['removed']):
+            if any(doc['mtime_ns'] != old['mtime_ns'] for doc, old in zip(docs, meta['docs'])):
+                meta['docs'] = docs
+                self._write_meta(meta)
+            return stats
+
+        self._write(docs, vectors, meta.get('generation', 0) + 1)
+        return stats
+
+    def _write(self, docs: List[Dict[str, Any]], vectors: List[Counter], generation: int) -> None:
+        vocab = sorted({term for counts in vectors for term in counts})
+        term_ids = {term: term_id for term_id, term in enumerate(vocab)}
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+
+        postings_docs: Dict[int, array] = defaultdict(lambda: array('I'))
+        postings_tfs: Dict[int, array] = defaultdict(lambda: array('I'))
+        with open(self._data_path("vectors", generation), 'wb') as f:
+            for doc_id, (doc, counts) in enumerate(zip(docs, vectors)):
+                ids = array('I', sorted(term_ids[term] for term in counts))
+                tfs = array('I', (counts[vocab[term_id]] for term_id in ids))
+                doc['vector'] = [f.tell(), len(ids)]
+                ids.tofile(f)
+                tfs.tofile(f)
+                for term_id, tf in zip(ids, tfs):
+                    postings_docs[term_id].append(doc_id)
+                    postings_tfs[term_id].append(tf)
+
+        postings = []
+        with open(self._data_path("postings", generation), 'wb') as f:
+            for term_id in range(len(vocab)):
+                postings.append([f.tell(), len(postings_docs[term_id])])
+                postings_docs[term_id].tofile(f)
+                postings_tfs[term_id].tofile(f)
+
+        previous = self.load().get('generation')
+        self._write_meta({
+            'format': INDEX_FORMAT,
+            'generation': generation,
+            'byteorder': sys.byteorder,
+            'total_length': sum(doc['length'] for doc in docs),
+            'docs': docs,
+            'vocab': vocab,
+            'postings': postings,
+        })
+        if previous is not None and previous != generation:
+            for kind in ("vectors", "postings"):
+                self._data_path(kind, previous).unlink(missing_ok=True)
+
+    def _write_meta(self, meta: Dict[str, Any]) -> None:
+        temp_path = self.meta_path.with_name(f"{self.meta_path.name}.part")
+        temp_path.write_text(json.dumps(meta, separators=(',', ':')), encoding='utf-8')
+        os.replace(temp_path, self.meta_path)
+        self._meta = meta
+        self._term_ids = None
+
+    def search(self, query: str, k: int = 10, snippets: bool = True) -> List[Dict[str, Any]]:
+        """Rank documents against ``query`` with BM25. Each hit has path, title, score, heading and snippet."""
+        meta = self.load()
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not meta or not meta['docs'] or not terms:
+            return []
+
+        if self._term_ids is None:
+            self._term_ids = {term: term_id for term_id, term in enumerate(meta['vocab'])}
+        docs = meta['docs']
+        total_docs = len(docs)
+        average_length = meta['total_length'] / total_docs or 1
+        swap = meta['byteorder'] != sys.byteorder
+
+        scores: Dict[int, float] = defaultdict(float)
+        with open(self._data_path("postings", meta['generation']), 'rb') as f:
+            for term in terms:
+                term_id = self._term_ids.get(term)
+                if term_id is None:
+                    continue
+                offset, df = meta['postings'][term_id]
+                f.seek(offset)
+                data = f.read(8 * df)
+                doc_ids = _read_array(data[:4 * df], swap)
+                tfs = _read_array(data[4 * df:], swap)
+                idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+                for doc_id, tf in zip(doc_ids, tfs):
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * docs[doc_id]['length'] / average_length)
+                    scores[doc_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        hits = []
+        for doc_id, score in heapq.nlargest(k, scores.items(), key=lambda item: item[1]):
+            doc = docs[doc_id]
+            hit = {'path': doc['path'], 'title': doc['title'], 'score': round(score, 4)}
+            if snippets:
+                try:
+                    hit['heading'], hit['snippet'] = make_snippet(load_document(Path(doc['path'])), terms)
+                except OSError:
+                    hit['heading'], hit['snippet'] = '', ''
+            hits.append(hit)
+        return hits
+
+
+def main():
+    """Update the corpus index or search it."""
+    parser = argparse.ArgumentParser(
+        description="BM25 full-text search over markdown, transcripts, companies, html and projects"
+    )
+    parser.add_argument(
+        "--index-dir",
+        default=str(DEFAULT_INDEX_DIR),
+        help=f"Directory holding the index (default: {DEFAULT_INDEX_DIR})"
+    )
+    parser.add_argument(
+        "--root",
+        default=".",
+        help="Project root containing the corpus folders (default: current directory)"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("update", help="Index new and changed documents and drop removed ones")
+
+    search_parser = subparsers.add_parser("search", help="Search the corpus")
+    search_parser.add_argument("query", help="Search terms")
+    search_parser.add_argument("-k", "--limit", type=int, default=10, help="Number of results (default: 10)")
+    search_parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    search_parser.add_argument("--no-update", action="store_true",
+                               help="Search the index as it is instead of updating it first")
+
+    args = parser.parse_args()
+    index = CorpusIndex(Path(args.index_dir))
+
+    if args.command == "update" or not args.no_update:
+        stats = index.update(Path(args.root))
+        if args.command == "update":
+            print(f"✓ Indexed {stats['added']} new, {stats['updated']} changed, {stats['removed']} removed, "
+                  f"{stats['unchanged']} unchanged documents")
+            return
+
+    hits = index.search(args.query, args.limit)
+    if args.json:
+        print(json.dumps(hits, indent=2, ensure_ascii=False))
+        return
+    if not hits:
+        print("No matching documents")
+        sys.exit(1)
+    for rank, hit in enumerate(hits, 1):
+        print(f"{rank}. {hit['title']} ({hit['score']:.2f})")
+        print(f"   {hit['path']}" + (f" § {hit['heading']}" if hit['heading'] else ""))
+        print(f"   {hit['snippet']}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,46 +4,59 @@
 import argparse
 import os
 import re
+import shutil
 import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from html import unescape
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple, Union
 from urllib.parse import urljoin, urlparse
-from urllib.robotparser import RobotFileParser
 import urllib.parse
 
+import lxml.etree
+import lxml.html
 import requests
-from bs4 import BeautifulSoup, Comment
 from readability import Document
+from requests.adapters import HTTPAdapter
 
+from bundle import is_bundle, pack_folder
+from catalog import Catalog, make_record
+from http_cache import DEFAULT_CACHE_DIR, HTTPCache
+from image_store import DEFAULT_STORE_DIR, ImageStore, stable_image_name
+from manifest import archive_output, find_manifest, html_digest, is_current, pipeline_version, write_manifest
+from metrics import NO_METRICS, Metrics
+from parsed_document import DEFAULT_PRUNE_RULES, PRUNE_RULES, ParsedDocument, prune_version, resolve_prune_rules
+from robots_cache import HostScheduler, RobotsCache, ScheduledAdapter
 
-def check_robots_txt(url: str) -> bool:
-    """Check if the URL is allowed according to robots.txt."""
-    parsed_url = urlparse(url)
-    robots_url = f"{parsed_url.scheme}://{parsed_url.netloc}/robots.txt"
-    
-    rp = RobotFileParser()
-    rp.set_url(robots_url)
-    
-    try:
-        rp.read()
-        return rp.can_fetch("*", url)
-    except Exception:
-        return True
+# near_duplicates (numpy) and image_optimizer are imported where they are used, so that runs which never
+# reach those stages do not pay for loading them
+if TYPE_CHECKING:
+    from near_duplicates import NearDuplicateIndex
+
+# Bump when a change to this script alters the generated archive, so archived pages are rebuilt
+EXTRACTOR_VERSION = pipeline_version("html_downloader 2", ["readability-lxml", "beautifulsoup4", "lxml"])
 
 
-def validate_html(content: str) -> bool:
+def check_robots_txt(url: str, robots: Optional[RobotsCache] = None) -> bool:
+    """Check if the URL is allowed according to robots.txt, reusing the shared per-host cache."""
+    return (robots or RobotsCache()).can_fetch(url)
+
+
+def validate_html(content: Union[str, ParsedDocument]) -> bool:
     """Validate if the content is valid HTML."""
     try:
-        soup = BeautifulSoup(content, 'html.parser')
-        return bool(soup.find())
+        return ParsedDocument.of(content).has_markup()
     except Exception:
         return False
 
 
-def extract_metadata(html_content: str, url: str) -> Dict[str, str]:
+def extract_metadata(html_content: Union[str, ParsedDocument], url: str) -> Dict[str, str]:
     """Extract comprehensive metadata from HTML."""
-    soup = BeautifulSoup(html_content, 'html.parser')
+    page = ParsedDocument.of(html_content)
     metadata = {
         'source_url': url,
         'source_domain': urlparse(url).netloc,
@@ -51,43 +64,44 @@ def extract_metadata(html_content: str, url: str) -> Dict[str, str]:
     }
     
     # Title
-    title_tag = soup.find('title')
-    metadata['title'] = title_tag.get_text().strip() if title_tag else 'Untitled'
+    title_tag = page.find('title')
+    metadata['title'] = title_tag.text_content().strip() if title_tag is not None else 'Untitled'
     
     # Meta description
-    desc_meta = soup.find('meta', attrs={'name': 'description'}) or \
-                soup.find('meta', attrs={'property': 'description'})
-    metadata['description'] = desc_meta.get('content', '').strip() if desc_meta else ''
+    desc_meta = page.find('meta', {'name': 'description'})
+    if desc_meta is None:
+        desc_meta = page.find('meta', {'property': 'description'})
+    metadata['description'] = desc_meta.get('content', '').strip() if desc_meta is not None else ''
     
     # Keywords
-    keywords_meta = soup.find('meta', attrs={'name': 'keywords'})
-    metadata['keywords'] = keywords_meta.get('content', '').strip() if keywords_meta else ''
+    keywords_meta = page.find('meta', {'name': 'keywords'})
+    metadata['keywords'] = keywords_meta.get('content', '').strip() if keywords_meta is not None else ''
     
     # OpenGraph metadata
-    og_title = soup.find('meta', property='og:title')
-    metadata['og_title'] = og_title.get('content', '').strip() if og_title else metadata['title']
+    og_title = page.find('meta', {'property': 'og:title'})
+    metadata['og_title'] = og_title.get('content', '').strip() if og_title is not None else metadata['title']
     
-    og_desc = soup.find('meta', property='og:description')
-    metadata['og_description'] = og_desc.get('content', '').strip() if og_desc else metadata['description']
+    og_desc = page.find('meta', {'property': 'og:description'})
+    metadata['og_description'] = og_desc.get('content', '').strip() if og_desc is not None else metadata['description']
     
-    og_image = soup.find('meta', property='og:image')
-    metadata['og_image'] = og_image.get('content', '').strip() if og_image else ''
+    og_image = page.find('meta', {'property': 'og:image'})
+    metadata['og_image'] = og_image.get('content', '').strip() if og_image is not None else ''
     
-    og_type = soup.find('meta', property='og:type')
-    metadata['og_type'] = og_type.get('content', 'website').strip() if og_type else 'website'
+    og_type = page.find('meta', {'property': 'og:type'})
+    metadata['og_type'] = og_type.get('content', 'website').strip() if og_type is not None else 'website'
     
     # Twitter Card metadata
-    twitter_card = soup.find('meta', attrs={'name': 'twitter:card'})
-    metadata['twitter_card'] = twitter_card.get('content', 'summary').strip() if twitter_card else 'summary'
+    twitter_card = page.find('meta', {'name': 'twitter:card'})
+    metadata['twitter_card'] = twitter_card.get('content', 'summary').strip() if twitter_card is not None else 'summary'
     
-    twitter_title = soup.find('meta', attrs={'name': 'twitter:title'})
-    metadata['twitter_title'] = twitter_title.get('content', '').strip() if twitter_title else metadata['title']
+    twitter_title = page.find('meta', {'name': 'twitter:title'})
+    metadata['twitter_title'] = twitter_title.get('content', '').strip() if twitter_title is not None else metadata['title']
     
-    twitter_desc = soup.find('meta', attrs={'name': 'twitter:description'})
-    metadata['twitter_description'] = twitter_desc.get('content', '').strip() if twitter_desc else metadata['description']
+    twitter_desc = page.find('meta', {'name': 'twitter:description'})
+    metadata['twitter_description'] = twitter_desc.get('content', '').strip() if twitter_desc is not None else metadata['description']
     
-    twitter_image = soup.find('meta', attrs={'name': 'twitter:image'})
-    metadata['twitter_image'] = twitter_image.get('content', '').strip() if twitter_image else metadata['og_image']
+    twitter_image = page.find('meta', {'name': 'twitter:image'})
+    metadata['twitter_image'] = twitter_image.get('content', '').strip() if twitter_image is not None else metadata['og_image']
     
     # Article/publication date
     date_selectors = [
@@ -101,8 +115,8 @@ def extract_metadata(html_content: str, url: str) -> Dict[str, str]:
     
     metadata['article_date'] = ''
     for tag_name, attrs in date_selectors:
-        element = soup.find(tag_name, attrs)
-        if element:
+        element = page.find(tag_name, attrs)
+        if element is not None:
             date_value = element.get('content') or element.get('datetime')
             if date_value:
                 # Clean up ISO datetime to just date
@@ -120,35 +134,33 @@ def extract_metadata(html_content: str, url: str) -> Dict[str, str]:
     
     metadata['author'] = ''
     for tag_name, attrs in author_selectors:
-        element = soup.find(tag_name, attrs)
-        if element and element.get('content'):
+        element = page.find(tag_name, attrs)
+        if element is not None and element.get('content'):
             metadata['author'] = element.get('content').strip()
             break
     
     return metadata
 
 
-def extract_main_content(html_content: str, url: str) -> Tuple[str, str]:
+def extract_main_content(html_content: Union[str, ParsedDocument], url: str) -> Tuple[str, str]:
     """Extract main article content using multiple strategies."""
-    # First try readability for content extraction
-    doc = Document(html_content, url=url)
+    page = ParsedDocument.of(html_content)
+    
+    # First try readability for content extraction, scoring the already-parsed lxml tree
+    doc = Document(page.tree, url=url)
     readability_content = doc.summary()
     readability_title = doc.title()
     
     if readability_content and len(readability_content.strip()) > 200:
         return readability_content, readability_title
     
-    # Fallback: try to find main content areas manually
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Remove unwanted elements
-    for element in soup(['script', 'style', 'nav', 'header', 'footer', 
-                        'aside', 'advertisement', 'sidebar']):
-        element.decompose()
+    # Fallback: try to find main content areas manually, pruning the shared tree in place
+    root = page.tree
+    title_tag = page.find('title')
     
-    # Remove comments
-    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
-        comment.extract()
+    # Remove unwanted elements and comments
+    lxml.etree.strip_elements(root, lxml.etree.Comment, 'script', 'style', 'nav', 'header', 'footer',
+                              'aside', 'advertisement', 'sidebar', with_tail=False)
     
     # Try common main content selectors
     main_selectors = [
@@ -167,22 +179,29 @@ def extract_main_content(html_content: str, url: str) -> Tuple[str, str]:
     ]
     
     for selector in main_selectors:
-        main_content = soup.select_one(selector)
-        if main_content and len(main_content.get_text().strip()) > 200:
-            return str(main_content), readability_title or soup.title.get_text() if soup.title else 'Untitled'
+        main_content = next(iter(root.cssselect(selector)), None)
+        if main_content is not None and len(main_content.text_content().strip()) > 200:
+            return lxml.html.tostring(main_content, encoding='unicode'), \
+                readability_title or title_tag.text_content() if title_tag is not None else 'Untitled'
     
     # Final fallback: return body content
-    body = soup.body
-    if body:
-        return str(body), readability_title or soup.title.get_text() if soup.title else 'Untitled'
+    body = root.find('body')
+    if body is not None:
+        return lxml.html.tostring(body, encoding='unicode'), \
+            readability_title or title_tag.text_content() if title_tag is not None else 'Untitled'
     
     return readability_content, readability_title
 
 
+def html_to_text(text: str) -> str:
+    """Strip tags and decode HTML entities from a short string such as a title."""
+    return unescape(re.sub(r'<[^>]*>', '', text))
+
+
 def create_kebab_case(text: str) -> str:
     """Convert text to kebab-case format."""
     # Remove HTML entities and decode
-    text = BeautifulSoup(text, 'html.parser').get_text()
+    text = html_to_text(text)
     # Remove non-alphanumeric characters except spaces and hyphens
     text = re.sub(r'[^\w\s-]', '', text.lower())
     # Replace spaces and multiple hyphens with single hyphen
@@ -193,9 +212,10 @@ def create_kebab_case(text: str) -> str:
     return text[:60] if len(text) > 60 else text
 
 
-def find_images_in_content(content: str) -> List[str]:
+def find_images_in_content(content: Union[str, ParsedDocument]) -> List[str]:
     """Find all image URLs in the content."""
-    soup = BeautifulSoup(content, 'html.parser')
+    document = ParsedDocument.of(content, parser='html.parser')
+    soup = document.soup
     image_urls = []
     
     # Find images in <img> tags
@@ -228,14 +248,37 @@ def find_images_in_content(content: str) -> List[str]:
             image_urls.append(href)
     
     # Find background images in style attributes
-    style_imgs = re.findall(r'background-image:\s*url\(["\']?([^"\']+)["\']?\)', content)
+    style_imgs = re.findall(r'background-image:\s*url\(["\']?([^"\']+)["\']?\)', document.html)
     image_urls.extend(style_imgs)
     
-    return list(set(image_urls))  # Remove duplicates
+    return list(dict.fromkeys(image_urls))  # Remove duplicates, keeping document order
+
+
+def create_session(pool_size: int = 10, scheduler: Optional[HostScheduler] = None) -> requests.Session:
+    """Create an HTTP session with keep-alive connection pools sized for concurrent downloads.
+
+    With a scheduler, every request waits for its host's robots.txt Crawl-delay / Request-rate slot.
+    """
+    session = requests.Session()
+    if scheduler:
+        adapter = ScheduledAdapter(scheduler, pool_connections=pool_size, pool_maxsize=pool_size)
+    else:
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
 
 
-def download_image(img_url: str, dest_folder: Path, base_url: str) -> Optional[str]:
-    """Download an image with proper headers and return the local filename."""
+def download_image(img_url: str, dest_folder: Path, base_url: str, session: Optional[requests.Session] = None,
+                   cache: Optional[HTTPCache] = None, store: Optional[ImageStore] = None,
+                   verbose: bool = True, metrics: Optional[Metrics] = None) -> Optional[str]:
+    """Download an image with proper headers into the image store and return the local filename.
+
+    Failures are always reported; ``verbose`` also reports each image saved. Each attempt is recorded as an
+    ``image`` event in ``metrics``.
+    """
+    metrics = metrics or NO_METRICS
+    started = time.perf_counter()
     try:
         # Make URL absolute
         if not img_url.startswith(('http://', 'https://')):
@@ -249,7 +292,10 @@ def download_image(img_url: str, dest_folder: Path, base_url: str) -> Optional[s
             'Accept-Encoding': 'gzip, deflate, br',
         }
         
-        response = requests.get(img_url, headers=headers, timeout=15, stream=True)
+        if cache:
+            response = cache.get(img_url, session, headers=headers, timeout=15)
+        else:
+            response = (session or requests).get(img_url, headers=headers, timeout=15, stream=True)
         response.raise_for_status()
         
         # Determine filename
@@ -272,28 +318,82 @@ def download_image(img_url: str, dest_folder: Path, base_url: str) -> Optional[s
             else:
                 ext = '.png'  # default
             
-            filename = f"image_{abs(hash(img_url))}{ext}"
+            filename = stable_image_name(img_url, ext)
         
         # Remove query parameters from filename
         filename = filename.split('?')[0].split('&')[0]
         
         filepath = dest_folder / filename
+        store = store or ImageStore()
         
-        with open(filepath, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        if cache:
+            store.add(response.body_path, filepath)
+        else:
+            # Write to a private temp file first so concurrent downloads sharing a filename never interleave
+            temp_path = dest_folder / f".{filename}.{threading.get_ident()}.part"
+            with open(temp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=8192):
+                    f.write(chunk)
+            store.add(temp_path, filepath, move=True)
         
-        print(f"    ✓ Downloaded {filename} ({filepath.stat().st_size} bytes)")
+        from_cache = getattr(response, 'from_cache', False)
+        size = filepath.stat().st_size
+        metrics.emit("image", time.perf_counter() - started, host=urlparse(img_url).netloc, url=img_url, ok=True,
+                     bytes_in=size, from_cache=from_cache)
+        if verbose:
+            print(f"    ✓ {'Reused cached' if from_cache else 'Downloaded'} {filename} ({size} bytes)")
         return filename
         
     except Exception as e:
+        metrics.emit("image", time.perf_counter() - started, host=urlparse(urljoin(base_url, img_url)).netloc,
+                     url=img_url, ok=False, error=str(e))
         print(f"    ✗ Failed to download {img_url}: {e}")
         return None
 
 
-def update_image_references(content: str, image_mapping: Dict[str, str], base_url: str) -> str:
-    """Update image references to point to local files."""
-    soup = BeautifulSoup(content, 'html.parser')
+def download_images(image_urls: List[str], images_folder: Path, base_url: str, max_workers: int = 8,
+                    per_host: int = 4, session: Optional[requests.Session] = None,
+                    cache: Optional[HTTPCache] = None, store: Optional[ImageStore] = None,
+                    verbose: bool = True, metrics: Optional[Metrics] = None) -> Dict[str, str]:
+    """Download images concurrently over a shared session, limiting parallel requests per host.
+
+    Returns a mapping of absolute image URL to local filename, ordered like ``image_urls``.
+    """
+    own_session = session is None
+    if own_session:
+        session = create_session(pool_size=max(max_workers, per_host))
+    
+    host_limits = defaultdict(lambda: threading.BoundedSemaphore(per_host))
+    host_limits_lock = threading.Lock()
+    
+    def fetch(img_url: str) -> Optional[str]:
+        absolute_url = urljoin(base_url, img_url)
+        with host_limits_lock:
+            host_limit = host_limits[urlparse(absolute_url).netloc]
+        with host_limit:
+            return download_image(img_url, images_folder, base_url, session, cache, store, verbose, metrics)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            local_filenames = list(executor.map(fetch, image_urls))
+    finally:
+        if own_session:
+            session.close()
+    
+    image_mapping = {}
+    for img_url, local_filename in zip(image_urls, local_filenames):
+        if local_filename:
+            # Make URL absolute for mapping
+            if not img_url.startswith(('http://', 'https://')):
+                img_url = urljoin(base_url, img_url)
+            image_mapping[img_url] = local_filename
+    
+    return image_mapping
+
+
+def update_image_references(content: Union[str, ParsedDocument], image_mapping: Dict[str, str], base_url: str) -> str:
+    """Update image references to point to local files, rewriting the document's soup in place."""
+    soup = ParsedDocument.of(content, parser='html.parser').soup
     
     # First handle regular <img> tags
     for img in soup.find_all('img'):
@@ -344,7 +444,7 @@ def generate_html_document(content: str, metadata: Dict[str, str]) -> str:
     """Generate a complete, well-formed HTML document."""
     
     # Clean the title for HTML
-    clean_title = BeautifulSoup(metadata['title'], 'html.parser').get_text()
+    clean_title = html_to_text(metadata['title'])
     
     html_template = f'''<!DOCTYPE html>
 <html lang="en">
@@ -378,6 +478,11 @@ def generate_html_document(content: str, metadata: Dict[str, str]) -> str:
         html_template += f'''
     <meta name="article-date" content="{metadata['article_date']}">'''
     
+    if metadata.get('image_bytes_original') is not None:
+        html_template += f'''
+    <meta name="image-bytes-original" content="{metadata['image_bytes_original']}">
+    <meta name="image-bytes-optimized" content="{metadata['image_bytes_optimized']}">'''
+    
     html_template += f'''
     
     <!-- OpenGraph metadata -->
@@ -533,8 +638,229 @@ def generate_html_document(content: str, metadata: Dict[str, str]) -> str:
     return html_template
 
 
+def download_page(url: str, output_dir: str = "html", session: Optional[requests.Session] = None,
+                  cache: Optional[HTTPCache] = None, robots: Optional[RobotsCache] = None,
+                  store: Optional[ImageStore] = None, max_workers: int = 8, per_host: int = 4,
+                  optimize: Optional[Dict[str, Any]] = None, force: bool = False,
+                  duplicates: Optional['NearDuplicateIndex'] = None, allow_duplicates: bool = False,
+                  catalog: Optional[Catalog] = None, verbose: bool = True,
+                  metrics: Optional[Metrics] = None, prune_rules: Iterable[str] = DEFAULT_PRUNE_RULES,
+                  bundle: bool = False) -> Dict[str, Any]:
+    """Archive one web page with its images. Returns a result summary.
+
+    With ``robots``, the page is only fetched if robots.txt allows it. ``optimize`` enables the image
+    optimization stage with the given ``optimize_images`` options (max_width, image_format, workers).
+
+    A page downloaded before from the same HTML with the same extractor version, whose archive is intact,
+    is skipped unless ``force`` is set. With a ``duplicates`` index, a page whose text nearly matches an
+    archive of another URL is skipped before any image is downloaded, and the result points at that archive
+    (``duplicate_of``); ``allow_duplicates`` archives it anyway. With a ``catalog``, the archive is upserted
+    into it. Each stage is timed as an event in ``metrics``. Nodes matched by ``prune_rules`` are removed from
+    the parsed page before readability scores it (see ``ParsedDocument.prune``).
+
+    With ``bundle``, the archive folder is packed into a single ``<title>.html.zip`` file (see ``bundle.py``)
+    and removed, and the result's ``html_file`` and ``folder`` are the bundle. An unchanged page is skipped
+    whichever form its archive takes.
+
+    Raises requests.RequestException or ValueError when the page cannot be archived.
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    metrics = metrics or NO_METRICS
+    started = time.perf_counter()
+    prune_rules = tuple(prune_rules)
+    
+    if robots and not check_robots_txt(url, robots):
+        raise ValueError(f"robots.txt disallows fetching {url}")
+    
+    # Image optimization settings change the archive, so they are part of the pipeline version
+    pipeline = EXTRACTOR_VERSION
+    if optimize is not None:
+        from image_optimizer import DEFAULT_MAX_WIDTH
+        pipeline += f"; optimized {optimize.get('max_width', DEFAULT_MAX_WIDTH)}px {optimize.get('image_format', 'keep')}"
+    # Pruning can change what readability extracts, so the rules in force are part of it too
+    pipeline += f"; {prune_version(prune_rules)}"
+    
+    log(f"🌐 Fetching page from {url}...")
+    
+    # Fetch the page with proper headers
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (compatible; html-downloader/1.0)',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5',
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+    }
+    
+    if session is None:
+        session = create_session(pool_size=max(max_workers, per_host),
+                                 scheduler=HostScheduler(robots) if robots else None)
+    with metrics.timed("fetch", host=urlparse(url).netloc, url=url) as event:
+        if cache:
+            response = cache.get(url, session, headers=headers, timeout=30)
+        else:
+            response = session.get(url, headers=headers, timeout=30)
+        response.raise_for_status()
+        html_content = response.text
+        final_url = response.url
+        event.update(bytes_in=len(html_content.encode('utf-8')), from_cache=getattr(response, 'from_cache', False))
+    
+    raw_html_sha256 = html_digest(html_content)
+    previous = None if force else find_manifest(Path(output_dir), url)
+    if previous and is_current(previous[0], previous[1], raw_html_sha256, pipeline):
+        folder, manifest = previous
+        metrics.emit("page", time.perf_counter() - started, url=url, skipped=True)
+        return {
+            'url': url,
+            'html_file': archive_output(folder, manifest),
+            'folder': folder,
+            'skipped': True,
+            **manifest['summary'],
+        }
+    
+    with metrics.timed("parse"):
+        page = ParsedDocument(html_content)
+        if not validate_html(page):
+            raise ValueError("Invalid HTML content")
+    
+    log("📊 Extracting metadata...")
+    with metrics.timed("metadata"):
+        metadata = extract_metadata(page, final_url)
+    
+    if prune_rules:
+        with metrics.timed("prune") as event:
+            pruning = page.prune(prune_rules)
+            event.update(bytes_in=pruning['bytes'], bytes_removed=pruning['bytes_removed'])
+        log(f"✂️  Pruned {pruning['bytes_removed']:,} of {pruning['bytes']:,} bytes before extraction")
+    
+    log("📖 Extracting main content...")
+    with metrics.timed("readability") as event:
+        main_content, extracted_title = extract_main_content(page, final_url)
+        if not main_content or len(main_content.strip()) < 100:
+            raise ValueError("Could not extract meaningful content")
+        event['chars'] = len(main_content)
+    
+    # Use extracted title if metadata title is generic
+    if len(metadata['title']) < 10 or metadata['title'].lower() in ['untitled', 'document']:
+        metadata['title'] = extracted_title
+    
+    # Skip pages whose text nearly matches one already archived from another URL
+    content = ParsedDocument(main_content, parser='html.parser')
+    signature = None
+    collection = str(Path(output_dir).resolve())
+    if duplicates is not None:
+        from near_duplicates import minhash
+        signature = minhash(content.get_text())
+        matches = [] if allow_duplicates else duplicates.find(collection, signature, exclude_key=url)
+        matches = [match for match in matches if Path(match[1]).exists()]
+        if matches:
+            original, location, score = matches[0]
+            metrics.emit("page", time.perf_counter() - started, url=url, skipped=True, duplicate_of=original)
+            return {
+                'url': url,
+                'html_file': Path(location),
+                'folder': Path(location) if is_bundle(location) else Path(location).parent,
+                'skipped': True,
+                'duplicate_of': original,
+                'similarity': score,
+                'title': metadata['title'],
+                'word_count': len(content.get_text().split()),
+                'image_count': 0,
+            }
+    
+    # Create destination folder
+    kebab_title = create_kebab_case(metadata['title'])
+    dest_folder = Path(output_dir) / kebab_title
+    images_folder = dest_folder / "images"
+    
+    dest_folder.mkdir(parents=True, exist_ok=True)
+    images_folder.mkdir(parents=True, exist_ok=True)
+    
+    log(f"🖼️  Finding and downloading images...")
+    
+    # Find all images in the content
+    with metrics.timed("image_discovery") as event:
+        image_urls = find_images_in_content(content)
+        event['images_found'] = len(image_urls)
+    log(f"   Found {len(image_urls)} images")
+    
+    # Download images and create mapping
+    with metrics.timed("images") as event:
+        image_mapping = download_images(image_urls, images_folder, final_url, max_workers, per_host, session, cache,
+                                        store, verbose, metrics)
+        event.update(images_downloaded=len(image_mapping), images_failed=len(image_urls) - len(image_mapping))
+    download_count = len(image_mapping)
+    
+    log(f"   Successfully downloaded {download_count}/{len(image_urls)} images")
+    
+    if optimize is not None and download_count:
+        from image_optimizer import optimize_images
+        log("🗜️  Optimizing images...")
+        with metrics.timed("optimize") as event:
+            optimization = optimize_images(images_folder, store=store, names=image_mapping.values(), **optimize)
+            event.update(original_bytes=optimization['original_bytes'],
+                         optimized_bytes=optimization['optimized_bytes'])
+        renamed = optimization['renamed']
+        image_mapping = {image_url: renamed.get(name, name) for image_url, name in image_mapping.items()}
+        metadata['image_bytes_original'] = optimization['original_bytes']
+        metadata['image_bytes_optimized'] = optimization['optimized_bytes']
+        log(f"   Image bytes: {optimization['original_bytes']:,} → {optimization['optimized_bytes']:,}")
+    
+    log("🔗 Updating image references...")
+    with metrics.timed("rewrite"):
+        updated_content = update_image_references(content, image_mapping, final_url)
+    
+    log("📄 Generating final HTML document...")
+    with metrics.timed("generate"):
+        final_html = generate_html_document(updated_content, metadata)
+    
+    # Save the HTML file
+    html_file = dest_folder / "index.html"
+    with metrics.timed("write") as event:
+        html_file.write_text(final_html, encoding='utf-8')
+        event['bytes_out'] = html_file.stat().st_size
+    
+    # Calculate content stats
+    text_content = content.get_text()
+    word_count = len(text_content.split())
+    
+    summary = {'title': metadata['title'], 'word_count': word_count, 'image_count': download_count}
+    if metadata.get('image_bytes_original') is not None:
+        summary['image_bytes_original'] = metadata['image_bytes_original']
+        summary['image_bytes_optimized'] = metadata['image_bytes_optimized']
+    validators = cache.validators(url) if cache else {}
+    write_manifest(dest_folder, url, final_url, validators, raw_html_sha256, pipeline,
+                   html_file.name, summary)
+    
+    if bundle:
+        log("📦 Packing archive into a bundle...")
+        with metrics.timed("bundle") as event:
+            bundle_path = pack_folder(dest_folder)
+            shutil.rmtree(dest_folder)
+            event['bytes_out'] = bundle_path.stat().st_size
+        html_file = dest_folder = bundle_path
+    
+    if duplicates is not None:
+        duplicates.add(collection, url, str(html_file), signature)
+    if catalog is not None:
+        catalog.upsert(make_record(html_file, 'html', {**metadata, **summary}))
+    metrics.emit("page", time.perf_counter() - started, url=url, skipped=False, **summary)
+    
+    return {
+        'url': url,
+        'html_file': html_file,
+        'folder': dest_folder,
+        'skipped': False,
+        'source_domain': metadata['source_domain'],
+        'article_date': metadata['article_date'],
+        **summary,
+    }
+
+
 def main():
     """Main function to download web page as HTML."""
+    from image_optimizer import DEFAULT_MAX_WIDTH, check_pillow
+    from near_duplicates import NearDuplicateIndex
+    
     parser = argparse.ArgumentParser(
         description="Download web pages as clean HTML with preserved images"
     )
@@ -552,114 +878,173 @@ def main():
         action="store_true",
         help="Skip robots.txt check"
     )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=8,
+        help="Maximum number of concurrent image downloads (default: 8)"
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=4,
+        help="Maximum concurrent image downloads from a single host (default: 4)"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=str(DEFAULT_CACHE_DIR),
+        help=f"Directory for the HTTP cache shared with article_to_md (default: {DEFAULT_CACHE_DIR})"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always download the page and images instead of revalidating cached copies"
+    )
+    parser.add_argument(
+        "--image-store",
+        default=str(DEFAULT_STORE_DIR),
+        help=f"Content-addressed store that archive images are linked from (default: {DEFAULT_STORE_DIR})"
+    )
+    parser.add_argument(
+        "--optimize-images",
+        action="store_true",
+        help="Recompress and downsize downloaded images (requires Pillow)"
+    )
+    parser.add_argument(
+        "--max-image-width",
+        type=int,
+        default=DEFAULT_MAX_WIDTH,
+        help=f"Downsize optimized images wider than this many pixels (default: {DEFAULT_MAX_WIDTH})"
+    )
+    parser.add_argument(
+        "--image-format",
+        choices=["keep", "webp", "avif"],
+        default="keep",
+        help="Convert optimized images to this format (default: keep)"
+    )
+    parser.add_argument(
+        "--optimize-workers",
+        type=int,
+        help="Processes used for image optimization (default: one per CPU)"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Archive the page again even if it is unchanged since the last run"
+    )
+    parser.add_argument(
+        "--allow-duplicates",
+        action="store_true",
+        help="Archive the page even if a near-duplicate from another URL was already archived"
+    )
+    parser.add_argument(
+        "--prune",
+        action="append",
+        metavar="RULE",
+        help=f"Prune nodes matching RULE before extraction, replacing the default rules; a rule name "
+             f"({', '.join(PRUNE_RULES)}) or an XPath expression, repeatable (default: {', '.join(DEFAULT_PRUNE_RULES)})"
+    )
+    parser.add_argument(
+        "--no-prune",
+        action="store_true",
+        help="Hand the whole page to readability without pruning it first"
+    )
+    parser.add_argument(
+        "--bundle",
+        action="store_true",
+        help="Write the archive as a single <title>.html.zip file instead of a folder"
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="FILE",
+        help="Append a JSON line per stage (timings, bytes, image counts) to FILE"
+    )
+    parser.add_argument(
+        "--prometheus",
+        metavar="FILE",
+        help="Write the run's stage totals to FILE for the Prometheus textfile collector"
+    )
     
     args = parser.parse_args()
     
+    if args.max_workers < 1 or args.per_host < 1:
+        parser.error("--max-workers and --per-host must be at least 1")
+    
+    prune_rules = () if args.no_prune else tuple(args.prune or DEFAULT_PRUNE_RULES)
+    try:
+        resolve_prune_rules(prune_rules)
+    except ValueError as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    optimize = None
+    if args.optimize_images:
+        try:
+            check_pillow(args.image_format)
+        except RuntimeError as e:
+            print(f"❌ Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        optimize = {'max_width': args.max_image_width, 'image_format': args.image_format,
+                    'workers': args.optimize_workers}
+    
     # Check robots.txt unless skipped
-    if not args.skip_robots and not check_robots_txt(args.url):
+    robots = None if args.skip_robots else RobotsCache()
+    if robots and not check_robots_txt(args.url, robots):
         print(f"Error: robots.txt disallows fetching {args.url}", file=sys.stderr)
         print("Use --skip-robots to override this check", file=sys.stderr)
         sys.exit(1)
     
+    metrics = Metrics("html_downloader", args.metrics, args.prometheus)
     try:
-        print(f"🌐 Fetching page from {args.url}...")
-        
-        # Fetch the page with proper headers
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (compatible; html-downloader/1.0)',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-        }
+        scheduler = HostScheduler(robots) if robots else None
+        session = create_session(pool_size=max(args.max_workers, args.per_host), scheduler=scheduler)
+        cache = None if args.no_cache else HTTPCache(Path(args.cache_dir))
+        store = ImageStore(Path(args.image_store))
+        result = download_page(args.url, args.output_dir, session=session, cache=cache, store=store,
+                               max_workers=args.max_workers, per_host=args.per_host, optimize=optimize,
+                               force=args.force, duplicates=NearDuplicateIndex(),
+                               allow_duplicates=args.allow_duplicates, catalog=Catalog(), metrics=metrics,
+                               prune_rules=prune_rules, bundle=args.bundle)
         
-        response = requests.get(args.url, headers=headers, timeout=30)
-        response.raise_for_status()
-        html_content = response.text
-        final_url = response.url
+        if 'duplicate_of' in result:
+            print(f"\n✅ Near-duplicate of {result['duplicate_of']} ({result['similarity']:.0%} similar), skipping")
+            print(f"📄 Existing archive: {result['html_file']}")
+            print("   Use --allow-duplicates to archive it anyway")
+            return
         
-        if not validate_html(html_content):
-            print("❌ Error: Invalid HTML content", file=sys.stderr)
-            sys.exit(1)
-        
-        print("📊 Extracting metadata...")
-        metadata = extract_metadata(html_content, final_url)
-        
-        print("📖 Extracting main content...")
-        main_content, extracted_title = extract_main_content(html_content, final_url)
-        
-        if not main_content or len(main_content.strip()) < 100:
-            print("❌ Error: Could not extract meaningful content", file=sys.stderr)
-            sys.exit(1)
-        
-        # Use extracted title if metadata title is generic
-        if len(metadata['title']) < 10 or metadata['title'].lower() in ['untitled', 'document']:
-            metadata['title'] = extracted_title
-        
-        # Create destination folder
-        kebab_title = create_kebab_case(metadata['title'])
-        dest_folder = Path(args.output_dir) / kebab_title
-        images_folder = dest_folder / "images"
-        
-        dest_folder.mkdir(parents=True, exist_ok=True)
-        images_folder.mkdir(parents=True, exist_ok=True)
-        
-        print(f"🖼️  Finding and downloading images...")
-        
-        # Find all images in the content
-        image_urls = find_images_in_content(main_content)
-        print(f"   Found {len(image_urls)} images")
-        
-        # Download images and create mapping
-        image_mapping = {}
-        download_count = 0
-        
-        for i, img_url in enumerate(image_urls, 1):
-            print(f"   {i}/{len(image_urls)}: Downloading image...")
-            local_filename = download_image(img_url, images_folder, final_url)
-            if local_filename:
-                # Make URL absolute for mapping
-                if not img_url.startswith(('http://', 'https://')):
-                    img_url = urljoin(final_url, img_url)
-                image_mapping[img_url] = local_filename
-                download_count += 1
-        
-        print(f"   Successfully downloaded {download_count}/{len(image_urls)} images")
-        
-        print("🔗 Updating image references...")
-        updated_content = update_image_references(main_content, image_mapping, final_url)
-        
-        print("📄 Generating final HTML document...")
-        final_html = generate_html_document(updated_content, metadata)
-        
-        # Save the HTML file
-        html_file = dest_folder / "index.html"
-        html_file.write_text(final_html, encoding='utf-8')
-        
-        # Calculate content stats
-        content_soup = BeautifulSoup(updated_content, 'html.parser')
-        text_content = content_soup.get_text()
-        word_count = len(text_content.split())
+        if result['skipped']:
+            print("\n✅ Page unchanged since last download, skipping")
+            print(f"{'📦 Bundle' if is_bundle(result['folder']) else '📁 Folder'}: {result['folder']}")
+            print("   Use --force to download it again")
+            return
         
         print("\n✅ Download completed successfully!")
-        print(f"📁 Folder: {dest_folder}")
-        print(f"📄 HTML file: {html_file}")
-        print(f"📊 Title: {metadata['title']}")
-        print(f"📝 Word count: {word_count:,}")
-        print(f"🖼️  Images: {download_count}")
-        print(f"🌐 Source: {metadata['source_domain']}")
+        if is_bundle(result['folder']):
+            print(f"📦 Bundle: {result['folder']}")
+        else:
+            print(f"📁 Folder: {result['folder']}")
+            print(f"📄 HTML file: {result['html_file']}")
+        print(f"📊 Title: {result['title']}")
+        print(f"📝 Word count: {result['word_count']:,}")
+        print(f"🖼️  Images: {result['image_count']}")
+        print(f"🌐 Source: {result['source_domain']}")
         
-        if metadata['article_date']:
-            print(f"📅 Published: {metadata['article_date']}")
+        if result['article_date']:
+            print(f"📅 Published: {result['article_date']}")
         
     except requests.RequestException as e:
         print(f"❌ Error fetching URL: {e}", file=sys.stderr)
         sys.exit(1)
+    except ValueError as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)
     except Exception as e:
         print(f"❌ Unexpected error: {e}", file=sys.stderr)
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        metrics.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,227 @@
+"""On-disk HTTP cache with conditional revalidation, shared by the download scripts."""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import requests
+from requests.compat import chardet
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_CACHE_DIR = Path(".cache") / "http"
+
+# Response headers kept alongside each cached body
+STORED_HEADERS = ('content-type', 'etag', 'last-modified')
+
+# Bytes of a body handed to an ``accept`` check before the rest is downloaded
+HEAD_BYTES = 512
+
+
+class DownloadTooLarge(ValueError):
+    """Raised when a response body exceeds the configured size cap."""
+
+
+class ContentRejected(ValueError):
+    """Raised when the first bytes of a response body fail the caller's ``accept`` check."""
+
+
+_download_locks: Dict[Path, threading.Lock] = {}
+_download_locks_guard = threading.Lock()
+
+
+def _download_lock(path: Path) -> threading.Lock:
+    with _download_locks_guard:
+        return _download_locks.setdefault(path, threading.Lock())
+
+
+def stream_to_file(url: str, dest_path: Path, session: Optional[requests.Session] = None,
+                   headers: Optional[Dict[str, str]] = None, timeout: float = 30,
+                   max_bytes: Optional[int] = None,
+                   accept: Optional[Callable[[bytes], bool]] = None) -> requests.Response:
+    """Stream a response body to ``dest_path`` through a ``.part`` file that is renamed into place on success.
+
+    A ``.part`` file left by an interrupted download is resumed with an HTTP Range request guarded by If-Range,
+    so a resource that changed in the meantime restarts from scratch. Bodies larger than ``max_bytes`` raise
+    DownloadTooLarge, and bodies whose first ``HEAD_BYTES`` bytes ``accept`` returns False for raise
+    ContentRejected as soon as those bytes arrive; either way nothing is left behind. A 304 reply is returned
+    without touching ``dest_path``.
+    """
+    dest_path = Path(dest_path)
+    part_path = dest_path.with_name(f"{dest_path.name}.part")
+    resume_path = dest_path.with_name(f"{dest_path.name}.part.json")
+
+    with _download_lock(dest_path):
+        request_headers = dict(headers or {})
+        offset = 0
+        try:
+            validator = json.loads(resume_path.read_text(encoding='utf-8'))['validator']
+            offset = part_path.stat().st_size
+        except (OSError, ValueError, KeyError):
+            validator = None
+        if validator and offset:
+            request_headers.update({'Range': f"bytes={offset}-", 'If-Range': validator, 'Accept-Encoding': 'identity'})
+
+        response = (session or requests).get(url, headers=request_headers, timeout=timeout, stream=True)
+        try:
+            if response.status_code == 304:
+                return response
+            response.raise_for_status()
+
+            resumed = response.status_code == 206 and \
+                response.headers.get('Content-Range', '').startswith(f"bytes {offset}-")
+            if not resumed:
+                offset = 0
+            declared = offset + int(response.headers.get('Content-Length') or 0)
+            if max_bytes and declared > max_bytes:
+                raise DownloadTooLarge(f"{url} is {declared} bytes, over the {max_bytes} byte limit")
+
+            # Only identity-encoded bodies can be resumed: byte offsets of decoded content do not match the wire
+            etag = response.headers.get('ETag', '')
+            validator = (etag if etag and not etag.startswith('W/') else None) or response.headers.get('Last-Modified')
+            if validator and not response.headers.get('Content-Encoding'):
+                resume_path.parent.mkdir(parents=True, exist_ok=True)
+                resume_path.write_text(json.dumps({'url': url, 'validator': validator}), encoding='utf-8')
+            else:
+                resume_path.unlink(missing_ok=True)
+
+            part_path.parent.mkdir(parents=True, exist_ok=True)
+            written = offset
+            head = b''
+            if accept and resumed:
+                with open(part_path, 'rb') as f:
+                    head = f.read(HEAD_BYTES)
+            checked = accept is None
+            with open(part_path, 'ab' if resumed else 'wb') as f:
+                for chunk in response.iter_content(chunk_size=65536):
+                    written += len(chunk)
+                    if max_bytes and written > max_bytes:
+                        raise DownloadTooLarge(f"{url} exceeds the {max_bytes} byte limit")
+                    if not checked:
+                        head += chunk[:max(HEAD_BYTES - len(head), 0)]
+                        if len(head) >= HEAD_BYTES:
+                            checked = True
+                            if not accept(head):
+                                raise ContentRejected(f"{url} was rejected after its first {HEAD_BYTES} bytes")
+                    f.write(chunk)
+            if not checked and not accept(head):
+                raise ContentRejected(f"{url} was rejected after its first {len(head)} bytes")
+        except (DownloadTooLarge, ContentRejected):
+            part_path.unlink(missing_ok=True)
+            resume_path.unlink(missing_ok=True)
+            raise
+        finally:
+            response.close()
+
+        os.replace(part_path, dest_path)
+        resume_path.unlink(missing_ok=True)
+        return response
+
+
+class CachedResponse:
+    """Response served from the cache directory, readable like a ``requests.Response``."""
+
+    def __init__(self, url: str, headers: Dict[str, str], body_path: Path, encoding: Optional[str],
+                 from_cache: bool):
+        self.url = url
+        self.status_code = 200
+        self.headers = CaseInsensitiveDict(headers)
+        self.body_path = body_path
+        self.encoding = encoding
+        self.from_cache = from_cache
+
+    @property
+    def content(self) -> bytes:
+        return self.body_path.read_bytes()
+
+    @property
+    def text(self) -> str:
+        content = self.content
+        encoding = self.encoding or chardet.detect(content)['encoding'] or 'utf-8'
+        return content.decode(encoding, errors='replace')
+
+    def iter_content(self, chunk_size: int = 8192) -> Iterator[bytes]:
+        with open(self.body_path, 'rb') as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+    def raise_for_status(self) -> None:
+        """Cached responses are always successful; kept for ``requests.Response`` compatibility."""
+
+
+class HTTPCache:
+    """Cache response bodies on disk keyed by URL and revalidate them with ETag/Last-Modified."""
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+
+    def _entry_paths(self, url: str) -> Tuple[Path, Path]:
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        folder = self.cache_dir / key[:2]
+        return folder / f"{key}.json", folder / f"{key}.body"
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the stored entry for a URL, or None if it is missing or incomplete."""
+        meta_path, body_path = self._entry_paths(url)
+        try:
+            entry = json.loads(meta_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        return entry if body_path.exists() else None
+
+    def validators(self, url: str) -> Dict[str, str]:
+        """The ETag / Last-Modified values stored for a URL, if any."""
+        entry = self.lookup(url)
+        if not entry:
+            return {}
+        return {name: value for name, value in entry['headers'].items() if name in ('etag', 'last-modified')}
+
+    def get(self, url: str, session: Optional[requests.Session] = None, headers: Optional[Dict[str, str]] = None,
+            timeout: float = 30, max_bytes: Optional[int] = None,
+            accept: Optional[Callable[[bytes], bool]] = None) -> CachedResponse:
+        """Fetch a URL, sending conditional headers when a cached copy exists.
+
+        A 304 reply is answered from disk without downloading the body again. New bodies are streamed to disk
+        (see ``stream_to_file``), so ``max_bytes`` caps how much is stored and ``accept`` can reject a body
+        from its first bytes. A rejected body also drops the URL's cache entry, so nothing is kept for it.
+        """
+        meta_path, body_path = self._entry_paths(url)
+        entry = self.lookup(url)
+
+        request_headers = dict(headers or {})
+        if entry:
+            if entry['headers'].get('etag'):
+                request_headers['If-None-Match'] = entry['headers']['etag']
+            if entry['headers'].get('last-modified'):
+                request_headers['If-Modified-Since'] = entry['headers']['last-modified']
+
+        try:
+            response = stream_to_file(url, body_path, session, request_headers, timeout, max_bytes, accept)
+        except ContentRejected:
+            meta_path.unlink(missing_ok=True)
+            body_path.unlink(missing_ok=True)
+            raise
+
+        if response.status_code == 304:
+            if not entry:
+                raise requests.HTTPError(f"Unexpected 304 Not Modified for uncached {url}", response=response)
+            entry['validated_at'] = time.time()
+            self._write_meta(meta_path, entry)
+            return CachedResponse(entry['url'], entry['headers'], body_path, entry['encoding'], from_cache=True)
+
+        entry = {
+            'url': response.url,
+            'headers': {name: response.headers[name] for name in STORED_HEADERS if name in response.headers},
+            'encoding': response.encoding,
+            'fetched_at': time.time(),
+        }
+        self._write_meta(meta_path, entry)
+        return CachedResponse(entry['url'], entry['headers'], body_path, entry['encoding'], from_cache=False)
+
+    def _write_meta(self, meta_path: Path, entry: Dict[str, Any]) -> None:
+        temp_path = meta_path.with_name(f"{meta_path.name}.{threading.get_ident()}.part")
+        temp_path.write_text(json.dumps(entry), encoding='utf-8')
+        os.replace(temp_path, meta_path)
@@ -0,0 +1,195 @@
+"""Optional post-download stage that recompresses, downsizes and converts archived images."""
+
+import hashlib
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set
+
+from image_store import ImageStore
+
+# Pillow is an optional dependency (the "images" extra), imported only by the functions that use it so that
+# importing the converters does not load it
+DEFAULT_MAX_WIDTH = 1600
+
+# Formats that are recompressed; SVG and ICO are left untouched
+OPTIMIZABLE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.bmp', '.tif', '.tiff'}
+
+SAVE_OPTIONS = {
+    'PNG': {'optimize': True},
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'WEBP': {'quality': 80, 'method': 6},
+    'AVIF': {'quality': 60},
+}
+
+EXTENSION_FORMATS = {'.png': 'PNG', '.jpg': 'JPEG', '.jpeg': 'JPEG', '.webp': 'WEBP', '.avif': 'AVIF'}
+
+MARKDOWN_IMAGE_LINK = re.compile(r'\]\(images/([^)\s]+)')
+
+# Worker pools shared by every optimize_images call in the process, one per requested worker count
+_pools: Dict[Optional[int], ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def check_pillow(image_format: str = 'keep') -> None:
+    """Raise if Pillow, or its encoder for ``image_format``, is not available."""
+    try:
+        from PIL import features
+    except ImportError:
+        raise RuntimeError(
+            "Image optimization requires Pillow. Install it with:\n"
+            "uv sync --extra images"
+        )
+    if image_format in ('webp', 'avif') and not features.check(image_format):
+        raise RuntimeError(f"This Pillow build cannot write {image_format.upper()} images")
+
+
+def optimize_image(path: str, max_width: int, image_format: str) -> Optional[Dict[str, Any]]:
+    """Write an optimized copy of one image next to it. Runs in a worker process.
+
+    Returns the temp path and new filename, or None when the image is left as it is.
+    """
+    from PIL import Image
+
+    source = Path(path)
+    with Image.open(source) as image:
+        if getattr(image, 'is_animated', False):
+            return None
+
+        if image_format == 'keep':
+            target_format = EXTENSION_FORMATS.get(source.suffix.lower(), 'PNG')
+            new_name = source.name if source.suffix.lower() in EXTENSION_FORMATS else f"{source.stem}.png"
+        else:
+            target_format = image_format.upper()
+            new_name = f"{source.stem}.{image_format}"
+
+        if image.width > max_width:
+            height = round(image.height * max_width / image.width)
+            image = image.resize((max_width, height), Image.Resampling.LANCZOS)
+
+        if target_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        temp_path = source.with_name(f".{source.name}.{os.getpid()}.optimized")
+        image.save(temp_path, format=target_format, **SAVE_OPTIONS.get(target_format, {}))
+
+    # Downsizing can grow flat-colour diagrams, so an image that keeps its format must also get smaller
+    original_bytes = source.stat().st_size
+    optimized_bytes = temp_path.stat().st_size
+    if new_name == source.name and optimized_bytes >= original_bytes:
+        temp_path.unlink()
+        return None
+
+    return {'temp_path': str(temp_path), 'new_name': new_name}
+
+
+def _pool(workers: Optional[int]) -> ProcessPoolExecutor:
+    """The shared pool for ``workers`` processes, started on first use.
+
+    Batch runs optimize from many threads at once. One pool per process keeps the total number of workers
+    at ``workers`` instead of that many per thread, and its workers are spawned because forking a
+    multithreaded process is unsafe.
+    """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers,
+                                                         mp_context=multiprocessing.get_context('spawn'))
+        return pool
+
+
+def _discard_pool(workers: Optional[int], pool: ProcessPoolExecutor) -> None:
+    """Forget a pool whose worker died, so the next call starts a new one."""
+    with _pools_lock:
+        if _pools.get(workers) is pool:
+            del _pools[workers]
+    pool.shutdown(wait=False)
+
+
+def _unique_name(name: str, source_name: str, taken: Set[str]) -> str:
+    """``name``, or ``<stem>-<hash of the source name><suffix>`` if another image already has it."""
+    if name not in taken:
+        return name
+    stem, suffix = os.path.splitext(name)
+    return f"{stem}-{hashlib.sha256(source_name.encode('utf-8')).hexdigest()[:8]}{suffix}"
+
+
+def optimize_images(images_folder: Path, max_width: int = DEFAULT_MAX_WIDTH, image_format: str = 'keep',
+                    workers: Optional[int] = None, store: Optional[ImageStore] = None,
+                    names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Optimize the images in ``images_folder`` across the shared process pool.
+
+    ``names`` limits the stage to the files the caller just wrote; other files in the folder, such as images
+    left over from an earlier run, are neither optimized nor counted. Optimized files go through the image
+    store as new blobs, so shared originals are never modified in place. A converted image whose new name
+    is already used by another image gets a hash suffix (``a.png`` and ``a.jpg`` become ``a.webp`` and
+    ``a-<hash>.webp``).
+
+    Returns the renamed files (old name -> new name) and the total bytes of the processed images before and
+    after.
+    """
+    check_pillow(image_format)
+    store = store or ImageStore()
+    images_folder = Path(images_folder)
+    wanted = set(names) if names is not None else None
+    paths = sorted(path for path in images_folder.iterdir()
+                   if path.is_file() and not path.name.startswith('.')
+                   and path.suffix.lower() in OPTIMIZABLE_EXTENSIONS
+                   and (wanted is None or path.name in wanted))
+
+    original_bytes = sum(path.stat().st_size for path in paths)
+    optimized_bytes = original_bytes
+    renamed = {}
+
+    if paths:
+        pool = _pool(workers)
+        futures = {path: pool.submit(optimize_image, str(path), max_width, image_format) for path in paths}
+        results = {}
+        for path, future in futures.items():
+            try:
+                results[path] = future.result()
+            except BrokenProcessPool as e:
+                _discard_pool(workers, pool)
+                print(f"    ✗ Could not optimize {path.name}: {e}")
+                results[path] = None
+            except Exception as e:
+                print(f"    ✗ Could not optimize {path.name}: {e}")
+                results[path] = None
+
+        # Names that stay as they are, whether or not the file is rewritten, are taken before any rename
+        taken = {path.name for path, result in results.items() if not result or result['new_name'] == path.name}
+        if wanted is not None:
+            taken |= wanted - {path.name for path in paths}
+        for path, result in results.items():
+            if not result:
+                continue
+            new_name = result['new_name']
+            if new_name != path.name:
+                new_name = _unique_name(new_name, path.name, taken)
+                taken.add(new_name)
+            new_path = images_folder / new_name
+            optimized_bytes -= path.stat().st_size
+            store.add(Path(result['temp_path']), new_path, move=True)
+            optimized_bytes += new_path.stat().st_size
+            if new_path != path:
+                path.unlink()
+                renamed[path.name] = new_path.name
+
+    return {'renamed': renamed, 'original_bytes': original_bytes, 'optimized_bytes': optimized_bytes}
+
+
+def markdown_image_names(markdown_content: str) -> Set[str]:
+    """Files in ``images/`` that markdown links to."""
+    return set(MARKDOWN_IMAGE_LINK.findall(markdown_content))
+
+
+def rename_markdown_images(markdown_content: str, renamed: Dict[str, str]) -> str:
+    """Point ``images/<old>`` links in markdown at the renamed files."""
+    if not renamed:
+        return markdown_content
+    return MARKDOWN_IMAGE_LINK.sub(lambda match: f"](images/{renamed.get(match.group(1), match.group(1))}",
+                                   markdown_content)
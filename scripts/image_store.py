@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Content-addressed image store shared by every archive's images/ folder."""
+
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import threading
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+DEFAULT_STORE_DIR = Path(".store") / "images"
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.svg', '.avif', '.bmp', '.tif', '.tiff', '.ico'}
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Identify an image from its first bytes. Returns a file extension, or None if it is not an image."""
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return '.png'
+    if head.startswith(b'\xff\xd8\xff'):
+        return '.jpg'
+    if head.startswith((b'GIF87a', b'GIF89a')):
+        return '.gif'
+    if head.startswith(b'RIFF') and head[8:12] == b'WEBP':
+        return '.webp'
+    if head[4:8] == b'ftyp' and head[8:12] in (b'avif', b'avis'):
+        return '.avif'
+    if head.startswith(b'BM'):
+        return '.bmp'
+    if head.startswith((b'II*\x00', b'MM\x00*')):
+        return '.tif'
+    if head.startswith(b'\x00\x00\x01\x00'):
+        return '.ico'
+    text = head.removeprefix(b'\xef\xbb\xbf').lstrip().lower()
+    if text.startswith((b'<svg', b'<?xml', b'<!--', b'<!doctype svg')) and b'<svg' in text:
+        return '.svg'
+    return None
+
+
+def stable_image_name(img_url: str, ext: str) -> str:
+    """Name for an image whose URL has no usable filename, identical on every run."""
+    digest = hashlib.sha256(img_url.encode('utf-8')).hexdigest()[:16]
+    return f"image_{digest}{ext}"
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 hex digest of a file, read in chunks."""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(1024 * 1024):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ImageStore:
+    """Store each distinct image once, keyed by SHA-256, and link it into article folders.
+
+    Article files are hardlinks to the stored blob. Where hardlinks are not possible (e.g. across
+    filesystems) they fall back to symlinks, then to plain copies. A blob is always a file the store wrote
+    or was handed with ``move``, never a link to a caller's file.
+    """
+
+    def __init__(self, root: Path = DEFAULT_STORE_DIR):
+        self.root = Path(root)
+
+    def blob_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def put_file(self, src: Path, move: bool = False) -> str:
+        """Add a file to the store and return its digest. With ``move`` the source is consumed.
+
+        Without ``move`` the store does not own the source, so its bytes are copied into a new blob. Linking
+        the caller's file in would let later edits to it change the blob, and every image linked to the blob,
+        behind the digest's back.
+        """
+        src = Path(src)
+        if move:
+            digest = file_digest(src)
+            blob = self.blob_path(digest)
+            if blob.exists():
+                src.unlink()
+                return digest
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = blob.with_name(f"{blob.name}.{threading.get_ident()}.part")
+            try:
+                shutil.move(src, temp_path)
+                os.replace(temp_path, blob)
+            finally:
+                temp_path.unlink(missing_ok=True)
+            return digest
+
+        digest = file_digest(src)
+        if self.blob_path(digest).exists():
+            return digest
+        # The digest is taken again from the bytes actually copied, in case the source changed meanwhile
+        self.root.mkdir(parents=True, exist_ok=True)
+        temp_path = self.root / f".incoming.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            sha = hashlib.sha256()
+            with open(src, 'rb') as source, open(temp_path, 'wb') as target:
+                while chunk := source.read(1024 * 1024):
+                    sha.update(chunk)
+                    target.write(chunk)
+            digest = sha.hexdigest()
+            blob = self.blob_path(digest)
+            if not blob.exists():
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(temp_path, blob)
+        finally:
+            temp_path.unlink(missing_ok=True)
+        return digest
+
+    def put_bytes(self, data: bytes) -> str:
+        """Add in-memory image bytes to the store and return their digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        blob = self.blob_path(digest)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = blob.with_name(f"{blob.name}.{threading.get_ident()}.part")
+            temp_path.write_bytes(data)
+            os.replace(temp_path, blob)
+        return digest
+
+    def link(self, digest: str, dest: Path) -> None:
+        """Point ``dest`` at the stored blob, replacing whatever file is there."""
+        blob = self.blob_path(digest)
+        dest = Path(dest)
+        if dest.exists() and not dest.is_symlink() and os.path.samefile(dest, blob):
+            return
+
+        temp_path = dest.with_name(f".{dest.name}.{threading.get_ident()}.link")
+        temp_path.unlink(missing_ok=True)
+        try:
+            os.link(blob, temp_path)
+        except OSError:
+            try:
+                os.symlink(blob.resolve(), temp_path)
+            except OSError:
+                shutil.copyfile(blob, temp_path)
+        os.replace(temp_path, dest)
+
+    def add(self, src: Path, dest: Path, move: bool = False) -> str:
+        """Store ``src`` and link it at ``dest``. Returns the digest."""
+        digest = self.put_file(src, move=move)
+        self.link(digest, dest)
+        return digest
+
+    def dedupe(self, folders: Iterable[Path]) -> Tuple[int, int]:
+        """Copy existing images/ files under ``folders`` into the store and replace them with links to it.
+
+        Returns the number of files linked and the bytes freed by collapsing duplicates.
+        """
+        linked = 0
+        freed = 0
+        for folder in folders:
+            for path in sorted(Path(folder).glob('*/images/*')):
+                if path.is_symlink() or not path.is_file() or path.suffix.lower() not in IMAGE_EXTENSIONS:
+                    continue
+                digest = file_digest(path)
+                blob = self.blob_path(digest)
+                if blob.exists():
+                    if os.path.samefile(path, blob):
+                        continue
+                    freed += path.stat().st_size
+                else:
+                    digest = self.put_file(path)
+                self.link(digest, path)
+                linked += 1
+        return linked, freed
+
+
+def main():
+    """Backfill existing archive folders into the image store."""
+    parser = argparse.ArgumentParser(
+        description="Deduplicate archived images into the content-addressed image store"
+    )
+    parser.add_argument(
+        "folders",
+        nargs="*",
+        default=["html", "markdown"],
+        help="Archive folders whose */images/ files are deduplicated (default: html markdown)"
+    )
+    parser.add_argument(
+        "--image-store",
+        default=str(DEFAULT_STORE_DIR),
+        help=f"Image store directory (default: {DEFAULT_STORE_DIR})"
+    )
+
+    args = parser.parse_args()
+
+    missing = [folder for folder in args.folders if not Path(folder).is_dir()]
+    if missing:
+        print(f"Error: Folder not found: {', '.join(missing)}", file=sys.stderr)
+        sys.exit(1)
+
+    store = ImageStore(Path(args.image_store))
+    linked, freed = store.dedupe(Path(folder) for folder in args.folders)
+    print(f"✓ Linked {linked} images into {store.root}")
+    print(f"✓ Freed {freed:,} bytes of duplicate images")
+
+
+if __name__ == "__main__":
+    main()
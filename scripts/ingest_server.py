@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""Local ingest daemon: a persistent job queue worked by threads that run the converters in-process."""
+
+import argparse
+import json
+import sqlite3
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import article_to_md
+import html_downloader
+from catalog import Catalog
+from http_cache import DEFAULT_CACHE_DIR, HTTPCache
+from image_optimizer import DEFAULT_MAX_WIDTH, check_pillow
+from image_store import DEFAULT_STORE_DIR, ImageStore
+from near_duplicates import NearDuplicateIndex
+from robots_cache import HostScheduler, RobotsCache
+
+DEFAULT_QUEUE_DB = Path(".cache") / "ingest.sqlite"
+DEFAULT_PORT = 8787
+
+# Job kinds and the output folder each writes to by default
+JOB_KINDS = {
+    'markdown': "markdown",
+    'html': "html",
+}
+JOB_OPTIONS = {'kind', 'source', 'output_dir', 'force', 'allow_duplicates', 'optimize', 'bundle'}
+# Values of optimize.image_format, as offered by the converters' --image-format
+IMAGE_FORMATS = ('keep', 'webp', 'avif')
+
+
+def validate_job(spec: Any) -> Dict[str, Any]:
+    """Check a submitted job and fill in its defaults. Raises ValueError describing what is wrong."""
+    if not isinstance(spec, dict):
+        raise ValueError("each job must be a JSON object")
+    unknown = set(spec) - JOB_OPTIONS
+    if unknown:
+        raise ValueError(f"unknown job fields: {', '.join(sorted(unknown))}")
+    source = spec.get('source')
+    if not isinstance(source, str) or not source.strip():
+        raise ValueError("'source' must be a URL or a path to a local HTML file")
+    kind = spec.get('kind', 'markdown')
+    if not isinstance(kind, str) or kind not in JOB_KINDS:
+        raise ValueError(f"'kind' must be one of: {', '.join(JOB_KINDS)}")
+    if kind == 'html' and not article_to_md.is_url(source):
+        raise ValueError("html jobs need a URL")
+    if not isinstance(spec.get('output_dir') or "", str):
+        raise ValueError("'output_dir' must be a folder path")
+    for flag in ('force', 'allow_duplicates', 'bundle'):
+        # bool() would read the strings "false" and "no" as True
+        if not isinstance(spec.get(flag, False), bool):
+            raise ValueError(f"'{flag}' must be true or false")
+    if spec.get('bundle') and kind != 'html':
+        raise ValueError("'bundle' only applies to html jobs")
+
+    optimize = spec.get('optimize')
+    if optimize is True:
+        optimize = {}
+    if optimize is not None and optimize is not False:
+        if not isinstance(optimize, dict) or set(optimize) - {'max_width', 'image_format'}:
+            raise ValueError("'optimize' must be true or an object with max_width and/or image_format")
+        max_width = optimize.get('max_width', DEFAULT_MAX_WIDTH)
+        try:
+            # bool is an int subclass, and int() takes floats and numeric strings, so none of those count
+            if isinstance(max_width, bool) or int(max_width) != max_width:
+                raise ValueError
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError("'optimize.max_width' must be a whole number of pixels")
+        if max_width < 1:
+            raise ValueError("'optimize.max_width' must be at least 1")
+        optimize = {'max_width': int(max_width), 'image_format': optimize.get('image_format', 'keep')}
+        if optimize['image_format'] not in IMAGE_FORMATS:
+            raise ValueError(f"'optimize.image_format' must be one of: {', '.join(IMAGE_FORMATS)}")
+        try:
+            check_pillow(optimize['image_format'])
+        except RuntimeError as e:
+            raise ValueError(str(e))
+    else:
+        optimize = None
+
+    return {
+        'kind': kind,
+        'source': source.strip(),
+        'output_dir': str(spec.get('output_dir') or JOB_KINDS[kind]),
+        'force': spec.get('force', False),
+        'allow_duplicates': spec.get('allow_duplicates', False),
+        'optimize': optimize,
+        'bundle': spec.get('bundle', False),
+    }
+
+
+def _jsonable(value: Any) -> Any:
+    """Job results with their Paths turned into strings."""
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, Path):
+        return str(value)
+    return value
+
+
+class JobQueue:
+    """Jobs and their results in SQLite, so queued work survives a restart of the daemon."""
+
+    def __init__(self, path: Path = DEFAULT_QUEUE_DB):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """One connection per operation, so the queue can be shared by the HTTP and worker threads."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        try:
+            with self._lock, connection:
+                self._initialize(connection)
+                yield connection
+        finally:
+            connection.close()
+
+    def _initialize(self, connection: sqlite3.Connection) -> None:
+        if not self._initialized:
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    options TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    submitted_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT
+                );
+                CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+            """)
+            self._initialized = True
+
+    def _job(self, row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job['options'] = json.loads(job['options'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def submit(self, jobs: List[Dict[str, Any]]) -> List[int]:
+        """Queue validated jobs. Returns their IDs in submission order."""
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._transaction() as connection:
+            return [connection.execute(
+                "INSERT INTO jobs (kind, source, options, status, submitted_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job['kind'], job['source'], json.dumps(job), now)).lastrowid for job in jobs]
+
+    def requeue_interrupted(self) -> int:
+        """Put jobs left running by a previous daemon back in the queue. Returns how many there were."""
+        with self._transaction() as connection:
+            return connection.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'").rowcount
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Mark the oldest queued job as running and return it, or None if the queue is empty."""
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._transaction() as connection:
+            row = connection.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1) RETURNING *",
+                (now,)).fetchone()
+        return self._job(row) if row else None
+
+    def finish(self, job_id: int, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        """Record a job's result, or the error it failed with."""
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                ('failed' if error else 'done', json.dumps(_jsonable(result)) if result is not None else None,
+                 error, now, job_id))
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._transaction() as connection:
+            row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent jobs first, optionally only those with ``status``."""
+        sql = "SELECT * FROM jobs" + (" WHERE status = ?" if status else "") + " ORDER BY id DESC LIMIT ?"
+        with self._transaction() as connection:
+            rows = connection.execute(sql, ((status,) if status else ()) + (limit,)).fetchall()
+        return [self._job(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._transaction() as connection:
+            rows = connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+class IngestService:
+    """Worker threads that take jobs off the queue and run them against warm, shared state.
+
+    The HTTP sessions, robots.txt cache, HTTP cache, image store, near-duplicate index and catalog are
+    created once and shared by every job, as in article_to_md's batch mode.
+    """
+
+    def __init__(self, queue: JobQueue, workers: int = 4, cache: Optional[HTTPCache] = None,
+                 store: Optional[ImageStore] = None):
+        self.queue = queue
+        self.workers = workers
+        self.cache = cache
+        self.store = store
+        self.robots = RobotsCache()
+        scheduler = HostScheduler(self.robots)
+        self.markdown_session = article_to_md.create_session(pool_size=workers, scheduler=scheduler)
+        self.html_session = html_downloader.create_session(pool_size=max(8, workers), scheduler=scheduler)
+        self.duplicates = NearDuplicateIndex()
+        self.catalog = Catalog()
+        self._wakeup = threading.Condition()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.running = 0
+
+    def start(self) -> None:
+        requeued = self.queue.requeue_interrupted()
+        if requeued:
+            print(f"↺ Re-queued {requeued} jobs interrupted by the last shutdown")
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"ingest-worker-{number + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """Stop taking new jobs and wait for the ones in progress to finish."""
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def submit(self, specs: List[Any]) -> List[int]:
+        """Validate and queue jobs, all or none. Raises ValueError for an invalid job."""
+        jobs = []
+        for position, spec in enumerate(specs):
+            try:
+                jobs.append(validate_job(spec))
+            except ValueError as e:
+                raise ValueError(f"job {position}: {e}" if len(specs) > 1 else str(e))
+        ids = self.queue.submit(jobs)
+        with self._wakeup:
+            self._wakeup.notify(len(ids))
+        return ids
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            job = self.queue.claim()
+            if job is None:
+                with self._wakeup:
+                    # The timeout also picks up jobs queued by another process sharing the database
+                    self._wakeup.wait(timeout=5)
+                continue
+
+            with self._wakeup:
+                self.running += 1
+            started = time.monotonic()
+            try:
+                result = self.run(job['options'])
+                self.queue.finish(job['id'], result=result)
+                print(f"✓ Job {job['id']} {job['source']} ({time.monotonic() - started:.2f}s)")
+            except Exception as e:
+                self.queue.finish(job['id'], error=str(e) or type(e).__name__)
+                print(f"✗ Job {job['id']} {job['source']}: {e}")
+            finally:
+                with self._wakeup:
+                    self.running -= 1
+
+    def run(self, options: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one job in-process with the shared state. Returns the converter's result summary."""
+        optimize = options['optimize']
+        if options['kind'] == 'html':
+            return html_downloader.download_page(
+                options['source'], options['output_dir'], session=self.html_session, cache=self.cache,
+                robots=self.robots, store=self.store, optimize=optimize, force=options['force'],
+                duplicates=self.duplicates, allow_duplicates=options['allow_duplicates'], catalog=self.catalog,
+                verbose=False, bundle=options.get('bundle', False))
+        return article_to_md.convert_source(
+            options['source'], options['output_dir'], session=self.markdown_session, cache=self.cache,
+            robots=self.robots, store=self.store, optimize=optimize, force=options['force'],
+            duplicates=self.duplicates, allow_duplicates=options['allow_duplicates'], catalog=self.catalog,
+            verbose=False)
+
+
+class IngestHandler(BaseHTTPRequestHandler):
+    """JSON API over the ingest service.
+
+    POST /jobs            queue one job ({"source": ..., "kind": ...}) or many ({"jobs": [...]})
+    GET  /jobs            recent jobs (?status=queued|running|done|failed&limit=N)
+    GET  /jobs/ID         a job's status, options and, once finished, its result or error
+    GET  /jobs/ID/result  the result of a finished job (202 while it is pending)
+    GET  /health          queue counts and worker activity
+    """
+
+    server_version = "analyst-ingest/1.0"
+    service: IngestService
+
+    def _send(self, status: int, body: Any) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _route(self) -> Tuple[List[str], Dict[str, str]]:
+        url = urlsplit(self.path)
+        return [part for part in url.path.split("/") if part], dict(parse_qsl(url.query))
+
+    def do_GET(self) -> None:
+        parts, params = self._route()
+        queue = self.service.queue
+        if parts == ["health"]:
+            self._send(200, {'ok': True, 'workers': self.service.workers, 'running': self.service.running,
+                             'jobs': queue.counts()})
+        elif parts == ["jobs"]:
+            try:
+                limit = int(params.get('limit', 100))
+            except ValueError:
+                self._send(400, {'error': "'limit' must be a number"})
+                return
+            self._send(200, {'jobs': queue.list(params.get('status') or None, limit)})
+        elif len(parts) in (2, 3) and parts[0] == "jobs" and parts[1].isdigit() and parts[2:] in ([], ["result"]):
+            job = queue.get(int(parts[1]))
+            if job is None:
+                self._send(404, {'error': f"no job {parts[1]}"})
+            elif parts[2:] == []:
+                self._send(200, job)
+            elif job['status'] == 'done':
+                self._send(200, job['result'])
+            elif job['status'] == 'failed':
+                self._send(500, {'error': job['error']})
+            else:
+                self._send(202, {'status': job['status']})
+        else:
+            self._send(404, {'error': "not found"})
+
+    def do_POST(self) -> None:
+        parts, _ = self._route()
+        if parts != ["jobs"]:
+            self._send(404, {'error': "not found"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b"null")
+        except ValueError:
+            self._send(400, {'error': "request body must be JSON"})
+            return
+
+        many = isinstance(body, dict) and 'jobs' in body
+        specs = body['jobs'] if many else [body]
+        if not isinstance(specs, list) or not specs:
+            self._send(400, {'error': "'jobs' must be a non-empty list"})
+            return
+        try:
+            ids = self.service.submit(specs)
+        except ValueError as e:
+            self._send(400, {'error': str(e)})
+            return
+        self._send(202, {'ids': ids} if many else {'id': ids[0]})
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Job outcomes are logged by the workers; per-request lines would drown them while clients poll
+        pass
+
+
+def serve(host: str, port: int, queue: JobQueue, workers: int, cache: Optional[HTTPCache],
+          store: ImageStore) -> None:
+    """Run the ingest service until interrupted, finishing jobs in progress before exiting."""
+    service = IngestService(queue, workers, cache, store)
+    handler = type("BoundIngestHandler", (IngestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    service.start()
+    print(f"Ingest service listening on http://{host}:{port} with {workers} workers (Ctrl+C to stop)...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("Finishing jobs in progress...")
+        service.stop()
+
+
+def request_json(url: str, body: Any = None) -> Tuple[int, Any]:
+    """Call the ingest API. Returns the HTTP status and decoded JSON body."""
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+
+
+def main():
+    """Run the ingest daemon, or submit jobs to one that is running."""
+    parser = argparse.ArgumentParser(
+        description="Local ingest service that converts and archives articles from a persistent job queue"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on or connect to (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Run the daemon")
+    serve_parser.add_argument("--workers", type=int, default=4, help="Jobs processed concurrently (default: 4)")
+    serve_parser.add_argument("--db", default=str(DEFAULT_QUEUE_DB),
+                              help=f"Job queue database (default: {DEFAULT_QUEUE_DB})")
+    serve_parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR),
+                              help=f"Directory for the shared HTTP cache (default: {DEFAULT_CACHE_DIR})")
+    serve_parser.add_argument("--no-cache", action="store_true",
+                              help="Always download pages and images instead of revalidating cached copies")
+    serve_parser.add_argument("--image-store", default=str(DEFAULT_STORE_DIR),
+                              help=f"Content-addressed image store (default: {DEFAULT_STORE_DIR})")
+
+    submit_parser = subparsers.add_parser("submit", help="Queue sources on a running daemon")
+    submit_parser.add_argument("sources", nargs="+", help="URLs or local HTML files")
+    submit_parser.add_argument("--kind", choices=list(JOB_KINDS), default="markdown",
+                               help="Convert to markdown or archive as HTML (default: markdown)")
+    submit_parser.add_argument("--output-dir", help="Output directory (default: markdown or html)")
+    submit_parser.add_argument("--force", action="store_true", help="Process sources even if unchanged")
+    submit_parser.add_argument("--wait", action="store_true", help="Wait for the jobs and print their results")
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        if args.workers < 1:
+            parser.error("--workers must be at least 1")
+        cache = None if args.no_cache else HTTPCache(Path(args.cache_dir))
+        try:
+            serve(args.host, args.port, JobQueue(Path(args.db)), args.workers, cache,
+                  ImageStore(Path(args.image_store)))
+        except OSError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    base_url = f"http://{args.host}:{args.port}"
+    jobs = [{'source': source, 'kind': args.kind, 'force': args.force,
+             **({'output_dir': args.output_dir} if args.output_dir else {})} for source in args.sources]
+    try:
+        status, body = request_json(f"{base_url}/jobs", {'jobs': jobs})
+    except (urllib.error.URLError, OSError) as e:
+        print(f"Error: Cannot reach the ingest service at {base_url}: {e}", file=sys.stderr)
+        sys.exit(1)
+    if status != 202:
+        print(f"Error: {body.get('error', status)}", file=sys.stderr)
+        sys.exit(1)
+
+    ids = body['ids']
+    for job_id, source in zip(ids, args.sources):
+        print(f"Queued job {job_id}: {source}")
+    if not args.wait:
+        return
+
+    failed = False
+    pending = dict(zip(ids, args.sources))
+    while pending:
+        time.sleep(0.5)
+        for job_id in list(pending):
+            status, job = request_json(f"{base_url}/jobs/{job_id}")
+            if job.get('status') == 'done':
+                result = job['result']
+                output = result.get('markdown_file') or result.get('html_file')
+                note = " (unchanged)" if result['skipped'] else ""
+                if 'duplicate_of' in result:
+                    note = f" (near-duplicate of {result['duplicate_of']})"
+                print(f"✓ {pending.pop(job_id)} → {output}{note}")
+            elif job.get('status') == 'failed':
+                failed = True
+                print(f"✗ {pending.pop(job_id)}: {job['error']}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
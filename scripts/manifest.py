@@ -0,0 +1,152 @@
+"""Per-article manifests that let re-runs skip sources whose inputs have not changed."""
+
+import hashlib
+import json
+import os
+import threading
+import zipfile
+from datetime import datetime
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from bundle import BUNDLE_SUFFIX, Bundle, is_bundle
+from image_store import file_digest
+
+MANIFEST_NAME = "manifest.json"
+
+# Folder in each output directory holding one small file per source, named by the source's hash and naming the
+# archive built from it, so finding a source's manifest does not mean reading every manifest in the directory
+SOURCES_DIR = ".sources"
+
+
+def pipeline_version(name: str, packages: Iterable[str]) -> str:
+    """Identify a pipeline by its own version and the versions of the packages that shape its output."""
+    parts = [name]
+    for package in packages:
+        try:
+            parts.append(f"{package} {version(package)}")
+        except PackageNotFoundError:
+            parts.append(f"{package} unknown")
+    return "; ".join(parts)
+
+
+def html_digest(html_content: str) -> str:
+    """SHA-256 of the raw HTML as fetched."""
+    return hashlib.sha256(html_content.encode('utf-8')).hexdigest()
+
+
+def load_manifest(folder: Path) -> Optional[Dict[str, Any]]:
+    """Read the manifest of a folder or bundle, or None if it has none."""
+    try:
+        if is_bundle(folder):
+            return json.loads(Bundle(folder).read_text(MANIFEST_NAME))
+        return json.loads((Path(folder) / MANIFEST_NAME).read_text(encoding='utf-8'))
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+
+
+def _source_path(output_dir: Path, source: str) -> Path:
+    return Path(output_dir) / SOURCES_DIR / hashlib.sha256(source.encode('utf-8')).hexdigest()[:32]
+
+
+def record_source(output_dir: Path, source: str, name: str) -> None:
+    """Note that the archive ``name`` (a folder, or the same name packed as a bundle) in ``output_dir`` holds ``source``."""
+    if not (Path(output_dir) / SOURCES_DIR).is_dir():
+        index_archives(output_dir)
+    path = _source_path(output_dir, source)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.part")
+    temp_path.write_text(name, encoding='utf-8')
+    os.replace(temp_path, path)
+
+
+def index_archives(output_dir: Path) -> int:
+    """Record the source of every archive in ``output_dir``, for archives made before sources were recorded.
+
+    Reads every manifest once. Returns the number of archives recorded.
+    """
+    output_dir = Path(output_dir)
+    if not output_dir.is_dir():
+        return 0
+    (output_dir / SOURCES_DIR).mkdir(exist_ok=True)
+    archives = [path.parent for path in sorted(output_dir.glob(f"*/{MANIFEST_NAME}"))]
+    archives += sorted(output_dir.glob(f"*{BUNDLE_SUFFIX}"))
+    recorded = 0
+    for archive in archives:
+        manifest = load_manifest(archive)
+        if manifest and manifest.get('source_url'):
+            record_source(output_dir, manifest['source_url'], archive.name.removesuffix(BUNDLE_SUFFIX))
+            recorded += 1
+    return recorded
+
+
+def find_manifest(output_dir: Path, source: str) -> Optional[Tuple[Path, Dict[str, Any]]]:
+    """Find the archived folder or bundle whose manifest records ``source``.
+
+    Looks up the archive recorded for ``source`` and reads only its manifest. An output directory without
+    recorded sources is indexed once first.
+    """
+    output_dir = Path(output_dir)
+    if not (output_dir / SOURCES_DIR).is_dir():
+        index_archives(output_dir)
+    try:
+        name = _source_path(output_dir, source).read_text(encoding='utf-8')
+    except OSError:
+        return None
+    # A folder may since have been packed into a bundle of the same name, or a bundle unpacked
+    for archive in (output_dir / name, output_dir / f"{name}{BUNDLE_SUFFIX}"):
+        manifest = load_manifest(archive)
+        if manifest and manifest.get('source_url') == source:
+            return archive, manifest
+    return None
+
+
+def archive_output(folder: Path, manifest: Dict[str, Any]) -> Path:
+    """The output file a manifest records, or the bundle itself when the archive is bundled."""
+    return Path(folder) if is_bundle(folder) else Path(folder) / manifest['output']
+
+
+def is_current(folder: Path, manifest: Dict[str, Any], raw_html_sha256: str, extractor_version: str) -> bool:
+    """True if the archive was built from the same HTML and extractor, and its files are still present."""
+    folder = Path(folder)
+    if manifest.get('raw_html_sha256') != raw_html_sha256 or manifest.get('extractor_version') != extractor_version:
+        return False
+    if is_bundle(folder):
+        try:
+            bundle = Bundle(folder)
+        except (OSError, zipfile.BadZipFile):
+            return False
+        return manifest['output'] in bundle and all(f"images/{name}" in bundle for name in manifest.get('images', {}))
+    if not (folder / manifest['output']).exists():
+        return False
+    return all((folder / "images" / name).exists() for name in manifest.get('images', {}))
+
+
+def write_manifest(folder: Path, source: str, final_url: str, validators: Dict[str, str], raw_html_sha256: str,
+                   extractor_version: str, output: str, summary: Dict[str, Any]) -> Dict[str, Any]:
+    """Record how ``folder`` was produced, hashing the images it now holds, and note it as ``source``'s archive."""
+    folder = Path(folder)
+    images_folder = folder / "images"
+    images = {}
+    if images_folder.is_dir():
+        images = {path.name: file_digest(path) for path in sorted(images_folder.iterdir()) if path.is_file()}
+
+    manifest = {
+        'source_url': source,
+        'final_url': final_url,
+        'validators': validators,
+        'raw_html_sha256': raw_html_sha256,
+        'extractor_version': extractor_version,
+        'output': output,
+        'images': images,
+        'summary': summary,
+        'updated_at': datetime.now().isoformat(timespec='seconds'),
+    }
+
+    manifest_path = folder / MANIFEST_NAME
+    temp_path = manifest_path.with_name(f"{MANIFEST_NAME}.part")
+    temp_path.write_text(json.dumps(manifest, indent=2) + "\n", encoding='utf-8')
+    os.replace(temp_path, manifest_path)
+    record_source(folder.parent, source, folder.name)
+    return manifest
@@ -0,0 +1,95 @@
+#!/usr/bin/env node
+// Long-lived Mermaid renderer used by mermaid_renderer.py.
+//
+// Launches one headless browser through @mermaid-js/mermaid-cli and keeps it running. Requests arrive on
+// stdin as JSON lines and are rendered one at a time; each gets a JSON-line reply on stdout with the same id.
+//
+// Usage: node mermaid_renderer.mjs [node_modules root] [puppeteer launch options as JSON]
+
+import { readFile, rename, unlink, writeFile } from 'node:fs/promises';
+import { createRequire } from 'node:module';
+import path from 'node:path';
+import { createInterface } from 'node:readline';
+import { pathToFileURL } from 'node:url';
+
+const [modulesRoot, launchOptions] = process.argv.slice(2);
+
+function reply(message) {
+  process.stdout.write(JSON.stringify(message) + '\n');
+}
+
+function packageEntry(pkg) {
+  const exported = typeof pkg.exports === 'object' ? pkg.exports['.'] ?? pkg.exports : pkg.exports;
+  if (typeof exported === 'string') return exported;
+  if (exported) return exported.import ?? exported.default;
+  return pkg.main ?? 'index.js';
+}
+
+async function loadMermaidCli() {
+  if (!modulesRoot) {
+    const cli = await import('@mermaid-js/mermaid-cli');
+    const puppeteer = await import('puppeteer');
+    return { renderMermaid: cli.renderMermaid, puppeteer: puppeteer.default ?? puppeteer, version: 'unknown' };
+  }
+
+  // Global installs are not on the ESM resolution path, so load mermaid-cli by file and puppeteer from beside it
+  const packageDir = path.join(modulesRoot, '@mermaid-js', 'mermaid-cli');
+  const pkg = JSON.parse(await readFile(path.join(packageDir, 'package.json'), 'utf8'));
+  const entry = path.join(packageDir, packageEntry(pkg));
+  const cli = await import(pathToFileURL(entry).href);
+  const require = createRequire(entry);
+  const puppeteer = await import(pathToFileURL(require.resolve('puppeteer')).href);
+  return { renderMermaid: cli.renderMermaid, puppeteer: puppeteer.default ?? puppeteer, version: pkg.version };
+}
+
+async function render(browser, renderMermaid, request) {
+  const { data } = await renderMermaid(browser, request.code, request.format, {
+    viewport: { width: request.width, height: request.height, deviceScaleFactor: 1 },
+    backgroundColor: request.backgroundColor,
+    mermaidConfig: { theme: request.theme },
+  });
+
+  // Write beside the target and rename so a failed render never leaves a truncated image
+  const tempPath = `${request.output}.${process.pid}.part`;
+  try {
+    await writeFile(tempPath, data);
+    await rename(tempPath, request.output);
+  } catch (error) {
+    await unlink(tempPath).catch(() => {});
+    throw error;
+  }
+}
+
+async function main() {
+  let modules;
+  let browser;
+  try {
+    modules = await loadMermaidCli();
+    browser = await modules.puppeteer.launch({ headless: true, ...JSON.parse(launchOptions || '{}') });
+  } catch (error) {
+    reply({ ready: false, error: String(error?.message ?? error) });
+    process.exit(1);
+  }
+  reply({ ready: true, version: modules.version });
+
+  let pending = Promise.resolve();
+  const lines = createInterface({ input: process.stdin });
+  lines.on('line', (line) => {
+    if (!line.trim()) return;
+    pending = pending.then(async () => {
+      let request;
+      try {
+        request = JSON.parse(line);
+        await render(browser, modules.renderMermaid, request);
+        reply({ id: request.id, ok: true });
+      } catch (error) {
+        reply({ id: request?.id ?? null, ok: false, error: String(error?.message ?? error) });
+      }
+    });
+  });
+  lines.on('close', () => {
+    pending.then(() => browser.close()).finally(() => process.exit(0));
+  });
+}
+
+main();
@@ -0,0 +1,185 @@
+"""Long-lived Mermaid renderer that keeps one headless browser warm across diagrams."""
+
+import json
+import queue
+import subprocess
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+HELPER_SCRIPT = Path(__file__).with_name("mermaid_renderer.mjs")
+
+
+class RendererUnavailable(Exception):
+    """Raised when the persistent renderer cannot be started (no Node.js or no global mermaid-cli)."""
+
+
+def npm_global_root() -> Optional[str]:
+    """Directory holding globally installed npm packages, where mermaid-cli lives."""
+    try:
+        result = subprocess.run(['npm', 'root', '-g'], capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+class MermaidRenderer:
+    """Render diagrams through one Node.js process that keeps a headless browser open.
+
+    Starting Node and the browser dominates the cost of rendering a single diagram, so the process is
+    started once and reused for every diagram sent to ``render``. Requests are serialised; a timed-out
+    request kills the process and the next request starts a fresh one.
+    """
+
+    def __init__(self, modules_root: Optional[str] = None, puppeteer_options: Optional[Dict[str, Any]] = None,
+                 startup_timeout: float = 60):
+        self.modules_root = modules_root
+        self.puppeteer_options = puppeteer_options or {}
+        self.startup_timeout = startup_timeout
+        self.version: Optional[str] = None
+        self.unavailable: Optional[str] = None
+        self._process: Optional[subprocess.Popen] = None
+        self._replies: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._stderr: deque = deque(maxlen=20)
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'MermaidRenderer':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def installed_version(self) -> Optional[str]:
+        """Version of the mermaid-cli package the helper would load, without starting it. None if missing."""
+        if self.version:
+            return self.version
+        self.modules_root = self.modules_root or npm_global_root()
+        if not self.modules_root:
+            return None
+        try:
+            package = json.loads((Path(self.modules_root) / "@mermaid-js" / "mermaid-cli" / "package.json")
+                                 .read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        self.version = package.get('version', 'unknown')
+        return self.version
+
+    def start(self) -> None:
+        """Launch the helper and wait until its browser is ready.
+
+        A failed start is remembered, so later calls fail fast instead of relaunching the browser.
+        """
+        if self._process and self._process.poll() is None:
+            return
+        if self.unavailable:
+            raise RendererUnavailable(self.unavailable)
+
+        modules_root = self.modules_root or npm_global_root()
+        if not modules_root:
+            self.unavailable = "could not locate global npm packages (is Node.js installed?)"
+            raise RendererUnavailable(self.unavailable)
+
+        try:
+            self._process = subprocess.Popen(
+                ['node', str(HELPER_SCRIPT), modules_root, json.dumps(self.puppeteer_options)],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                text=True, encoding='utf-8', bufsize=1
+            )
+        except OSError as e:
+            self.unavailable = f"could not start node: {e}"
+            raise RendererUnavailable(self.unavailable)
+
+        self._replies = queue.Queue()
+        self._stderr.clear()
+        threading.Thread(target=self._read_replies, args=(self._process, self._replies), daemon=True).start()
+        threading.Thread(target=self._read_stderr, args=(self._process,), daemon=True).start()
+
+        ready = self._wait_for_reply(self.startup_timeout)
+        if not ready or not ready.get('ready'):
+            error = (ready or {}).get('error') or self._stderr_tail() or "helper exited during startup"
+            self._kill()
+            self.unavailable = error
+            raise RendererUnavailable(error)
+        self.version = ready.get('version') or self.version
+
+    def render(self, mermaid_code: str, output_path: Path, config: Dict[str, Any]) -> None:
+        """Render one diagram to ``output_path`` using the same options as the mermaid-mcp CLI."""
+        timeout = config.get("timeout", 30000) / 1000
+        with self._lock:
+            self.start()
+            self._next_id += 1
+            request = {
+                'id': self._next_id,
+                'code': mermaid_code,
+                'output': str(Path(output_path).resolve()),
+                'format': config["image_format"],
+                'width': config["width"],
+                'height': config["height"],
+                'backgroundColor': config["background_color"],
+                'theme': config["theme"],
+            }
+            try:
+                self._process.stdin.write(json.dumps(request) + "\n")
+                self._process.stdin.flush()
+            except OSError:
+                self._kill()
+                raise Exception(f"Mermaid renderer exited unexpectedly: {self._stderr_tail()}")
+
+            while True:
+                try:
+                    reply = self._wait_for_reply(timeout, raise_timeout=True)
+                except queue.Empty:
+                    self._kill()
+                    raise Exception(f"Mermaid rendering timed out after {timeout:g} seconds")
+                if reply is None:
+                    self._kill()
+                    raise Exception(f"Mermaid renderer exited unexpectedly: {self._stderr_tail()}")
+                if reply.get('id') == request['id']:
+                    break
+
+        if not reply.get('ok'):
+            raise Exception(f"Error rendering diagram: {reply.get('error')}")
+
+    def close(self) -> None:
+        """Shut the browser down, letting any in-flight render finish first."""
+        with self._lock:
+            if not self._process:
+                return
+            try:
+                self._process.stdin.close()
+                self._process.wait(timeout=10)
+            except (OSError, subprocess.TimeoutExpired):
+                self._kill()
+            self._process = None
+
+    def _wait_for_reply(self, timeout: float, raise_timeout: bool = False) -> Optional[Dict[str, Any]]:
+        try:
+            return self._replies.get(timeout=timeout)
+        except queue.Empty:
+            if raise_timeout:
+                raise
+            return None
+
+    def _kill(self) -> None:
+        if self._process:
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+
+    def _stderr_tail(self) -> str:
+        return "\n".join(self._stderr).strip()
+
+    def _read_replies(self, process: subprocess.Popen, replies: queue.Queue) -> None:
+        for line in process.stdout:
+            try:
+                replies.put(json.loads(line))
+            except ValueError:
+                continue  # Stray output from the browser, not a reply
+        replies.put(None)
+
+    def _read_stderr(self, process: subprocess.Popen) -> None:
+        for line in process.stderr:
+            self._stderr.append(line.rstrip())
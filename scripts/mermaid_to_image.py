@@ -1,14 +1,29 @@
 #!/usr/bin/env python3
 
 import argparse
+import glob
+import json
 import os
+import queue
 import re
+import shutil
 import sys
+import time
 import yaml
 import subprocess
 import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from importlib.metadata import PackageNotFoundError, version
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set
+
+from mermaid_renderer import MermaidRenderer, RendererUnavailable
+from metrics import NO_METRICS, Metrics
+from render_cache import DEFAULT_RENDER_CACHE_DIR, RenderCache, render_key
+
+# Where a successful dependency probe is remembered, and for how long by default (seconds)
+DEPENDENCY_CACHE = Path(".cache") / "dependencies.json"
+DEFAULT_DEPENDENCY_TTL = 24 * 60 * 60
 
 
 def load_config(config_path: str = "config.yml") -> Dict[str, Any]:
@@ -22,7 +37,9 @@ def load_config(config_path: str = "config.yml") -> Dict[str, Any]:
         "background_color": "white",
         "theme": "default",
         "scale": 2,
-        "timeout": 30000
+        "timeout": 30000,
+        "persistent_renderer": True,
+        "dependency_check_ttl": DEFAULT_DEPENDENCY_TTL
     }
     
     try:
@@ -146,6 +163,44 @@ def render_mermaid_with_mcp(mermaid_code: str, output_path: Path, config: Dict[s
             pass
 
 
+def start_renderer(config: Dict[str, Any]) -> Optional[MermaidRenderer]:
+    """Set up the persistent renderer, or return None to fall back to one mermaid-mcp process per diagram.
+    
+    The browser itself is only launched by the first diagram that is not already in the render cache.
+    """
+    renderer = MermaidRenderer(puppeteer_options=config.get("puppeteer"))
+    if not renderer.installed_version():
+        print("Persistent renderer unavailable (global @mermaid-js/mermaid-cli not found), falling back to mermaid-mcp")
+        return None
+    return renderer
+
+
+def renderer_version(renderer: Optional[MermaidRenderer] = None) -> str:
+    """Identify the renderer that will draw the next diagram, for the render cache key."""
+    if renderer and not renderer.unavailable:
+        return f"mermaid-cli {renderer.installed_version()}"
+    try:
+        return f"mermaid-mcp {version('mermaid-mcp')}"
+    except PackageNotFoundError:
+        return "mermaid-mcp unknown"
+
+
+def render_diagram(mermaid_code: str, output_path: Path, config: Dict[str, Any],
+                   renderer: Optional[MermaidRenderer] = None) -> str:
+    """Render one diagram through the persistent renderer if there is one, otherwise through mermaid-mcp.
+    
+    Returns the version of the renderer that drew it.
+    """
+    if renderer and not renderer.unavailable:
+        try:
+            renderer.render(mermaid_code, output_path, config)
+            return renderer_version(renderer)
+        except RendererUnavailable as e:
+            print(f"Persistent renderer unavailable ({e}), falling back to mermaid-mcp")
+    render_mermaid_with_mcp(mermaid_code, output_path, config)
+    return renderer_version()
+
+
 def create_output_directory(source_path: str, config: Dict[str, Any]) -> Path:
     """Create output directory structure based on source file location."""
     source_file = Path(source_path)
@@ -173,8 +228,23 @@ def generate_filename(source_path: str, index: int, config: Dict[str, Any]) -> s
     return f"{base_name}-{suffix}.{extension}"
 
 
-def process_markdown_file(source_path: str, config: Dict[str, Any]) -> List[Path]:
-    """Process markdown file and generate images for all mermaid blocks."""
+def render_markdown_file(source_path: str, config: Dict[str, Any],
+                         renderer: Optional[MermaidRenderer] = None,
+                         cache: Optional[RenderCache] = None, verbose: bool = True,
+                         only: Optional[Set[int]] = None, metrics: Optional[Metrics] = None) -> Dict[str, Any]:
+    """Generate images for all mermaid blocks in a markdown file and report what happened.
+    
+    All blocks go through ``renderer``; pass one in to share it across files. Without one, a persistent
+    renderer is started for this file when ``config["persistent_renderer"]`` allows it. Blocks found in
+    ``cache`` are linked from it instead of being rendered. ``only`` limits rendering to those block numbers.
+    Each diagram is recorded as a ``render`` event in ``metrics``, and the file as a whole as a ``file`` event.
+    
+    Returns the source, block count, generated files, number of cache hits, per-block errors and seconds taken.
+    """
+    log = print if verbose else (lambda *a, **k: None)
+    metrics = metrics or NO_METRICS
+    started = time.monotonic()
+    
     try:
         with open(source_path, 'r', encoding='utf-8') as f:
             content = f.read()
@@ -185,42 +255,266 @@ def process_markdown_file(source_path: str, config: Dict[str, Any]) -> List[Path
     
     # Extract mermaid blocks
     mermaid_blocks = extract_mermaid_blocks(content)
+    result = {'source': source_path, 'blocks': len(mermaid_blocks), 'generated': [], 'cached': 0, 'errors': []}
     
     if not mermaid_blocks:
-        print(f"No mermaid blocks found in {source_path}")
-        return []
+        log(f"No mermaid blocks found in {source_path}")
+        result['seconds'] = time.monotonic() - started
+        metrics.emit("file", result['seconds'], source=source_path, blocks=0)
+        return result
     
-    print(f"Found {len(mermaid_blocks)} mermaid diagram(s) in {source_path}")
+    log(f"Found {len(mermaid_blocks)} mermaid diagram(s) in {source_path}")
     
     # Create output directory
     output_dir = create_output_directory(source_path, config)
     
-    generated_files = []
+    owns_renderer = renderer is None and config.get("persistent_renderer", True)
+    if owns_renderer:
+        renderer = start_renderer(config)
     
-    # Process each mermaid block
-    for i, mermaid_code in enumerate(mermaid_blocks, 1):
+    try:
+        # Process each mermaid block
+        for i, mermaid_code in enumerate(mermaid_blocks, 1):
+            if only is not None and i not in only:
+                continue
+            diagram_started = time.monotonic()
+            event = {'source': source_path, 'index': i, 'type': infer_diagram_type(mermaid_code)}
+            try:
+                log(f"Generating image {i} of {len(mermaid_blocks)}...")
+                
+                # Create filename
+                filename = generate_filename(source_path, i, config)
+                output_path = output_dir / filename
+                
+                # Reuse an identical earlier render
+                if cache and cache.fetch(render_key(mermaid_code, config, renderer_version(renderer)),
+                                         config["image_format"], output_path):
+                    result['generated'].append(output_path)
+                    result['cached'] += 1
+                    metrics.emit("render", time.monotonic() - diagram_started, ok=True, cached=True, **event)
+                    log(f"✓ Cached: {output_path}")
+                    continue
+                
+                # Generate image, first unlinking any earlier output so a hardlinked cache entry is not overwritten
+                if cache:
+                    output_path.unlink(missing_ok=True)
+                used_version = render_diagram(mermaid_code, output_path, config, renderer)
+                result['generated'].append(output_path)
+                if cache:
+                    cache.store(render_key(mermaid_code, config, used_version), config["image_format"], output_path)
+                metrics.emit("render", time.monotonic() - diagram_started, ok=True, cached=False,
+                             renderer=used_version,
+                             bytes_out=output_path.stat().st_size if output_path.exists() else None, **event)
+                
+                log(f"✓ Generated: {output_path}")
+                
+            except Exception as e:
+                result['errors'].append((i, str(e)))
+                metrics.emit("render", time.monotonic() - diagram_started, ok=False, error=str(e), **event)
+                log(f"✗ Error generating image {i}: {e}")
+                continue
+    finally:
+        if owns_renderer and renderer:
+            renderer.close()
+    
+    result['seconds'] = time.monotonic() - started
+    metrics.emit("file", result['seconds'], source=source_path, blocks=len(mermaid_blocks),
+                 diagrams_rendered=len(result['generated']) - result['cached'], diagrams_cached=result['cached'],
+                 failed=len(result['errors']))
+    return result
+
+
+def process_markdown_file(source_path: str, config: Dict[str, Any],
+                          renderer: Optional[MermaidRenderer] = None,
+                          cache: Optional[RenderCache] = None, metrics: Optional[Metrics] = None) -> List[Path]:
+    """Process markdown file and generate images for all mermaid blocks."""
+    return render_markdown_file(source_path, config, renderer, cache, metrics=metrics)['generated']
+
+
+def is_glob(pattern: str) -> bool:
+    return any(char in pattern for char in '*?[')
+
+
+def collect_sources(patterns: List[str]) -> List[str]:
+    """Expand files, directories (searched recursively) and glob patterns into markdown files."""
+    sources = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if is_glob(pattern) else [pattern]
+        for match in matches:
+            path = Path(match)
+            if path.is_dir():
+                sources.extend(str(md_file) for md_file in sorted(path.rglob('*.md')))
+            elif path.is_file() and (path.suffix == '.md' or not is_glob(pattern)):
+                sources.append(str(path))
+    return list(dict.fromkeys(sources))
+
+
+def render_many(sources: List[str], config: Dict[str, Any], workers: int = 4,
+                cache: Optional[RenderCache] = None, metrics: Optional[Metrics] = None) -> List[Dict[str, Any]]:
+    """Render many markdown files across a worker pool, one persistent renderer per worker."""
+    renderers: "queue.Queue[Optional[MermaidRenderer]]" = queue.Queue()
+    first = start_renderer(config) if config.get("persistent_renderer", True) else None
+    created = [first]
+    if first:
+        created += [MermaidRenderer(first.modules_root, first.puppeteer_options) for _ in range(workers - 1)]
+    else:
+        created += [None] * (workers - 1)
+    for renderer in created:
+        renderers.put(renderer)
+    
+    def render(source: str) -> Dict[str, Any]:
+        renderer = renderers.get()
         try:
-            print(f"Generating image {i} of {len(mermaid_blocks)}...")
-            
-            # Create filename
-            filename = generate_filename(source_path, i, config)
-            output_path = output_dir / filename
-            
-            # Generate image
-            render_mermaid_with_mcp(mermaid_code, output_path, config)
-            generated_files.append(output_path)
-            
-            print(f"✓ Generated: {output_path}")
-            
+            return render_markdown_file(source, config, renderer, cache, verbose=False, metrics=metrics)
         except Exception as e:
-            print(f"✗ Error generating image {i}: {e}")
+            return {'source': source, 'blocks': 0, 'generated': [], 'cached': 0, 'errors': [(0, str(e))],
+                    'seconds': 0.0}
+        finally:
+            renderers.put(renderer)
+    
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(render, source) for source in sources]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if result['errors']:
+                    mark = "✗"
+                elif result['blocks'] and result['cached'] == result['blocks']:
+                    mark = "↺"
+                else:
+                    mark = "✓"
+                print(f"{mark} {result['source']}: {len(result['generated'])}/{result['blocks']} image(s) "
+                      f"in {result['seconds']:.1f}s")
+                for index, error in result['errors']:
+                    print(f"    ✗ Image {index}: {error}" if index else f"    ✗ {error}")
+    finally:
+        for renderer in created:
+            if renderer:
+                renderer.close()
+    
+    order = {source: i for i, source in enumerate(sources)}
+    return sorted(results, key=lambda result: order[result['source']])
+
+
+def watch_sources(patterns: List[str], config: Dict[str, Any], cache: Optional[RenderCache] = None,
+                  metrics: Optional[Metrics] = None) -> None:
+    """Re-render changed diagrams whenever a watched markdown file is saved, until interrupted.
+    
+    Only blocks whose source changed since the last render are drawn again, through one renderer that stays
+    warm between changes. Images for blocks that were removed from a file are deleted. The Prometheus
+    textfile of ``metrics`` is rewritten after every change.
+    """
+    metrics = metrics or NO_METRICS
+    from watching import watch
+    
+    def block_keys(source: str) -> List[str]:
+        content = Path(source).read_text(encoding='utf-8')
+        return [render_key(code, config, "") for code in extract_mermaid_blocks(content)]
+    
+    # Remember each file's blocks so a save only re-renders what differs
+    known = {}
+    for source in collect_sources(patterns):
+        try:
+            known[str(Path(source).resolve())] = block_keys(source)
+        except OSError:
             continue
     
-    return generated_files
+    roots = set()
+    for pattern in patterns:
+        if is_glob(pattern):
+            prefix = []
+            for part in Path(pattern).parts:
+                if is_glob(part):
+                    break
+                prefix.append(part)
+            roots.add(Path(*prefix) if prefix else Path('.'))
+        else:
+            path = Path(pattern)
+            roots.add(path if path.is_dir() else path.parent)
+    
+    def accept(path: Path) -> bool:
+        if path.suffix != '.md':
+            return False
+        relative = Path(os.path.relpath(path))
+        for pattern in patterns:
+            if is_glob(pattern):
+                if relative.full_match(pattern):
+                    return True
+            elif Path(pattern).is_dir():
+                if path.resolve().is_relative_to(Path(pattern).resolve()):
+                    return True
+            elif path.resolve() == Path(pattern).resolve():
+                return True
+        return False
+    
+    renderer = start_renderer(config) if config.get("persistent_renderer", True) else None
+    
+    def on_change(paths: List[Path]) -> None:
+        for path in paths:
+            started = time.monotonic()
+            source = os.path.relpath(path)
+            try:
+                keys = block_keys(source)
+            except OSError as e:
+                print(f"✗ {source}: {e}")
+                continue
+            previous = known.get(str(path.resolve()), [])
+            known[str(path.resolve())] = keys
+            
+            changed = {i for i, key in enumerate(keys, 1) if i > len(previous) or previous[i - 1] != key}
+            output_dir = Path(config["output_dir"]) / path.parent.name
+            changed |= {i for i in range(1, len(keys) + 1)
+                        if not (output_dir / generate_filename(source, i, config)).exists()}
+            for i in range(len(keys) + 1, len(previous) + 1):
+                (output_dir / generate_filename(source, i, config)).unlink(missing_ok=True)
+            
+            if not changed:
+                continue
+            result = render_markdown_file(source, config, renderer, cache, verbose=False, only=changed,
+                                          metrics=metrics)
+            for index, error in result['errors']:
+                print(f"✗ {source} image {index}: {error}")
+            rendered = len(result['generated'])
+            print(f"{'✗' if result['errors'] else '✓'} {source}: re-rendered {rendered}/{len(changed)} "
+                  f"changed diagram(s) in {time.monotonic() - started:.2f}s")
+        metrics.write_prometheus()
+    
+    print(f"Watching {', '.join(str(root) for root in sorted(roots))} for changes (Ctrl+C to stop)...")
+    try:
+        watch(sorted(roots), on_change, accept)
+    finally:
+        if renderer:
+            renderer.close()
+
+
+def print_render_report(results: List[Dict[str, Any]], elapsed: float) -> None:
+    """Print totals for a multi-file run."""
+    diagrams = sum(result['blocks'] for result in results)
+    generated = sum(len(result['generated']) for result in results)
+    cached = sum(result['cached'] for result in results)
+    failed = sum(len(result['errors']) for result in results)
+    failed_files = [result for result in results if result['errors']]
+    
+    print(f"\nFiles: {len(results)} ({len(failed_files)} with errors)")
+    print(f"Diagrams: {diagrams} found, {generated - cached} rendered, {cached} from cache, {failed} failed")
+    print(f"Time: {elapsed:.1f}s total, {sum(result['seconds'] for result in results):.1f}s rendering")
+    
+    slowest = sorted(results, key=lambda result: result['seconds'], reverse=True)[:3]
+    if len(results) > 1 and round(slowest[0]['seconds'], 1) > 0:
+        print("Slowest files:")
+        for result in slowest:
+            print(f"  - {result['source']}: {result['seconds']:.1f}s")
+    
+    if failed_files:
+        print("\nFailed:")
+        for result in failed_files:
+            print(f"  - {result['source']}")
 
 
-def check_dependencies():
-    """Check if required dependencies are available."""
+def probe_dependencies():
+    """Run the dependency checks, starting each tool once."""
     try:
         # Check if mmdc is available
         result = subprocess.run(['mmdc', '--version'], capture_output=True, text=True)
@@ -248,6 +542,45 @@ def check_dependencies():
         raise Exception(f"Error checking mermaid-mcp: {e}")
 
 
+def tool_fingerprint() -> Dict[str, Any]:
+    """Resolved path and modification time of each required tool, or None for tools not on PATH."""
+    fingerprint = {}
+    for tool in ('mmdc', 'mermaid-mcp'):
+        path = shutil.which(tool)
+        try:
+            fingerprint[tool] = [path, os.stat(path).st_mtime_ns] if path else None
+        except OSError:
+            fingerprint[tool] = None
+    return fingerprint
+
+
+def check_dependencies(max_age: float = DEFAULT_DEPENDENCY_TTL, cache_path: Path = DEPENDENCY_CACHE):
+    """Check if required dependencies are available.
+    
+    Starting both tools costs two Node/Python cold starts, so a successful check is remembered for
+    ``max_age`` seconds. It is redone sooner if either tool is moved, reinstalled or upgraded. Failures
+    are never remembered, and ``max_age=0`` always probes.
+    """
+    fingerprint = tool_fingerprint()
+    if max_age > 0 and all(fingerprint.values()):
+        try:
+            cached = json.loads(Path(cache_path).read_text(encoding='utf-8'))
+            if cached['tools'] == fingerprint and 0 <= time.time() - cached['checked_at'] < max_age:
+                return
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+    
+    probe_dependencies()
+    
+    if all(fingerprint.values()):
+        try:
+            Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+            Path(cache_path).write_text(json.dumps({'tools': fingerprint, 'checked_at': time.time()}),
+                                        encoding='utf-8')
+        except OSError:
+            pass
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Convert Mermaid diagrams in markdown files to high-quality images using official Mermaid CLI",
@@ -257,6 +590,8 @@ Examples:
   python mermaid_to_image.py diagram.md
   python mermaid_to_image.py diagram.md --config custom_config.yml
   python mermaid_to_image.py diagram.md --format svg --theme dark
+  python mermaid_to_image.py mermaid/ --workers 8
+  python mermaid_to_image.py 'mermaid/**/*.md'
   
 Dependencies:
   - Mermaid CLI: npm install -g @mermaid-js/mermaid-cli
@@ -264,7 +599,8 @@ Dependencies:
         """
     )
     
-    parser.add_argument('source', nargs='?', help='Path to markdown file containing mermaid diagrams')
+    parser.add_argument('sources', nargs='*', metavar='source',
+                       help='Markdown files, directories or glob patterns containing mermaid diagrams')
     parser.add_argument('--config', default='config.yml', help='Path to config file (default: config.yml)')
     parser.add_argument('--format', choices=['png', 'svg', 'pdf'], help='Output image format')
     parser.add_argument('--output-dir', help='Output directory for images')
@@ -274,28 +610,47 @@ Dependencies:
                        help='Mermaid theme')
     parser.add_argument('--background', help='Background color (e.g., white, transparent, #F0F0F0)')
     parser.add_argument('--check-deps', action='store_true', help='Check if all dependencies are installed')
+    parser.add_argument('--cache-dir', default=str(DEFAULT_RENDER_CACHE_DIR),
+                       help=f'Directory for cached renders (default: {DEFAULT_RENDER_CACHE_DIR})')
+    parser.add_argument('--no-cache', action='store_true', help='Render every diagram even if it is unchanged')
+    parser.add_argument('--watch', action='store_true',
+                       help='Keep running and re-render changed diagrams when sources change (default source: mermaid)')
+    parser.add_argument('--workers', type=int, default=4,
+                       help='Files rendered in parallel when given several sources (default: 4)')
+    parser.add_argument('--no-persistent-renderer', action='store_true',
+                       help='Start a separate mermaid-mcp process for every diagram instead of reusing one browser')
+    parser.add_argument('--metrics', metavar='FILE',
+                       help='Append a JSON line per rendered diagram and file to FILE')
+    parser.add_argument('--prometheus', metavar='FILE',
+                       help="Write the run's render totals to FILE for the Prometheus textfile collector")
     
     args = parser.parse_args()
+    metrics = Metrics("mermaid_to_image", args.metrics, args.prometheus)
     
     try:
         # Check dependencies if requested
         if args.check_deps:
             print("Checking dependencies...")
-            check_dependencies()
+            check_dependencies(max_age=0)
             print("✓ All dependencies are available")
             return
         
+        if args.watch and not args.sources:
+            args.sources = ['mermaid']
+        
         # Validate source file is provided
-        if not args.source:
+        if not args.sources:
             print("Error: Source file is required (unless using --check-deps)")
             sys.exit(1)
-        
-        # Check dependencies silently
-        check_dependencies()
+        if args.workers < 1:
+            parser.error("--workers must be at least 1")
         
         # Load configuration
         config = load_config(args.config)
         
+        # Check dependencies silently, trusting a recent successful check
+        check_dependencies(config['dependency_check_ttl'])
+        
         # Override config with command line arguments
         if args.format:
             config['image_format'] = args.format
@@ -309,23 +664,53 @@ Dependencies:
             config['theme'] = args.theme
         if args.background:
             config['background_color'] = args.background
+        if args.no_persistent_renderer:
+            config['persistent_renderer'] = False
+        
+        cache = None if args.no_cache else RenderCache(Path(args.cache_dir))
+        
+        if args.watch:
+            watch_sources(args.sources, config, cache, metrics)
+            return
+        
+        # Directories, globs and multiple files are rendered in parallel with an aggregate report
+        if len(args.sources) > 1 or os.path.isdir(args.sources[0]) or is_glob(args.sources[0]):
+            sources = collect_sources(args.sources)
+            if not sources:
+                print(f"Error: No markdown files found in {', '.join(args.sources)}")
+                sys.exit(1)
+            
+            print(f"Processing: {len(sources)} file(s) with {args.workers} worker(s)")
+            print(f"Output directory: {config['output_dir']}")
+            print(f"Format: {config['image_format']} ({config['width']}x{config['height']})")
+            print(f"Theme: {config['theme']}, Background: {config['background_color']}")
+            print()
+            
+            started = time.monotonic()
+            results = render_many(sources, config, min(args.workers, len(sources)), cache, metrics)
+            print_render_report(results, time.monotonic() - started)
+            if any(result['errors'] for result in results) or not any(result['generated'] for result in results):
+                sys.exit(1)
+            return
+        
+        source = args.sources[0]
         
         # Validate source file
-        if not os.path.exists(args.source):
-            print(f"Error: Source file '{args.source}' not found")
+        if not os.path.exists(source):
+            print(f"Error: Source file '{source}' not found")
             sys.exit(1)
         
-        if not args.source.endswith('.md'):
-            print(f"Warning: Source file '{args.source}' does not have .md extension")
+        if not source.endswith('.md'):
+            print(f"Warning: Source file '{source}' does not have .md extension")
         
         # Process the file
-        print(f"Processing: {args.source}")
+        print(f"Processing: {source}")
         print(f"Output directory: {config['output_dir']}")
         print(f"Format: {config['image_format']} ({config['width']}x{config['height']})")
         print(f"Theme: {config['theme']}, Background: {config['background_color']}")
         print()
         
-        generated_files = process_markdown_file(args.source, config)
+        generated_files = process_markdown_file(source, config, cache=cache, metrics=metrics)
         
         if generated_files:
             print(f"\n✓ Successfully generated {len(generated_files)} image(s):")
@@ -341,6 +726,8 @@ Dependencies:
     except Exception as e:
         print(f"\nError: {e}")
         sys.exit(1)
+    finally:
+        metrics.close()
 
 
 if __name__ == '__main__':
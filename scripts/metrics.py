@@ -0,0 +1,155 @@
+"""Structured per-stage metrics: events appended as JSON lines and totals written as a Prometheus textfile."""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Numeric event fields that are summed into Prometheus counters, with their help text
+COUNTERS = {
+    'bytes_in': "Bytes read from the network or disk",
+    'bytes_out': "Bytes written to output files",
+    'bytes_removed': "Bytes pruned from pages before readability",
+    'images_found': "Images referenced by processed documents",
+    'images_downloaded': "Images saved to an output folder",
+    'images_failed': "Images that could not be saved",
+    'diagrams_rendered': "Mermaid diagrams drawn by a renderer",
+    'diagrams_cached': "Mermaid diagrams linked from the render cache",
+}
+
+# Event fields that become Prometheus labels besides tool and stage; anything else stays in the JSON lines only
+LABELS = ('host',)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    """Recorder for the stage events of one tool run.
+
+    Every event is appended to ``events_path`` as one JSON object per line, as it happens. Stage timings,
+    failures and the ``COUNTERS`` fields are also totalled per tool, stage and host, and ``close()`` writes
+    the totals to ``prometheus_path`` for node_exporter's textfile collector. Without either path the
+    recorder does nothing, so the scripts can call it unconditionally.
+    """
+
+    def __init__(self, tool: str, events_path: Optional[Path] = None, prometheus_path: Optional[Path] = None):
+        self.tool = tool
+        self.events_path = Path(events_path) if events_path else None
+        self.prometheus_path = Path(prometheus_path) if prometheus_path else None
+        self.enabled = bool(self.events_path or self.prometheus_path)
+        self._lock = threading.Lock()
+        self._events = None
+        self._durations: Dict[Tuple[str, ...], Tuple[float, int, float]] = {}
+        self._failures: Dict[Tuple[str, ...], int] = {}
+        self._counters: Dict[Tuple[str, Tuple[str, ...]], float] = {}
+
+        if self.events_path:
+            self.events_path.parent.mkdir(parents=True, exist_ok=True)
+            self._events = open(self.events_path, 'a', encoding='utf-8')
+
+    def emit(self, stage: str, seconds: Optional[float] = None, **fields: Any) -> None:
+        """Record one event of ``stage``; ``ok=False`` in ``fields`` counts it as a failure."""
+        if not self.enabled:
+            return
+        event = {'time': round(time.time(), 3), 'tool': self.tool, 'stage': stage}
+        if seconds is not None:
+            event['seconds'] = round(seconds, 6)
+        event.update(fields)
+        key = (stage, *(str(fields.get(label, "")) for label in LABELS))
+
+        with self._lock:
+            if self._events:
+                self._events.write(json.dumps(event, default=str) + "\n")
+                self._events.flush()
+            if seconds is not None:
+                total, count, slowest = self._durations.get(key, (0.0, 0, 0.0))
+                self._durations[key] = (total + seconds, count + 1, max(slowest, seconds))
+            if fields.get('ok') is False:
+                self._failures[key] = self._failures.get(key, 0) + 1
+            for name in COUNTERS:
+                value = fields.get(name)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self._counters[name, key] = self._counters.get((name, key), 0) + value
+
+    @contextmanager
+    def timed(self, stage: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+        """Time the block as one ``stage`` event. Fields added to the yielded dict are recorded with it.
+
+        A block that raises is recorded with ``ok=False`` and the error, and the exception propagates.
+        """
+        started = time.perf_counter()
+        try:
+            yield fields
+        except BaseException as e:
+            fields.update(ok=False, error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            self.emit(stage, time.perf_counter() - started, **fields)
+
+    def _labels(self, key: Tuple[str, ...]) -> str:
+        pairs = [('tool', self.tool), ('stage', key[0])]
+        pairs += [(label, value) for label, value in zip(LABELS, key[1:]) if value]
+        return ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+
+    def prometheus_text(self) -> str:
+        """The run's totals in the Prometheus text exposition format."""
+        with self._lock:
+            durations = sorted(self._durations.items())
+            failures = sorted(self._failures.items())
+            counters = sorted(self._counters.items())
+
+        lines = [
+            "# HELP analyst_stage_seconds Time spent in each pipeline stage.",
+            "# TYPE analyst_stage_seconds summary",
+        ]
+        for key, (total, count, _) in durations:
+            lines.append(f"analyst_stage_seconds_sum{{{self._labels(key)}}} {total:.6f}")
+            lines.append(f"analyst_stage_seconds_count{{{self._labels(key)}}} {count}")
+        lines += [
+            "# HELP analyst_stage_max_seconds Slowest single event of each pipeline stage.",
+            "# TYPE analyst_stage_max_seconds gauge",
+        ]
+        lines += [f"analyst_stage_max_seconds{{{self._labels(key)}}} {slowest:.6f}"
+                  for key, (_, _, slowest) in durations]
+        lines += [
+            "# HELP analyst_stage_failures_total Pipeline stage events that failed.",
+            "# TYPE analyst_stage_failures_total counter",
+        ]
+        lines += [f"analyst_stage_failures_total{{{self._labels(key)}}} {count}" for key, count in failures]
+        for name, help_text in COUNTERS.items():
+            values = [(key, value) for (counter, key), value in counters if counter == name]
+            if values:
+                lines += [f"# HELP analyst_{name}_total {help_text}.", f"# TYPE analyst_{name}_total counter"]
+                lines += [f"analyst_{name}_total{{{self._labels(key)}}} {value}" for key, value in values]
+        lines += [
+            "# HELP analyst_last_run_timestamp_seconds When the tool last finished a run.",
+            "# TYPE analyst_last_run_timestamp_seconds gauge",
+            f'analyst_last_run_timestamp_seconds{{tool="{_escape(self.tool)}"}} {time.time():.3f}',
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self) -> None:
+        """Replace the textfile atomically, so the collector never reads a partial file."""
+        if not self.prometheus_path:
+            return
+        self.prometheus_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.prometheus_path.with_name(f".{self.prometheus_path.name}.{os.getpid()}.part")
+        temp_path.write_text(self.prometheus_text(), encoding='utf-8')
+        os.replace(temp_path, self.prometheus_path)
+
+    def close(self) -> None:
+        """Write the Prometheus textfile and close the events file."""
+        self.write_prometheus()
+        with self._lock:
+            if self._events:
+                self._events.close()
+                self._events = None
+
+
+# Shared recorder for callers that pass no metrics
+NO_METRICS = Metrics("")
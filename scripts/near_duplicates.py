@@ -0,0 +1,207 @@
+"""MinHash signatures and a persistent LSH index for spotting near-duplicate articles before processing them."""
+
+import hashlib
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_DUPLICATES_DB = Path(".cache") / "near_duplicates.sqlite"
+
+# 128 permutations split into 16 bands of 8 rows: pairs above ~0.7 Jaccard similarity almost always share
+# a band, and candidates are then confirmed against DEFAULT_THRESHOLD using the full signatures
+NUM_PERMUTATIONS = 128
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+DEFAULT_THRESHOLD = 0.8
+SHINGLE_SIZE = 5
+
+# Word hashes are 64-bit FNV-1a over the characters of each word. Words longer than this are hashed by their
+# prefix, which bounds the memory of the vectorised hash
+MAX_WORD_CHARS = 64
+_FNV_OFFSET = np.uint64(0xcbf29ce484222325)
+_FNV_PRIME = np.uint64(0x100000001b3)
+
+# Signatures from an earlier hashing scheme cannot be compared with current ones; the index is cleared when
+# the version stored in it differs
+SIGNATURE_VERSION = 2
+
+# Each permutation is the universal hash h(x) = ((a * x + b) mod p) mod 2^32 over the Mersenne prime
+# p = 2^61 - 1, as in standard MinHash. Shingle hashes x and the coefficients a, b are below 2^32, so
+# a * x + b <= (2^32 - 1)^2 + 2^32 - 1 < 2^64 and the uint64 arithmetic is exact before the reduction mod p
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.default_rng(20240601)
+_PERM_A = _rng.integers(1, 1 << 32, size=NUM_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 1 << 32, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def word_hashes(words: List[str]) -> np.ndarray:
+    """64-bit FNV-1a hashes of ``words``, computed for all distinct words at once, one character at a time."""
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    vocabulary: Dict[str, int] = {}
+    ids = np.array([vocabulary.setdefault(word[:MAX_WORD_CHARS], len(vocabulary)) for word in words])
+    # A fixed-width unicode array is a (words x characters) matrix of code points, zero-padded on the right
+    codes = np.array(list(vocabulary)).view(np.uint32).reshape(len(vocabulary), -1)
+    hashes = np.full(len(vocabulary), _FNV_OFFSET, dtype=np.uint64)
+    for column in codes.T.astype(np.uint64):
+        # Padding is skipped, so a word hashes the same whatever the longest word next to it; the multiply
+        # wraps modulo 2^64 as FNV intends
+        hashes = np.where(column != 0, (hashes ^ column) * _FNV_PRIME, hashes)
+    return hashes[ids]
+
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """32-bit hashes of the distinct word ``size``-grams in ``text``, combined from per-word hashes."""
+    hashes = word_hashes(WORD_PATTERN.findall(text.lower()))
+    if not hashes.size:
+        return hashes
+    size = min(size, hashes.size)
+    count = hashes.size - size + 1
+    shingles = np.full(count, _FNV_OFFSET, dtype=np.uint64)
+    for offset in range(size):
+        shingles = (shingles ^ hashes[offset:offset + count]) * _FNV_PRIME
+    # Fold the high bits in before truncating, so the 32-bit hash depends on the whole shingle
+    return np.unique((shingles ^ (shingles >> np.uint64(32))) & _MAX_HASH)
+
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    """MinHash signature of ``text`` as NUM_PERMUTATIONS unsigned 32-bit values, or None if it has no words.
+
+    Texts without words (an image-only article, say) have no shingles to compare, so they get no signature
+    rather than one that would match every other empty text.
+    """
+    hashes = shingle_hashes(text)
+    if not hashes.size:
+        return None
+    # Vectorised over shingles and permutations in bounded chunks, reusing the buffers between chunks
+    signature = np.full(NUM_PERMUTATIONS, _MAX_HASH, dtype=np.uint64)
+    high = np.empty((min(hashes.size, 1024), NUM_PERMUTATIONS), dtype=np.uint64)
+    for start in range(0, hashes.size, 1024):
+        permuted = np.outer(hashes[start:start + 1024], _PERM_A)
+        permuted += _PERM_B
+        # mod 2^61 - 1 without a division: v = hi * 2^61 + lo is congruent to hi + lo, which for v < 2^64 is
+        # below 2p, so one conditional subtraction finishes the reduction
+        carry = high[:len(permuted)]
+        np.right_shift(permuted, np.uint64(61), out=carry)
+        permuted &= _MERSENNE_PRIME
+        permuted += carry
+        np.subtract(permuted, _MERSENNE_PRIME, out=permuted, where=permuted >= _MERSENNE_PRIME)
+        permuted &= _MAX_HASH
+        np.minimum(signature, permuted.min(axis=0), out=signature)
+    return signature.astype(np.uint32)
+
+
+def similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return float(np.mean(first == second))
+
+
+def band_keys(signature: np.ndarray) -> List[int]:
+    """One signed 64-bit bucket key per band of the signature."""
+    return [int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=8).digest(), 'little', signed=True)
+            for band in signature.reshape(BANDS, ROWS_PER_BAND)]
+
+
+class NearDuplicateIndex:
+    """LSH index of MinHash signatures in SQLite, partitioned by collection.
+
+    The scripts use their output folder as the collection. That keeps the html/ archives and the
+    markdown/ conversions apart, so converting an HTML archive to markdown is not mistaken for a duplicate
+    of the archive itself.
+    """
+
+    def __init__(self, path: Path = DEFAULT_DUPLICATES_DB, threshold: float = DEFAULT_THRESHOLD):
+        self.path = Path(path)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """One connection per operation, so the index can be shared by batch worker threads."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with self._lock, connection:
+                self._initialize(connection)
+                yield connection
+        finally:
+            connection.close()
+
+    def _initialize(self, connection: sqlite3.Connection) -> None:
+        if not self._initialized:
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY,
+                    collection TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    location TEXT NOT NULL,
+                    signature BLOB NOT NULL,
+                    UNIQUE (collection, key)
+                );
+                CREATE TABLE IF NOT EXISTS bands (
+                    collection TEXT NOT NULL,
+                    band INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    document_id INTEGER NOT NULL REFERENCES documents (id) ON DELETE CASCADE
+                );
+                CREATE INDEX IF NOT EXISTS bands_lookup ON bands (collection, band, bucket);
+                CREATE INDEX IF NOT EXISTS bands_document ON bands (document_id);
+            """)
+            if connection.execute("PRAGMA user_version").fetchone()[0] != SIGNATURE_VERSION:
+                connection.execute("DELETE FROM bands")
+                connection.execute("DELETE FROM documents")
+                connection.execute(f"PRAGMA user_version = {SIGNATURE_VERSION}")
+            self._initialized = True
+
+    def find(self, collection: str, signature: Optional[np.ndarray], exclude_key: Optional[str] = None
+             ) -> List[Tuple[str, str, float]]:
+        """Indexed documents at or above the threshold, as (key, location, similarity), most similar first.
+
+        A text without a signature (see ``minhash``) matches nothing.
+        """
+        if signature is None:
+            return []
+        with self._transaction() as connection:
+            candidates = set()
+            for band, bucket in enumerate(band_keys(signature)):
+                rows = connection.execute(
+                    "SELECT document_id FROM bands WHERE collection = ? AND band = ? AND bucket = ?",
+                    (collection, band, bucket))
+                candidates.update(row[0] for row in rows)
+
+            matches = []
+            for document_id in candidates:
+                key, location, blob = connection.execute(
+                    "SELECT key, location, signature FROM documents WHERE id = ?", (document_id,)).fetchone()
+                if key == exclude_key:
+                    continue
+                score = similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+                if score >= self.threshold:
+                    matches.append((key, location, score))
+        return sorted(matches, key=lambda match: -match[2])
+
+    def add(self, collection: str, key: str, location: str, signature: Optional[np.ndarray]) -> None:
+        """Record (or replace) the signature of ``key``. Without a signature, any previous one is removed."""
+        with self._transaction() as connection:
+            previous = connection.execute(
+                "SELECT id FROM documents WHERE collection = ? AND key = ?", (collection, key)).fetchone()
+            if previous:
+                connection.execute("DELETE FROM bands WHERE document_id = ?", previous)
+                connection.execute("DELETE FROM documents WHERE id = ?", previous)
+            if signature is None:
+                return
+            cursor = connection.execute(
+                "INSERT INTO documents (collection, key, location, signature) VALUES (?, ?, ?, ?)",
+                (collection, key, location, signature.astype(np.uint32).tobytes()))
+            connection.executemany(
+                "INSERT INTO bands (collection, band, bucket, document_id) VALUES (?, ?, ?, ?)",
+                [(collection, band, bucket, cursor.lastrowid) for band, bucket in enumerate(band_keys(signature))])
@@ -0,0 +1,142 @@
+"""Parse-once HTML document shared by the html_downloader and article_to_md pipeline stages."""
+
+import hashlib
+import re
+from typing import Any, Dict, Iterable, Optional, Union
+
+import lxml.etree
+import lxml.html
+from bs4 import BeautifulSoup
+
+# Start of a tag, comment or doctype, as html.parser would recognise it
+TAG_START = re.compile(r'<[A-Za-z!/?]')
+
+# Nodes pruned from the tree before readability scores it
+PRUNE_RULES = {
+    'scripts': "//script",  # inline code and JSON hydration blobs such as Next.js __NEXT_DATA__
+    'styles': "//style | //link",
+    'noscript': "//noscript",
+    'comments': "//comment() | //processing-instruction()",
+    'templates': "//template",
+    # Sprite sheets only: an <svg> holding nothing but <defs>/<symbol> and no text of its own draws nothing
+    'svg-sprites': "//svg[.//symbol][not(*[not(self::defs or self::symbol)])][not(text()[normalize-space()])]",
+    'hidden': "//*[@hidden] | //*[@style][contains(translate(translate(@style, ' ', ''), 'DISPLAYNOE', 'displaynoe'), "
+              "'display:none')]",
+}
+
+# Rules whose nodes readability discards itself, but only after walking, copying and cleaning them on every
+# pass. Removing them up front leaves its output unchanged while its cost follows the size of the content
+# instead of the size of the page. 'templates' is not among them: readability keeps the text of a <template>
+DEFAULT_PRUNE_RULES = ('scripts', 'styles', 'noscript', 'comments', 'svg-sprites', 'hidden')
+
+
+def resolve_prune_rules(rules: Iterable[str]) -> Dict[str, lxml.etree.XPath]:
+    """Compile prune rules given by name (see ``PRUNE_RULES``) or as XPath expressions.
+
+    Raises ValueError for an unknown name or an invalid expression.
+    """
+    compiled = {}
+    for rule in rules:
+        expression = PRUNE_RULES.get(rule, rule)
+        if rule not in PRUNE_RULES and not expression.startswith(('/', '(')):
+            raise ValueError(f"Unknown prune rule '{rule}' (expected one of {', '.join(PRUNE_RULES)} or an XPath)")
+        try:
+            compiled[rule] = lxml.etree.XPath(expression)
+        except lxml.etree.XPathSyntaxError as e:
+            raise ValueError(f"Invalid prune rule '{rule}': {e}") from e
+    return compiled
+
+
+def prune_version(rules: Iterable[str]) -> str:
+    """Pipeline version fragment naming the prune rules, so editing a rule invalidates outputs made with it."""
+    rules = tuple(rules)
+    if not rules:
+        return "unpruned"
+    expressions = "\n".join(f"{rule}={PRUNE_RULES.get(rule, rule)}" for rule in rules)
+    return f"pruned {hashlib.sha256(expressions.encode('utf-8')).hexdigest()[:12]}"
+
+
+class ParsedDocument:
+    """HTML source parsed lazily, once, and shared by every stage.
+
+    A full page is parsed into ``tree``, the lxml element tree that validation, metadata, pruning and
+    readability all work on, so every stage sees the same (possibly pruned) document. ``soup`` is the
+    BeautifulSoup view for extracted fragments, whose image and text stages rewrite them in place and
+    keep html.parser so their serialisation is unchanged, and for readers that only need a quick look at
+    a page (catalog, corpus). A pipeline uses one view or the other for a document, never both.
+    """
+
+    def __init__(self, html: str, parser: str = 'lxml'):
+        self.html = html
+        self.parser = parser
+        self._soup: Optional[BeautifulSoup] = None
+        self._tree: Optional[lxml.html.HtmlElement] = None
+
+    @classmethod
+    def of(cls, content: Union[str, 'ParsedDocument'], parser: str = 'lxml') -> 'ParsedDocument':
+        """Return ``content`` unchanged if it is already parsed, otherwise wrap the HTML string."""
+        if isinstance(content, ParsedDocument):
+            return content
+        return cls(content, parser)
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.html, self.parser)
+        return self._soup
+
+    @property
+    def tree(self) -> lxml.html.HtmlElement:
+        if self._tree is None:
+            parser = lxml.html.HTMLParser(encoding='utf-8')
+            self._tree = lxml.html.document_fromstring(self.html.encode('utf-8'), parser=parser)
+        return self._tree
+
+    def find(self, tag: str, attrs: Optional[Dict[str, Union[str, bool]]] = None) -> Optional[lxml.html.HtmlElement]:
+        """First ``tag`` element in ``tree`` whose attributes equal ``attrs``; ``True`` only requires presence."""
+        conditions = "".join(f"[@{name}]" if value is True else f"[@{name}=$a{position}]"
+                             for position, (name, value) in enumerate((attrs or {}).items()))
+        variables = {f"a{position}": value for position, value in enumerate((attrs or {}).values())
+                     if value is not True}
+        matches = self.tree.xpath(f"//{tag}{conditions}", **variables)
+        return matches[0] if matches else None
+
+    def prune(self, rules: Iterable[str] = DEFAULT_PRUNE_RULES) -> Dict[str, Any]:
+        """Remove the nodes matched by ``rules`` from ``tree``, keeping the text that follows them.
+
+        Stages that run after pruning see the pruned page. Returns the page size in bytes, the bytes removed,
+        and the elements and bytes removed by each rule.
+        """
+        root = self.tree
+        report: Dict[str, Any] = {'bytes': len(self.html.encode('utf-8')), 'bytes_removed': 0, 'rules': {}}
+        for name, xpath in resolve_prune_rules(rules).items():
+            elements = removed = 0
+            for element in xpath(root):
+                # Skip matches inside a node already removed, and nodes outside the root element
+                if not hasattr(element, 'drop_tree') or element.getparent() is None \
+                        or element.getroottree().getroot() is not root:
+                    continue
+                removed += len(lxml.etree.tostring(element, encoding='utf-8', with_tail=False))
+                element.drop_tree()
+                elements += 1
+            report['rules'][name] = {'elements': elements, 'bytes': removed}
+            report['bytes_removed'] += removed
+        return report
+
+    def has_markup(self) -> bool:
+        """True if the source contains at least one real element."""
+        if not TAG_START.search(self.html):
+            return False
+        if self.parser == 'html.parser':
+            return bool(self.soup.find())
+        try:
+            return self.tree is not None
+        except lxml.etree.ParserError:
+            return False
+
+    def get_text(self) -> str:
+        return self.soup.get_text()
+
+    def __str__(self) -> str:
+        # Serialise the soup only once a stage has parsed (and possibly changed) it
+        return str(self._soup) if self._soup is not None else self.html
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""TF-IDF "related documents" engine over the corpus markdown, persisted as sparse matrices."""
+
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfTransformer
+from sklearn.preprocessing import normalize
+
+from corpus import discover_documents, document_text, load_document, tokenize
+from image_store import file_digest
+
+DEFAULT_RELATED_DIR = Path(".cache") / "related"
+RELATED_FORMAT = 1
+
+
+def count_rows(documents: List[Counter], vocab: List[str], term_ids: Dict[str, int]) -> sparse.csr_matrix:
+    """Term-count matrix for ``documents``, adding unseen terms to ``vocab`` as it goes."""
+    indptr = [0]
+    indices: List[int] = []
+    data: List[int] = []
+    for counts in documents:
+        for term, count in counts.items():
+            if term not in term_ids:
+                term_ids[term] = len(vocab)
+                vocab.append(term)
+            indices.append(term_ids[term])
+            data.append(count)
+        indptr.append(len(indices))
+    return sparse.csr_matrix((np.array(data, dtype=np.float64), indices, indptr),
+                             shape=(len(documents), len(vocab)))
+
+
+class RelatedDocs:
+    """Sparse TF-IDF model of the corpus markdown that answers "which documents are most like this one".
+
+    Raw term counts are stored alongside the TF-IDF matrix, so an update only tokenizes documents that
+    are new or whose content hash changed. IDF weights are then refitted from the stored counts.
+    """
+
+    def __init__(self, index_dir: Path = DEFAULT_RELATED_DIR):
+        self.index_dir = Path(index_dir)
+        self._meta: Optional[Dict[str, Any]] = None
+        self._tfidf: Optional[sparse.csr_matrix] = None
+
+    @property
+    def meta_path(self) -> Path:
+        return self.index_dir / "related.json"
+
+    def load(self) -> Dict[str, Any]:
+        """Document list and vocabulary, or an empty dict when there is no usable model."""
+        if self._meta is None:
+            try:
+                meta = json.loads(self.meta_path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                meta = {}
+            self._meta = meta if meta.get('format') == RELATED_FORMAT else {}
+            self._tfidf = None
+        return self._meta
+
+    def _matrix_path(self, kind: str, generation: int) -> Path:
+        return self.index_dir / f"{kind}.{generation}.npz"
+
+    @property
+    def tfidf(self) -> sparse.csr_matrix:
+        if self._tfidf is None:
+            meta = self.load()
+            self._tfidf = sparse.load_npz(self._matrix_path("tfidf", meta['generation'])).tocsr()
+        return self._tfidf
+
+    def update(self, root: Path = Path(".")) -> Dict[str, int]:
+        """Refit the model for documents added, changed or removed under ``root``."""
+        meta = self.load()
+        old_rows = {doc['path']: (row, doc) for row, doc in enumerate(meta.get('docs', []))}
+        stats = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+
+        keep_rows = []
+        new_counts = []
+        for path in discover_documents(root):
+            if path.suffix.lower() != '.md':
+                continue
+            key = str(path)
+            stat = path.stat()
+            row, previous = old_rows.pop(key, (None, None))
+            if previous and previous['mtime_ns'] == stat.st_mtime_ns and previous['size'] == stat.st_size:
+                digest = previous['sha256']
+            else:
+                digest = file_digest(path)
+
+            entry = {'path': key, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': digest}
+            if previous and digest == previous['sha256']:
+                stats['unchanged'] += 1
+                keep_rows.append((row, {**previous, **entry}))
+                continue
+
+            document = load_document(path)
+            entry['title'] = document['title']
+            new_counts.append((Counter(tokenize(document_text(document))), entry))
+            stats['updated' if previous else 'added'] += 1
+        stats['removed'] = len(old_rows)
+
+        if meta and not (stats['added'] or stats['updated'] or stats['removed']):
+            return stats
+
+        vocab = list(meta.get('vocab', []))
+        term_ids = {term: term_id for term_id, term in enumerate(vocab)}
+        added = count_rows([counts for counts, _ in new_counts], vocab, term_ids)
+
+        if keep_rows:
+            old_counts = sparse.load_npz(self._matrix_path("counts", meta['generation'])).tocsr()
+            kept = old_counts[[row for row, _ in keep_rows]]
+            kept.resize((kept.shape[0], len(vocab)))
+            counts = sparse.vstack([kept, added], format='csr')
+        else:
+            counts = added
+        docs = [entry for _, entry in keep_rows] + [entry for _, entry in new_counts]
+
+        # Drop terms no document uses any more so the vocabulary does not grow forever
+        used = np.flatnonzero(counts.getnnz(axis=0))
+        counts = counts[:, used]
+        vocab = [vocab[term_id] for term_id in used]
+
+        transformer = TfidfTransformer(sublinear_tf=True)
+        tfidf = transformer.fit_transform(counts).tocsr()
+        self._write(docs, vocab, counts, tfidf, transformer.idf_, meta.get('generation', 0) + 1)
+        return stats
+
+    def _write(self, docs: List[Dict[str, Any]], vocab: List[str], counts: sparse.csr_matrix,
+               tfidf: sparse.csr_matrix, idf: np.ndarray, generation: int) -> None:
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        sparse.save_npz(self._matrix_path("counts", generation), counts)
+        sparse.save_npz(self._matrix_path("tfidf", generation), tfidf)
+        np.save(self.index_dir / f"idf.{generation}.npy", idf)
+
+        previous = self.load().get('generation')
+        meta = {'format': RELATED_FORMAT, 'generation': generation, 'docs': docs, 'vocab': vocab}
+        temp_path = self.meta_path.with_name(f"{self.meta_path.name}.part")
+        temp_path.write_text(json.dumps(meta, separators=(',', ':')), encoding='utf-8')
+        os.replace(temp_path, self.meta_path)
+        self._meta = meta
+        self._tfidf = tfidf
+
+        if previous is not None and previous != generation:
+            self._matrix_path("counts", previous).unlink(missing_ok=True)
+            self._matrix_path("tfidf", previous).unlink(missing_ok=True)
+            (self.index_dir / f"idf.{previous}.npy").unlink(missing_ok=True)
+
+    def vectorize(self, text: str) -> sparse.csr_matrix:
+        """TF-IDF row for text outside the corpus, using the corpus vocabulary and IDF weights."""
+        meta = self.load()
+        term_ids = {term: term_id for term_id, term in enumerate(meta['vocab'])}
+        counts = Counter(term for term in tokenize(text) if term in term_ids)
+        row = sparse.csr_matrix((np.array(list(counts.values()), dtype=np.float64),
+                                 [term_ids[term] for term in counts], [0, len(counts)]),
+                                shape=(1, len(term_ids)))
+        row.data = 1 + np.log(row.data)
+        idf = np.load(self.index_dir / f"idf.{meta['generation']}.npy")
+        return normalize(row.multiply(idf).tocsr())
+
+    def similar(self, path: Path, k: int = 5) -> List[Dict[str, Any]]:
+        """The ``k`` documents most similar to ``path`` by cosine similarity, best first.
+
+        ``path`` may be a corpus document or any other text file.
+        """
+        meta = self.load()
+        if not meta or not meta['docs']:
+            return []
+        rows = {doc['path']: row for row, doc in enumerate(meta['docs'])}
+        row = rows.get(str(Path(path)), rows.get(os.path.relpath(path)))
+        if row is not None:
+            query = self.tfidf[row]
+        else:
+            query = self.vectorize(document_text(load_document(Path(path))))
+
+        # Rows are L2-normalised, so the sparse product gives cosine similarities
+        scores = (self.tfidf @ query.T).toarray().ravel()
+        if row is not None:
+            scores[row] = -1
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k else []
+        top = sorted(top, key=lambda index: -scores[index])
+        return [{'path': meta['docs'][index]['path'], 'title': meta['docs'][index].get('title', ''),
+                 'score': round(float(scores[index]), 4)}
+                for index in top if scores[index] > 0]
+
+
+def main():
+    """Update the related-documents model or look up documents similar to a file."""
+    parser = argparse.ArgumentParser(
+        description="Find corpus documents related to a file using TF-IDF similarity"
+    )
+    parser.add_argument(
+        "--index-dir",
+        default=str(DEFAULT_RELATED_DIR),
+        help=f"Directory holding the TF-IDF model (default: {DEFAULT_RELATED_DIR})"
+    )
+    parser.add_argument(
+        "--root",
+        default=".",
+        help="Project root containing the corpus folders (default: current directory)"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("update", help="Refit the model for new, changed and removed documents")
+
+    similar_parser = subparsers.add_parser("similar", help="List documents related to a file")
+    similar_parser.add_argument("path", help="Corpus document or any markdown/text file")
+    similar_parser.add_argument("-k", "--limit", type=int, default=5, help="Number of results (default: 5)")
+    similar_parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    similar_parser.add_argument("--no-update", action="store_true",
+                                help="Use the model as it is instead of updating it first")
+
+    args = parser.parse_args()
+    related = RelatedDocs(Path(args.index_dir))
+
+    if args.command == "update" or not args.no_update:
+        stats = related.update(Path(args.root))
+        if args.command == "update":
+            print(f"✓ Fitted {stats['added']} new, {stats['updated']} changed, {stats['removed']} removed, "
+                  f"{stats['unchanged']} unchanged documents")
+            return
+
+    if not Path(args.path).is_file():
+        print(f"Error: File not found: {args.path}", file=sys.stderr)
+        sys.exit(1)
+
+    results = related.similar(Path(args.path), args.limit)
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+    if not results:
+        print("No related documents")
+        sys.exit(1)
+    for rank, result in enumerate(results, 1):
+        print(f"{rank}. {result['title']} ({result['score']:.3f})")
+        print(f"   {result['path']}")
+
+
+if __name__ == "__main__":
+    main()
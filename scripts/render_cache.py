@@ -0,0 +1,68 @@
+"""Content-hash cache of rendered mermaid diagrams, so unchanged diagrams are not rendered again."""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict
+
+DEFAULT_RENDER_CACHE_DIR = Path(".cache") / "mermaid"
+
+# Config keys that change the rendered output
+RENDER_CONFIG_KEYS = ("image_format", "theme", "width", "height", "background_color", "scale")
+
+
+def normalize_mermaid(mermaid_code: str) -> str:
+    """Drop differences that do not change the diagram: line endings, trailing spaces, blank edges."""
+    lines = mermaid_code.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def render_key(mermaid_code: str, config: Dict[str, Any], renderer_version: str) -> str:
+    """Cache key covering the diagram source, the output-affecting config and the renderer."""
+    payload = {
+        'code': normalize_mermaid(mermaid_code),
+        'config': {key: config.get(key) for key in RENDER_CONFIG_KEYS},
+        'renderer': renderer_version,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _link_or_copy(src: Path, dest: Path) -> None:
+    """Atomically make ``dest`` a hardlink to ``src``, or a copy where hardlinks are not possible."""
+    temp_path = dest.with_name(f".{dest.name}.{threading.get_ident()}.link")
+    temp_path.unlink(missing_ok=True)
+    try:
+        os.link(src, temp_path)
+    except OSError:
+        shutil.copyfile(src, temp_path)
+    os.replace(temp_path, dest)
+
+
+class RenderCache:
+    """Rendered images stored under the hash of everything that determines them."""
+
+    def __init__(self, cache_dir: Path = DEFAULT_RENDER_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+
+    def entry_path(self, key: str, image_format: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.{image_format}"
+
+    def fetch(self, key: str, image_format: str, output_path: Path) -> bool:
+        """Place the cached render at ``output_path``. Returns False on a cache miss."""
+        entry = self.entry_path(key, image_format)
+        if not entry.exists():
+            return False
+        output_path = Path(output_path)
+        if not (output_path.exists() and os.path.samefile(entry, output_path)):
+            _link_or_copy(entry, output_path)
+        return True
+
+    def store(self, key: str, image_format: str, output_path: Path) -> Path:
+        """Add a freshly rendered image to the cache."""
+        entry = self.entry_path(key, image_format)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        _link_or_copy(Path(output_path), entry)
+        return entry
@@ -0,0 +1,151 @@
+"""Per-host robots.txt cache and a Crawl-delay aware request scheduler, shared by the download scripts."""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_ROBOTS_DIR = Path(".cache") / "robots"
+DEFAULT_ROBOTS_TTL = 24 * 60 * 60
+
+
+def _origin(url: str) -> str:
+    parsed_url = urlparse(url)
+    return f"{parsed_url.scheme}://{parsed_url.netloc}"
+
+
+class RobotsCache:
+    """Fetch each host's robots.txt at most once per TTL, in memory and on disk.
+
+    Lookups for different hosts run in parallel; concurrent lookups for the same host share one fetch.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_ROBOTS_TTL, cache_dir: Optional[Path] = DEFAULT_ROBOTS_DIR,
+                 user_agent: str = "*"):
+        self.ttl = ttl
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.user_agent = user_agent
+        self._session = requests.Session()
+        self._parsers: Dict[str, Tuple[float, RobotFileParser]] = {}
+        self._host_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def can_fetch(self, url: str) -> bool:
+        """Check if the URL is allowed according to its host's robots.txt."""
+        return self._parser_for(url).can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url: str) -> float:
+        """Seconds to leave between requests to the URL's host, from Crawl-delay or Request-rate."""
+        parser = self._parser_for(url)
+        delay = float(parser.crawl_delay(self.user_agent) or 0)
+        rate = parser.request_rate(self.user_agent)
+        if rate and rate.requests:
+            delay = max(delay, rate.seconds / rate.requests)
+        return delay
+
+    def _parser_for(self, url: str) -> RobotFileParser:
+        origin = _origin(url)
+        with self._lock:
+            cached = self._parsers.get(origin)
+            host_lock = self._host_locks.setdefault(origin, threading.Lock())
+        if cached and time.time() - cached[0] < self.ttl:
+            return cached[1]
+
+        with host_lock:
+            cached = self._parsers.get(origin)
+            if cached and time.time() - cached[0] < self.ttl:
+                return cached[1]
+
+            record = self._read_record(origin)
+            if not record or time.time() - record['fetched_at'] >= self.ttl:
+                record = self._fetch_record(origin)
+                self._write_record(origin, record)
+
+            parser = self._build_parser(origin, record)
+            with self._lock:
+                self._parsers[origin] = (record['fetched_at'], parser)
+            return parser
+
+    def _fetch_record(self, origin: str) -> Dict[str, Any]:
+        try:
+            response = self._session.get(f"{origin}/robots.txt", timeout=10)
+            status, body = response.status_code, response.text
+        except requests.RequestException:
+            status, body = None, ''
+        return {'fetched_at': time.time(), 'status': status, 'body': body}
+
+    def _build_parser(self, origin: str, record: Dict[str, Any]) -> RobotFileParser:
+        # Mirrors RobotFileParser.read(): 401/403 and server errors disallow, other 4xx allow
+        parser = RobotFileParser(f"{origin}/robots.txt")
+        status = record['status']
+        if status is None:
+            parser.allow_all = True
+        elif status in (401, 403) or status >= 500:
+            parser.disallow_all = True
+        elif status >= 400:
+            parser.allow_all = True
+        else:
+            parser.parse(record['body'].splitlines())
+        return parser
+
+    def _record_path(self, origin: str) -> Path:
+        return self.cache_dir / (origin.replace('://', '_').replace(':', '_') + '.json')
+
+    def _read_record(self, origin: str) -> Optional[Dict[str, Any]]:
+        if not self.cache_dir:
+            return None
+        try:
+            return json.loads(self._record_path(origin).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+
+    def _write_record(self, origin: str, record: Dict[str, Any]) -> None:
+        # Failed fetches are only kept in memory so the next run retries them
+        if not self.cache_dir or record['status'] is None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._record_path(origin)
+        temp_path = path.with_name(f"{path.name}.{threading.get_ident()}.part")
+        temp_path.write_text(json.dumps(record), encoding='utf-8')
+        os.replace(temp_path, path)
+
+
+class HostScheduler:
+    """Space requests to each host by its robots.txt delay while different hosts proceed in parallel."""
+
+    def __init__(self, robots: RobotsCache):
+        self.robots = robots
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str) -> None:
+        """Block until a request to the URL's host is allowed to start."""
+        delay = self.robots.crawl_delay(url)
+        if not delay:
+            return
+        origin = _origin(url)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(origin, now))
+            self._next_slot[origin] = slot + delay
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class ScheduledAdapter(HTTPAdapter):
+    """Transport adapter that asks a HostScheduler for a slot before every request, redirects included."""
+
+    def __init__(self, scheduler: HostScheduler, **kwargs):
+        self.scheduler = scheduler
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        self.scheduler.wait(request.url)
+        return super().send(request, **kwargs)
@@ -0,0 +1,77 @@
+"""Debounced file watching shared by the --watch modes of mermaid_to_image and article_to_md."""
+
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Set
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+
+# Quiet period after the last event before a batch of changes is handed over
+DEFAULT_DEBOUNCE = 0.2
+
+
+class ChangeBatcher(FileSystemEventHandler):
+    """Collect changed paths and hand them over together once events stop arriving for ``delay`` seconds.
+
+    Editors typically save with several events (truncate, write, rename), so coalescing them means each
+    change is processed once. Batches are processed one at a time, in the order they settle.
+    """
+
+    def __init__(self, callback: Callable[[List[Path]], None], accept: Callable[[Path], bool],
+                 delay: float = DEFAULT_DEBOUNCE):
+        super().__init__()
+        self.callback = callback
+        self.accept = accept
+        self.delay = delay
+        self._pending: Set[Path] = set()
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        if event.is_directory or event.event_type not in ('created', 'modified', 'moved', 'closed'):
+            return
+        path = Path(getattr(event, 'dest_path', '') or event.src_path)
+        # Temp files written by the scripts themselves and by editors start with a dot
+        if path.name.startswith('.') or not self.accept(path):
+            return
+
+        with self._lock:
+            self._pending.add(path)
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self._flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush(self) -> None:
+        with self._run_lock:
+            with self._lock:
+                paths = sorted(path for path in self._pending if path.exists())
+                self._pending.clear()
+            if not paths:
+                return
+            try:
+                self.callback(paths)
+            except Exception as e:
+                print(f"✗ Error handling changes: {e}")
+
+
+def watch(roots: Iterable[Path], callback: Callable[[List[Path]], None], accept: Callable[[Path], bool],
+          delay: float = DEFAULT_DEBOUNCE) -> None:
+    """Call ``callback`` with each settled batch of accepted changes under ``roots`` until interrupted."""
+    handler = ChangeBatcher(callback, accept, delay)
+    observer = Observer()
+    for root in roots:
+        observer.schedule(handler, str(root), recursive=True)
+    observer.start()
+    try:
+        while observer.is_alive():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        observer.stop()
+        observer.join()
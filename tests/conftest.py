@@ -0,0 +1,8 @@
+"""Shared test setup: the tools import their sibling modules by name, as they do when run from scripts/."""
+
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
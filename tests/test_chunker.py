@@ -0,0 +1,80 @@
+from pathlib import Path
+
+from chunker import CHARS_PER_TOKEN, ChunkCache, chunk_all, chunk_document, estimate_tokens, split_text
+
+PARAGRAPH = " ".join(f"Sentence {i} explains how the agent plans its next tool call." for i in range(12))
+
+
+def document(*sections):
+    return {'sections': [{'heading': heading, 'text': text} for heading, text in sections]}
+
+
+def test_split_text_stays_within_budget_and_keeps_every_word():
+    text = "\n\n".join([PARAGRAPH] * 6)
+
+    pieces = split_text(text, 100)
+
+    assert all(estimate_tokens(piece) <= 100 for piece in pieces)
+    assert " ".join(pieces).split() == text.split()
+
+
+def test_split_text_cuts_a_long_word_by_characters():
+    word = "x" * (30 * CHARS_PER_TOKEN)
+
+    assert split_text(word, 10) == [word[i:i + 40] for i in range(0, len(word), 40)]
+    assert "".join(split_text(word, 0)) == word
+
+
+def test_short_sections_share_a_chunk_under_their_headings():
+    chunks = chunk_document(document(("Intro", "Short intro."), ("Intro > Setup", "Short setup.")), budget=200)
+
+    assert len(chunks) == 1
+    assert chunks[0]['heading'] == "Intro"
+    assert chunks[0]['text'] == "# Intro\n\nShort intro.\n\n## Setup\n\nShort setup."
+
+
+def test_chunks_stay_within_budget():
+    chunks = chunk_document(document(("Long", "\n\n".join([PARAGRAPH] * 10))), budget=150)
+
+    assert len(chunks) > 1
+    assert all(chunk['tokens'] <= 150 for chunk in chunks)
+    assert chunks[0]['text'].startswith("# Long\n\n")
+
+
+def test_heading_longer_than_the_budget_does_not_drop_the_section_text():
+    heading = "A heading that goes on " * 40
+    text = "\n\n".join([PARAGRAPH] * 3)
+
+    for budget in (50, len(heading) // CHARS_PER_TOKEN, len(heading) // CHARS_PER_TOKEN + 1):
+        chunks = chunk_document(document((heading, text)), budget=budget)
+
+        assert all(chunk['tokens'] <= budget for chunk in chunks)
+        joined = " ".join(chunk['text'] for chunk in chunks)
+        assert joined.split()[-len(text.split()):] == text.split()
+
+
+def test_chunk_digests_are_stable_and_unique():
+    doc = document(("One", PARAGRAPH), ("Two", PARAGRAPH), ("Three", PARAGRAPH))
+
+    first, second = chunk_document(doc, budget=60), chunk_document(doc, budget=60)
+
+    assert [chunk['digest'] for chunk in first] == [chunk['digest'] for chunk in second]
+    assert len({chunk['digest'] for chunk in first}) == len(first)
+
+
+def test_chunk_ids_do_not_depend_on_the_working_directory(tmp_path, monkeypatch):
+    root = tmp_path / "project"
+    article = root / "markdown" / "agents" / "article.md"
+    article.parent.mkdir(parents=True)
+    article.write_text("# Agents\n\n" + PARAGRAPH, encoding='utf-8')
+    cache = ChunkCache(tmp_path / "cache")
+
+    monkeypatch.chdir(root)
+    [(_, from_root)] = chunk_all(cache, [Path("markdown/agents/article.md")], Path("."))
+    monkeypatch.chdir(article.parent)
+    [(_, from_folder)] = chunk_all(cache, [Path("article.md")], Path("../.."))
+    monkeypatch.chdir(tmp_path)
+    [(_, from_parent)] = chunk_all(cache, [Path("project/markdown/agents/article.md")], Path("project"))
+
+    assert [chunk['id'] for chunk in from_root] == [chunk['id'] for chunk in from_folder]
+    assert [chunk['id'] for chunk in from_root] == [chunk['id'] for chunk in from_parent]
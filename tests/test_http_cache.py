@@ -0,0 +1,163 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from article_to_md import download_image, is_image
+from http_cache import HEAD_BYTES, ContentRejected, HTTPCache, stream_to_file
+from image_store import ImageStore, sniff_image_type
+
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 40
+ERROR_PAGE = b"<!DOCTYPE html><html><body>" + b"<p>Not found</p>" * 200 + b"</body></html>"
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serves ``server.bodies`` with strong ETags, answering If-None-Match and If-Range requests."""
+
+    def do_GET(self):
+        body = self.server.bodies.get(self.path)
+        self.server.requests.append(dict(self.headers))
+        if body is None:
+            self.send_error(404)
+            return
+        etag = f'"{len(body)}-{body[:4].hex()}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        start = 0
+        range_header = self.headers.get('Range', '')
+        if range_header.startswith('bytes=') and self.headers.get('If-Range') == etag:
+            start = int(range_header[6:].rstrip('-'))
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body) - start))
+        self.end_headers()
+        self.wfile.write(body[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.bodies = {'/image.png': PNG, '/missing.png': ERROR_PAGE}
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_port}"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class StreamingResponse:
+    """Stand-in for a streamed ``requests.Response`` that records how much of the body was read."""
+
+    status_code = 200
+    headers = {}
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.read = 0
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+    def close(self):
+        pass
+
+
+class StreamingSession:
+    def __init__(self, response):
+        self.response = response
+
+    def get(self, url, **kwargs):
+        return self.response
+
+
+def test_sniff_image_type_accepts_svg_with_doctype_bom_and_whitespace():
+    assert sniff_image_type(b'<svg xmlns="http://www.w3.org/2000/svg"></svg>') == '.svg'
+    assert sniff_image_type(b'<!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN"><svg></svg>') == '.svg'
+    assert sniff_image_type(b'\xef\xbb\xbf\n  <?xml version="1.0"?><svg></svg>') == '.svg'
+    assert sniff_image_type(b'<!DOCTYPE html><html><svg></svg></html>') is None
+    assert sniff_image_type(PNG[:HEAD_BYTES]) == '.png'
+
+
+def test_rejected_body_is_not_read_past_its_first_bytes(tmp_path):
+    response = StreamingResponse([ERROR_PAGE[:HEAD_BYTES]] + [b"x" * 65536] * 100)
+    dest = tmp_path / "image.body"
+
+    with pytest.raises(ContentRejected):
+        stream_to_file("https://example.com/a.png", dest, StreamingSession(response), accept=is_image)
+
+    assert response.read == 1
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_short_rejected_body_is_checked_at_the_end(tmp_path):
+    with pytest.raises(ContentRejected):
+        stream_to_file("https://example.com/a.png", tmp_path / "a.body",
+                       StreamingSession(StreamingResponse([b"<html>nope</html>"])), accept=is_image)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_rejected_response_drops_the_cache_entry(server, tmp_path):
+    cache = HTTPCache(tmp_path / "http")
+
+    with pytest.raises(ContentRejected):
+        cache.get(f"{server.url}/missing.png", accept=is_image)
+
+    assert cache.lookup(f"{server.url}/missing.png") is None
+    assert [path for path in (tmp_path / "http").rglob("*") if path.is_file()] == []
+
+
+def test_cache_revalidates_with_etag(server, tmp_path):
+    cache = HTTPCache(tmp_path / "http")
+    url = f"{server.url}/image.png"
+
+    first = cache.get(url, accept=is_image)
+    second = cache.get(url, accept=is_image)
+
+    assert not first.from_cache and second.from_cache
+    assert second.content == PNG
+    assert server.requests[-1]['If-None-Match'] == cache.validators(url)['etag']
+
+
+def test_interrupted_download_resumes_with_a_range_request(server, tmp_path):
+    url = f"{server.url}/image.png"
+    dest = tmp_path / "image.png"
+    etag = requests.get(url).headers['ETag']
+    dest.with_name("image.png.part").write_bytes(PNG[:1000])
+    dest.with_name("image.png.part.json").write_text(json.dumps({'url': url, 'validator': etag}))
+
+    response = stream_to_file(url, dest, accept=is_image)
+
+    assert response.status_code == 206
+    assert server.requests[-1]['Range'] == "bytes=1000-"
+    assert dest.read_bytes() == PNG
+    assert not dest.with_name("image.png.part").exists()
+
+
+def test_download_image_rejects_html_without_keeping_it(server, tmp_path):
+    cache = HTTPCache(tmp_path / "http")
+    store = ImageStore(tmp_path / "store")
+    images = tmp_path / "images"
+    images.mkdir()
+
+    assert download_image(f"{server.url}/missing.png", images, cache=cache, store=store) is None
+    assert download_image(f"{server.url}/image.png", images, cache=cache, store=store) == "image.png"
+    assert (images / "image.png").read_bytes() == PNG
+    assert cache.lookup(f"{server.url}/missing.png") is None
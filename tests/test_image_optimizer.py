@@ -0,0 +1,52 @@
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image, features  # noqa: E402
+
+from image_optimizer import markdown_image_names, optimize_images, rename_markdown_images  # noqa: E402
+from image_store import ImageStore  # noqa: E402
+
+
+def write_image(path, size=(400, 300), color=(200, 30, 30)):
+    Image.new('RGB', size, color).save(path, **({'quality': 100} if path.suffix == '.jpg' else {}))
+    return path.stat().st_size
+
+
+@pytest.mark.skipif(not features.check('webp'), reason="Pillow built without WebP")
+def test_converted_names_that_collide_get_a_hash_suffix(tmp_path):
+    images = tmp_path / "images"
+    images.mkdir()
+    write_image(images / "a.png")
+    write_image(images / "a.jpg", color=(30, 30, 200))
+
+    result = optimize_images(images, image_format='webp', workers=1, store=ImageStore(tmp_path / "store"))
+
+    assert sorted(result['renamed']) == ["a.jpg", "a.png"]
+    assert len(set(result['renamed'].values())) == 2
+    assert sorted(path.name for path in images.iterdir()) == sorted(result['renamed'].values())
+    # Each reference still points at its own image
+    blue = Image.open(images / result['renamed']['a.jpg']).convert('RGB').getpixel((0, 0))
+    assert blue[2] > blue[0]
+
+
+def test_only_the_named_images_are_optimized_and_counted(tmp_path):
+    images = tmp_path / "images"
+    images.mkdir()
+    new_bytes = write_image(images / "new.jpg", size=(2400, 1200))
+    write_image(images / "left-over.jpg", size=(2400, 1200))
+    left_over = (images / "left-over.jpg").read_bytes()
+
+    result = optimize_images(images, max_width=800, workers=1, store=ImageStore(tmp_path / "store"),
+                             names=["new.jpg"])
+
+    assert result['original_bytes'] == new_bytes
+    assert result['optimized_bytes'] == (images / "new.jpg").stat().st_size < new_bytes
+    assert (images / "left-over.jpg").read_bytes() == left_over
+    assert Image.open(images / "new.jpg").width == 800
+
+
+def test_markdown_image_names_and_renames_round_trip():
+    markdown = "![a](images/a.png) text ![b](images/b.jpg \"title\") ![c](https://example.com/c.png)"
+
+    assert markdown_image_names(markdown) == {"a.png", "b.jpg"}
+    assert rename_markdown_images(markdown, {"a.png": "a.webp"}).startswith("![a](images/a.webp)")
@@ -0,0 +1,50 @@
+import os
+
+from image_store import ImageStore, file_digest
+
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 4
+
+
+def test_stored_copy_is_independent_of_the_callers_file(tmp_path):
+    store = ImageStore(tmp_path / "store")
+    source = tmp_path / "html" / "post" / "images" / "chart.png"
+    source.parent.mkdir(parents=True)
+    source.write_bytes(PNG)
+
+    (tmp_path / "article").mkdir()
+
+    digest = store.add(source, tmp_path / "article" / "chart.png")
+    blob = store.blob_path(digest)
+
+    assert not os.path.samefile(source, blob)
+    # Editing the source in place, as an editor or a re-run over html/ would, leaves the blob alone
+    with open(source, 'r+b') as f:
+        f.write(b'GIF89a')
+    assert file_digest(blob) == digest
+    assert (tmp_path / "article" / "chart.png").read_bytes() == PNG
+
+
+def test_moved_files_become_the_blob(tmp_path):
+    store = ImageStore(tmp_path / "store")
+    temp = tmp_path / "download.part"
+    temp.write_bytes(PNG)
+    inode = temp.stat().st_ino
+
+    digest = store.put_file(temp, move=True)
+
+    assert not temp.exists()
+    assert store.blob_path(digest).stat().st_ino == inode
+
+
+def test_dedupe_links_duplicates_to_one_blob(tmp_path):
+    store = ImageStore(tmp_path / "store")
+    for name in ("a", "b"):
+        (tmp_path / "html" / name / "images").mkdir(parents=True)
+        (tmp_path / "html" / name / "images" / "chart.png").write_bytes(PNG)
+
+    linked, freed = store.dedupe([tmp_path / "html"])
+
+    first, second = (tmp_path / "html" / name / "images" / "chart.png" for name in ("a", "b"))
+    assert linked == 2 and freed == len(PNG)
+    assert os.path.samefile(first, second)
+    assert os.path.samefile(first, store.blob_path(file_digest(first)))
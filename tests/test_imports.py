@@ -0,0 +1,16 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+
+
+@pytest.mark.parametrize("module", ["article_to_md", "html_downloader"])
+def test_converters_do_not_load_optional_stages_on_import(module):
+    # A fresh interpreter, since this one may already have imported them for other tests
+    check = f"import sys, {module}; print(sorted({{'PIL', 'numpy'}} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", check], cwd=SCRIPTS_DIR, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,73 @@
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from image_optimizer import DEFAULT_MAX_WIDTH
+from ingest_server import IngestHandler, IngestService, JobQueue, request_json, validate_job
+
+
+def test_valid_job_gets_its_defaults():
+    job = validate_job({'source': " https://example.com/post ", 'optimize': True})
+
+    assert job == {'kind': 'markdown', 'source': "https://example.com/post", 'output_dir': "markdown",
+                   'force': False, 'allow_duplicates': False,
+                   'optimize': {'max_width': DEFAULT_MAX_WIDTH, 'image_format': 'keep'}, 'bundle': False}
+    assert validate_job({'source': "https://example.com", 'optimize': {'max_width': 800}})['optimize'] == \
+        {'max_width': 800, 'image_format': 'keep'}
+
+
+@pytest.mark.parametrize("max_width", [None, [800], {'px': 800}, True, False, "800", 800.5, 0, -5, 1e400])
+def test_invalid_max_width_is_a_validation_error(max_width):
+    with pytest.raises(ValueError, match="max_width"):
+        validate_job({'source': "https://example.com", 'optimize': {'max_width': max_width}})
+
+
+@pytest.mark.parametrize("spec", [
+    [],
+    {'source': ""},
+    {'source': ["https://example.com"]},
+    {'source': "https://example.com", 'kind': ["html"]},
+    {'source': "https://example.com", 'kind': "pdf"},
+    {'source': "page.html", 'kind': "html"},
+    {'source': "https://example.com", 'bundle': True},
+    {'source': "https://example.com", 'kind': "html", 'bundle': "no"},
+    {'source': "https://example.com", 'kind': "html", 'bundle': None},
+    {'source': "https://example.com", 'force': "false"},
+    {'source': "https://example.com", 'force': 0},
+    {'source': "https://example.com", 'allow_duplicates': 1},
+    {'source': "https://example.com", 'allow_duplicates': "true"},
+    {'source': "https://example.com", 'output_dir': {'path': "out"}},
+    {'source': "https://example.com", 'optimize': {'image_format': "gif"}},
+    {'source': "https://example.com", 'optimize': {'quality': 80}},
+    {'source': "https://example.com", 'priority': 1},
+])
+def test_invalid_jobs_are_validation_errors(spec):
+    with pytest.raises(ValueError):
+        validate_job(spec)
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    service = IngestService(JobQueue(tmp_path / "ingest.sqlite"), workers=1)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), type("BoundIngestHandler", (IngestHandler,), {'service': service}))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_api_answers_bad_job_fields_with_400(api):
+    status, body = request_json(f"{api}/jobs", {'source': "https://example.com", 'optimize': {'max_width': None}})
+    assert status == 400 and "max_width" in body['error']
+
+    status, body = request_json(f"{api}/jobs", {'source': "https://example.com", 'force': "false"})
+    assert status == 400 and "'force'" in body['error']
+
+    status, body = request_json(f"{api}/jobs", {'jobs': [{'source': "https://example.com"}, {'source': "x", 'kind': []}]})
+    assert status == 400 and body['error'].startswith("job 1:")
+    assert request_json(f"{api}/jobs")[1]['jobs'] == []
+
+    status, body = request_json(f"{api}/jobs", {'source': "https://example.com"})
+    assert status == 202 and request_json(f"{api}/jobs/{body['id']}")[1]['status'] == 'queued'
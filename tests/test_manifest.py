@@ -0,0 +1,67 @@
+import shutil
+
+import manifest
+from bundle import pack_folder
+from manifest import SOURCES_DIR, find_manifest, index_archives, is_current, write_manifest
+
+SUMMARY = {'title': "Post", 'word_count': 3, 'image_count': 0}
+
+
+def archive(output_dir, name, source, sha="abc"):
+    folder = output_dir / name
+    folder.mkdir(parents=True)
+    (folder / "article.md").write_text("# Post\n", encoding='utf-8')
+    write_manifest(folder, source, source, {}, sha, "v1", "article.md", SUMMARY)
+    return folder
+
+
+def test_written_archive_is_found_by_its_source(tmp_path):
+    folder = archive(tmp_path, "post", "https://example.com/post")
+
+    found, recorded = find_manifest(tmp_path, "https://example.com/post")
+
+    assert found == folder and recorded['raw_html_sha256'] == "abc"
+    assert is_current(found, recorded, "abc", "v1")
+    assert find_manifest(tmp_path, "https://example.com/other") is None
+
+
+def test_lookup_reads_only_the_sources_manifest(tmp_path, monkeypatch):
+    for number in range(20):
+        archive(tmp_path, f"post-{number}", f"https://example.com/{number}")
+    reads = []
+    load = manifest.load_manifest
+    monkeypatch.setattr(manifest, 'load_manifest', lambda folder: reads.append(folder) or load(folder))
+
+    assert find_manifest(tmp_path, "https://example.com/7")[0] == tmp_path / "post-7"
+    assert reads == [tmp_path / "post-7"]
+
+
+def test_archives_from_before_sources_were_recorded_are_indexed_once(tmp_path):
+    archive(tmp_path, "old", "https://example.com/old")
+    shutil.rmtree(tmp_path / SOURCES_DIR)
+
+    # A forced run writes a new archive before any lookup; the old one must still be found afterwards
+    archive(tmp_path, "new", "https://example.com/new")
+
+    assert find_manifest(tmp_path, "https://example.com/old")[0] == tmp_path / "old"
+    assert index_archives(tmp_path) == 2
+
+
+def test_packed_archive_is_found_as_a_bundle(tmp_path):
+    folder = archive(tmp_path, "post", "https://example.com/post")
+    bundle = pack_folder(folder)
+    for path in sorted(folder.rglob("*"), reverse=True):
+        path.unlink()
+    folder.rmdir()
+
+    assert find_manifest(tmp_path, "https://example.com/post")[0] == bundle
+
+
+def test_overwritten_archive_no_longer_answers_for_its_old_source(tmp_path):
+    archive(tmp_path, "post", "https://a.example/post")
+    (tmp_path / "post" / "manifest.json").unlink()
+    write_manifest(tmp_path / "post", "https://b.example/post", "https://b.example/post", {}, "def", "v1",
+                   "article.md", SUMMARY)
+
+    assert find_manifest(tmp_path, "https://a.example/post") is None
+    assert find_manifest(tmp_path, "https://b.example/post")[0] == tmp_path / "post"
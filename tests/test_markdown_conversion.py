@@ -0,0 +1,60 @@
+import re
+import shutil
+from pathlib import Path
+
+import pytest
+from markdownify import markdownify as md
+
+from article_to_md import MARKDOWN_CONVERTER, convert_to_markdown, extract_article, process_images
+from corpus import load_document, markdown_sections
+from parsed_document import ParsedDocument
+
+ROOT = Path(__file__).resolve().parent.parent
+PAGES = sorted(ROOT.glob("benchmarks/fixtures/*/index.html")) + sorted(ROOT.glob("html/*/index.html"))
+IMAGES = ROOT / "benchmarks" / "fixtures" / "images"
+
+
+def reparsed_markdown(html):
+    """The conversion as it was before parse-once: serialise the tree and let markdownify parse it again."""
+    return md(html, heading_style="ATX", bullets="-", code_language="python")
+
+
+@pytest.fixture(params=PAGES, ids=lambda path: path.parent.name)
+def article_html(request):
+    page = ParsedDocument(request.param.read_text(encoding='utf-8'))
+    page.prune()
+    html, _ = extract_article(page, "https://example.com/post")
+    return html
+
+
+def test_converting_the_parsed_tree_matches_converting_its_html(article_html):
+    soup = ParsedDocument(article_html, parser='html.parser').soup
+
+    assert MARKDOWN_CONVERTER.convert_soup(soup) == reparsed_markdown(str(soup))
+
+
+def test_convert_to_markdown_matches_the_reparsing_pipeline(tmp_path):
+    source = tmp_path / "source"
+    shutil.copytree(IMAGES, source / "images")
+    names = sorted(path.name for path in IMAGES.iterdir())
+    html = ("<div><h2>Figures</h2><ul><li>One</li><li>Two</li></ul>"
+            + "".join(f'<p>Figure {name}: <img src="images/{name}" alt="{name}"></p>' for name in names)
+            + "<pre><code>print('hi')</code></pre></div>")
+
+    markdown, image_count = convert_to_markdown(ParsedDocument(html, parser='html.parser'), "", tmp_path / "new",
+                                                 True, source)
+
+    soup = ParsedDocument(html, parser='html.parser').soup
+    process_images(soup, "", tmp_path / "old" / "images", True, source)
+    assert image_count == len(names)
+    assert markdown == re.sub(r'\n{3,}', '\n\n', reparsed_markdown(str(soup)))
+
+
+@pytest.mark.parametrize("path", PAGES, ids=lambda path: path.parent.name)
+def test_corpus_sections_match_converting_the_serialised_body(path):
+    page = ParsedDocument(path.read_text(encoding='utf-8'))
+    body = page.soup.body or page.soup
+    for tag in body.find_all(['script', 'style', 'nav', 'footer']):
+        tag.decompose()
+
+    assert load_document(path)['sections'] == markdown_sections(md(str(body), heading_style="ATX"))
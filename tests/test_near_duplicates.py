@@ -0,0 +1,101 @@
+import sqlite3
+
+import near_duplicates
+from near_duplicates import (
+    _MAX_HASH,
+    _MERSENNE_PRIME,
+    _PERM_A,
+    _PERM_B,
+    NUM_PERMUTATIONS,
+    SIGNATURE_VERSION,
+    NearDuplicateIndex,
+    minhash,
+    shingle_hashes,
+    similarity,
+    word_hashes,
+)
+
+ARTICLE = " ".join(f"Sentence {i} talks about agents, tools and evaluation loops in production." for i in range(60))
+
+
+def test_minhash_matches_exact_integer_arithmetic(monkeypatch):
+    hashes = shingle_hashes(ARTICLE)[:200]
+    prime, mask = int(_MERSENNE_PRIME), int(_MAX_HASH)
+    expected = [min(((int(a) * int(x) + int(b)) % prime) & mask for x in hashes)
+                for a, b in zip(_PERM_A, _PERM_B)]
+
+    monkeypatch.setattr(near_duplicates, 'shingle_hashes', lambda text: hashes)
+    assert minhash("ignored").tolist() == expected
+
+
+def test_word_hashes_do_not_depend_on_neighbouring_words():
+    alone = word_hashes(["agent"])
+    with_long_word = word_hashes(["agent", "internationalization"])
+    repeated = word_hashes(["agent", "tool", "agent"])
+
+    assert with_long_word[0] == alone[0]
+    assert repeated[0] == repeated[2] == alone[0]
+    assert repeated[1] != alone[0]
+
+
+def test_shingle_hashes_are_distinct_32_bit_values():
+    hashes = shingle_hashes("one two three four five one two three four five")
+
+    assert hashes.size == 5  # the repeated shingle is counted once
+    assert hashes.max() <= _MAX_HASH
+
+
+def test_similar_texts_have_similar_signatures():
+    signature = minhash(ARTICLE)
+    edited = minhash(ARTICLE.replace("Sentence 3 ", "Line 3 "))
+    unrelated = minhash(" ".join(f"Recipe step {i}: whisk eggs, fold flour and bake slowly." for i in range(60)))
+
+    assert signature.shape == (NUM_PERMUTATIONS,)
+    assert similarity(signature, minhash(ARTICLE)) == 1.0
+    assert similarity(signature, edited) > 0.8
+    assert similarity(signature, unrelated) < 0.2
+
+
+def test_text_without_words_has_no_signature():
+    assert minhash("") is None
+    assert minhash(" -- !! ") is None
+
+
+def test_index_finds_near_duplicates_in_the_same_collection(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "duplicates.sqlite")
+    signature = minhash(ARTICLE)
+    index.add("markdown", "https://a.example/post", "markdown/post/article.md", signature)
+
+    matches = index.find("markdown", minhash(ARTICLE + " Syndicated."), exclude_key="https://b.example/post")
+    assert [(key, location) for key, location, _ in matches] == [("https://a.example/post",
+                                                                   "markdown/post/article.md")]
+    assert index.find("html", signature) == []
+    assert index.find("markdown", signature, exclude_key="https://a.example/post") == []
+
+
+def test_empty_documents_are_never_duplicates(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "duplicates.sqlite")
+    index.add("markdown", "https://a.example/gallery", "markdown/gallery/article.md", minhash(""))
+
+    assert index.find("markdown", minhash("")) == []
+    with sqlite3.connect(tmp_path / "duplicates.sqlite") as connection:
+        assert connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0] == 0
+
+
+def test_adding_an_empty_signature_removes_the_previous_one(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "duplicates.sqlite")
+    index.add("markdown", "https://a.example/post", "markdown/post/article.md", minhash(ARTICLE))
+    index.add("markdown", "https://a.example/post", "markdown/post/article.md", None)
+
+    assert index.find("markdown", minhash(ARTICLE)) == []
+
+
+def test_index_from_an_older_signature_version_is_cleared(tmp_path):
+    path = tmp_path / "duplicates.sqlite"
+    NearDuplicateIndex(path).add("markdown", "https://a.example/post", "post.md", minhash(ARTICLE))
+    with sqlite3.connect(path) as connection:
+        connection.execute(f"PRAGMA user_version = {SIGNATURE_VERSION - 1}")
+
+    assert NearDuplicateIndex(path).find("markdown", minhash(ARTICLE)) == []
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("PRAGMA user_version").fetchone()[0] == SIGNATURE_VERSION
@@ -0,0 +1,108 @@
+import pytest
+from readability import Document
+
+import article_to_md
+import html_downloader
+from parsed_document import DEFAULT_PRUNE_RULES, ParsedDocument, prune_version, resolve_prune_rules
+
+PARAGRAPH = "<p>" + "Real article text goes here, with commas, clauses and a little more detail. " * 20 + "</p>"
+
+PAGE = f"""<html><head><title>Article</title><style>p {{ color: red }}</style>
+<script>window.__NEXT_DATA__ = {{"props": {{}}}}</script></head>
+<body>
+<svg style="position: absolute"><defs><symbol id="icon"><path d="M0 0"/></symbol></defs></svg>
+<article>
+{PARAGRAPH}
+<svg viewBox="0 0 10 10"><defs><symbol id="arrow"><path d="M1 1"/></symbol></defs><text>Diagram text</text></svg>
+<noscript><p>Enable JavaScript to continue.</p></noscript>
+<!-- tracking comment -->
+<p hidden>Hidden paragraph</p>
+<div style="DISPLAY : none">Collapsed text</div>
+{PARAGRAPH}
+</article>
+</body></html>"""
+
+
+def summary(tree):
+    return Document(tree).summary()
+
+
+def test_default_rules_leave_readability_output_unchanged():
+    unpruned = summary(ParsedDocument(PAGE).tree)
+    page = ParsedDocument(PAGE)
+    report = page.prune()
+
+    assert summary(page.tree) == unpruned
+    assert report['bytes_removed'] > 0
+
+
+def test_svg_sprites_only_removes_sprite_sheets():
+    page = ParsedDocument(PAGE)
+    report = page.prune(['svg-sprites'])
+
+    assert report['rules']['svg-sprites']['elements'] == 1
+    assert "Diagram text" in summary(page.tree)
+
+
+def test_templates_are_not_pruned_by_default():
+    html = PAGE.replace("<!-- tracking comment -->", "<template><p>Template text</p></template>")
+    page = ParsedDocument(html)
+    page.prune()
+
+    # Readability keeps the text of a <template>, so pruning it by default would change the article
+    assert "Template text" in summary(ParsedDocument(html).tree)
+    assert "Template text" in summary(page.tree)
+
+
+def test_prune_reports_each_rule():
+    report = ParsedDocument(PAGE).prune()
+
+    assert set(report['rules']) == set(DEFAULT_PRUNE_RULES)
+    assert report['rules']['scripts']['elements'] == 1
+    assert report['rules']['hidden']['elements'] == 2
+    assert report['bytes_removed'] == sum(rule['bytes'] for rule in report['rules'].values())
+
+
+def test_page_stages_share_one_parse():
+    page = ParsedDocument(PAGE.replace("<head>", '<head><meta property="article:published_time" '
+                                                 'content="2025-03-14T09:00:00Z">'))
+
+    assert html_downloader.validate_html(page)
+    assert html_downloader.extract_metadata(page, "https://example.com/post")['article_date'] == "2025-03-14"
+    assert article_to_md.extract_article_date(page) == "2025-03-14"
+    page.prune()
+    html_downloader.extract_main_content(page, "https://example.com/post")
+
+    # Pruning is seen by every later stage, and no BeautifulSoup parse of the page is ever built
+    assert page.find('script') is None
+    assert page._soup is None
+
+
+def test_find_matches_attribute_values_and_presence():
+    page = ParsedDocument('<html><head><meta name="date" content="x"><meta name="author" content="A \' B">'
+                          '</head><body><time>no</time><time datetime="2025-01-02">yes</time></body></html>')
+
+    assert page.find('meta', {'name': 'author'}).get('content') == "A ' B"
+    assert page.find('time', {'datetime': True}).text == "yes"
+    assert page.find('meta', {'name': 'description'}) is None
+
+
+def test_has_markup_needs_a_real_element():
+    assert ParsedDocument("<p>text</p>").has_markup()
+    assert not ParsedDocument("just text").has_markup()
+    assert not ParsedDocument("").has_markup()
+    assert not ParsedDocument("<!-- -->").has_markup()
+
+
+def test_resolve_prune_rules_accepts_xpath_and_rejects_unknown_names():
+    assert set(resolve_prune_rules(["//aside", "scripts"])) == {"//aside", "scripts"}
+    with pytest.raises(ValueError):
+        resolve_prune_rules(["sidebars"])
+    with pytest.raises(ValueError):
+        resolve_prune_rules(["//aside["])
+
+
+def test_prune_version_changes_with_the_rules():
+    assert prune_version(DEFAULT_PRUNE_RULES) != prune_version(DEFAULT_PRUNE_RULES[:-1])
+    assert prune_version(DEFAULT_PRUNE_RULES) == prune_version(list(DEFAULT_PRUNE_RULES))
+    assert prune_version(()) == "unpruned"